@@ -1,13 +1,27 @@
 # maxapp.py — unified backend for CSR, Platform, User Admin, and PIN pages
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, session
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, SelectField, DateTimeField, SubmitField
 from wtforms.validators import DataRequired, Length
-from werkzeug.security import generate_password_hash, check_password_hash
-import json, os
+import io, json, os
 from datetime import datetime, timezone
 
+import auth_cache
+import bulk_requests
+import change_feed
+import export_stream
+import http_cache
+import id_allocator
+import pagination
+import report_engine
+import request_repository
+import search_fields
+import shortlist_store
+import storage
+from data_cache import thaw
+from view_counter import view_counter
+
 # ---- BCE imports (as in your code) ----
 from UserStory13_PIN_CreateRequest import CreateRequestPage, CreateRequestController, Request
 from UserStory14_PIN_ViewRequest import ViewRequestPage, ViewRequestController, ViewRequestEntity
@@ -30,6 +44,7 @@ from UserStory32_CSR_ViewPreviousRequest import ViewPrevRequestPage as CSRViewPr
 
 # --------------------------------------------------------------------
 app = Flask(__name__, static_folder='static', static_url_path='/static')
+app.json = http_cache.JSONProvider(app)
 
 app.config['SECRET_KEY'] = 'super_secret_key'
 
@@ -59,30 +74,28 @@ def init_users_file():
     _ensure_file(USERS_FILE, {})
 
 def load_users():
-    """Load users.json into a dict shaped like { 'admin': {...}, 'csr': {...}, 'pin': {...} }"""
-    init_users_file()
-    try:
-        with open(USERS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data if isinstance(data, dict) else {}
-    except Exception:
-        return {}
+    """Load users into a dict shaped like { 'admin': {...}, 'csr': {...}, 'pin': {...} }"""
+    data = storage.load_doc('users', {})
+    return data if isinstance(data, dict) else {}
 
-def save_users(users):
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(users, f, indent=2)
+def save_users(users, change=None):
+    """`change`: ("upsert", role, username) when one account changed (see user_directory.py)."""
+    search_fields.stamp_users(users)
+    storage.save_doc('users', users, change)
 
 def init_requests_file():
     _ensure_file(REQUESTS_FILE, [])
 
+# Requests go through the storage backend (json by default, sqlite via STORAGE_BACKEND)
 def load_requests():
-    init_requests_file()
-    with open(REQUESTS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return request_repository.load()
 
 def save_requests(requests_data):
-    with open(REQUESTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(requests_data, f, indent=2)
+    request_repository.save_all(requests_data)
+
+def requests_view():
+    """Read-only cached snapshot for controllers/handlers that never mutate."""
+    return request_repository.view()
 
 # -- per-CSR shortlist persistence --
 def _ensure_shortlists_file():
@@ -91,33 +104,19 @@ def _ensure_shortlists_file():
             json.dump({}, f, indent=2)
 
 def load_shortlists():
-    _ensure_shortlists_file()
-    try:
-        with open(SHORTLISTS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data if isinstance(data, dict) else {}
-    except Exception:
-        return {}
+    data = storage.load_doc('shortlists', {})
+    return data if isinstance(data, dict) else {}
 
 def save_shortlists(data):
-    with open(SHORTLISTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+    storage.save_doc('shortlists', data)
 
 def verify_password(stored: str, provided: str) -> bool:
     """
     Accept both Werkzeug-hashed (scrypt/pbkdf2) and legacy plaintext passwords,
-    so existing accounts in users.json continue to work.
+    so existing accounts in users.json continue to work. Recent successful
+    checks are answered from auth_cache without re-running the hash.
     """
-    if not isinstance(stored, str):
-        return False
-    prefix = stored.split(':', 1)[0].lower() if ':' in stored else ''
-    if prefix in ('scrypt', 'pbkdf2'):
-        try:
-            return check_password_hash(stored, provided)
-        except Exception:
-            return False
-    # plaintext fallback
-    return stored == provided
+    return auth_cache.verify(stored, provided)
 
 def _require_role(role_name: str) -> bool:
     return (session.get('role') or '').lower() == role_name.lower()
@@ -135,7 +134,7 @@ def _pin_identity():
 # -----------------------------
 csr_login_controller = LoginController(
     entity=CSRUserAccount(),
-    load_users_func=lambda: load_users(),
+    load_users_func=lambda: auth_cache.directory.users(),  # read-only, no copy per login
     password_checker=verify_password
 )
 csr_login_page = LoginPage(controller=csr_login_controller)
@@ -148,56 +147,68 @@ pin_logout_page = LogoutPage(controller=pin_logout_controller)
 
 create_request_controller = CreateRequestController(
     entity=Request(),
-    load_requests_func=lambda: load_requests(),
-    save_requests_func=lambda requests_data: save_requests(requests_data)
+    load_requests_func=lambda: requests_view(),
+    save_requests_func=lambda requests_data: save_requests(requests_data),
+    insert_request_func=lambda rec: request_repository.insert(rec),
+    next_id_func=lambda: id_allocator.allocator.next('requests')
 )
 create_request_page = CreateRequestPage(controller=create_request_controller)
 
 view_request_controller = ViewRequestController(
     entity=ViewRequestEntity(),
-    load_requests_func=lambda: load_requests()
+    load_requests_func=lambda: requests_view(),
+    find_request_func=lambda rid: request_repository.get(rid)
 )
 view_request_page = ViewRequestPage(controller=view_request_controller)
 
 view_count_controller = ViewCountController(
     entity=ViewCountRequestEntity(),
-    load_requests_func=lambda: load_requests()
+    load_requests_func=lambda: requests_view(),
+    find_request_func=lambda rid: request_repository.get(rid),
+    pending_count_func=lambda rid: view_counter.pending(rid)
 )
 view_count_page = ViewCountPage(controller=view_count_controller)
 
 shortlist_count_controller = ShortlistCountController(
     entity=ShortlistCountRequestEntity(),
-    load_requests_func=lambda: load_requests()
+    load_requests_func=lambda: requests_view(),
+    find_request_func=lambda rid: request_repository.get(rid),
+    shortlist_count_func=lambda rid: shortlist_store.store.count(rid)
 )
 shortlist_count_page = ShortlistCountPage(controller=shortlist_count_controller)
 
 search_prev_request_controller = SearchPrevRequestController(
     entity=SearchPrevRequestEntity(),
-    load_requests_func=lambda: load_requests()
+    load_requests_func=lambda: load_requests(),
+    index_search_func=lambda filters, **opts: request_repository.query(filters, **opts)
 )
 search_prev_request_page = SearchPrevRequestPage(controller=search_prev_request_controller)
 
 view_prev_request_controller = ViewPrevRequestController(
     entity=ViewPrevRequestEntity(),
-    load_requests_func=lambda: load_requests()
+    load_requests_func=lambda: requests_view(),
+    find_request_func=lambda rid: request_repository.get(rid)
 )
 view_prev_request_page = ViewPrevRequestPage(controller=view_prev_request_controller)
 
 csr_search_prev_request_controller = CSRSearchPrevRequestController(
     entity=CSRSearchPrevRequestEntity(),
-    load_requests_func=lambda: load_requests()
+    load_requests_func=lambda: load_requests(),
+    index_search_func=lambda filters, **opts: request_repository.query(filters, **opts)
 )
 csr_search_prev_request_page = CSRSearchPrevRequestPage(controller=csr_search_prev_request_controller)
 
 csr_view_prev_request_controller = CSRViewPrevRequestController(
     entity=CSRViewPrevRequestEntity(),
-    load_requests_func=lambda: load_requests()
+    load_requests_func=lambda: requests_view(),
+    find_request_func=lambda rid: request_repository.get(rid)
 )
 csr_view_prev_request_page = CSRViewPrevRequestPage(controller=csr_view_prev_request_controller)
 
 csr_view_request_controller = CSRViewRequestController(
     entity=CSRViewRequestEntity(),
-    load_requests_func=lambda: load_requests()
+    load_requests_func=lambda: requests_view(),
+    find_request_func=lambda rid: request_repository.get(rid)
 )
 csr_view_request_page = CSRViewRequestPage(controller=csr_view_request_controller)
 
@@ -209,40 +220,49 @@ csr_view_shortlist_page = CSRViewShortlistPage(controller=csr_view_shortlist_con
 
 csr_search_shortlist_controller = CSRSearchSLRequestController(
     entity=CSRSearchSLRequestEntity(),
-    load_requests_func=lambda: load_requests()
+    load_requests_func=lambda: load_requests(),
+    index_search_func=lambda filters, **opts: request_repository.query(filters, **opts)
 )
 csr_search_shortlist_page = CSRSearchSLRequestPage(controller=csr_search_shortlist_controller)
 
 csr_save_shortlist_controller = CSRSaveRequestSLController(
     entity=CSRSaveRequestEntity(),
     load_requests_func=lambda: load_requests(),
-    save_requests_func=lambda requests_data: save_requests(requests_data)
+    save_requests_func=lambda requests_data: save_requests(requests_data),
+    find_request_func=lambda rid: request_repository.copy(rid),
+    update_request_func=lambda rec: request_repository.update(rec)
 )
 csr_save_shortlist_page = CSRSaveRequestPage(controller=csr_save_shortlist_controller)
 
 update_request_controller = UpdateRequestController(
     entity=UpdateRequestEntity(),
     load_requests_func=lambda: load_requests(),
-    save_requests_func=lambda requests_data: save_requests(requests_data)
+    save_requests_func=lambda requests_data: save_requests(requests_data),
+    find_request_func=lambda rid: request_repository.copy(rid),
+    update_request_func=lambda rec: request_repository.update(rec)
 )
 update_request_page = UpdateRequestPage(controller=update_request_controller)
 
 delete_request_controller = DeleteRequestController(
     entity=DeleteRequestEntity(),
     load_requests_func=lambda: load_requests(),
-    save_requests_func=lambda requests_data: save_requests(requests_data)
+    save_requests_func=lambda requests_data: save_requests(requests_data),
+    find_request_func=lambda rid: request_repository.get(rid),
+    delete_request_func=lambda rid: request_repository.delete(rid)
 )
 delete_request_page = DeleteRequestPage(controller=delete_request_controller)
 
 search_request_controller = SearchRequestController(
     entity=SearchRequestEntity(),
-    load_requests_func=lambda: load_requests()
+    load_requests_func=lambda: load_requests(),
+    index_search_func=lambda filters, **opts: request_repository.query(filters, **opts)
 )
 search_request_page = SearchRequestPage(controller=search_request_controller)
 
 csr_search_request_controller = CSRSearchRequestController(
     entity=CSRSearchRequestEntity(),
-    load_requests_func=lambda: load_requests()
+    load_requests_func=lambda: load_requests(),
+    index_search_func=lambda filters, **opts: request_repository.query(filters, **opts)
 )
 csr_search_request_page = CSRSearchRequestPage(controller=csr_search_request_controller)
 
@@ -328,10 +348,10 @@ def register():
         return jsonify({'success': False, 'message': 'Username already exists for this role.'}), 400
 
     users[role][username] = {
-        'password': generate_password_hash(password),
+        'password': auth_cache.hash_password(password),
         'username': username
     }
-    save_users(users)
+    save_users(users, change=('upsert', role, username))
     return jsonify({'success': True, 'message': 'Account created successfully!'})
 
 # Front-end (index.html) expects /api/login
@@ -354,6 +374,7 @@ def api_login():
         return jsonify({'status': 'error', 'message': login_result}), 400
 
     if login_result.get('success'):
+        auth_cache.login_succeeded(role, username, password)  # background rehash of legacy passwords
         session['username'] = username
         session['role'] = login_result.get('role', role)
         session['name'] = username
@@ -377,6 +398,7 @@ def login():
         return jsonify({'success': False, 'message': login_result}), 400
 
     if login_result.get('success'):
+        auth_cache.login_succeeded(role, username, password)  # background rehash of legacy passwords
         session['username'] = username
         session['role'] = login_result.get('role', role)
         session['name'] = username
@@ -414,44 +436,40 @@ def whoami():
 # -----------------------------
 # APIs consumed by CSR pages (unchanged)
 # -----------------------------
+def _csr_row(req):
+    """Row shape served by the CSR list endpoint (either record shape, see request_repository.py)."""
+    k = request_repository.keys(req)
+    return {
+        'id': k.id,
+        'title': req.get('title'),
+        'category': k.category,
+        'date': k.day or req.get('date'),
+        'created': k.created,
+        'status': req.get('status', 'Pending'),
+        'owner': k.owner,
+        'owner_name': k.owner,
+        'description': req.get('description', ''),
+        'location': req.get('location', ''),
+        'address': req.get('location', ''),
+        'assignedTo': req.get('assignedTo'),
+        'assignedAt': req.get('assignedAt'),
+        'viewCount': view_counter.total(req),
+        'shortlistCount': shortlist_store.store.count(req.get('id')),
+    }
+
 @app.route('/api/csr/requests', methods=['GET'])
+@http_cache.conditional('requests', 'shortlists', extra=view_counter.generation)
 def get_all_requests():
-    all_requests = load_requests()
-    formatted = []
-    for req in all_requests:
-        formatted.append({
-            'id': req.get('id'),
-            'title': req.get('title'),
-            'category': req.get('category'),
-            'date': req.get('date'),
-            'created': req.get('created', req.get('date')),
-            'status': req.get('status', 'Pending'),
-            'owner': req.get('owner'),
-            'owner_name': req.get('owner'),
-            'description': req.get('description', ''),
-            'location': req.get('location', ''),
-            'address': req.get('location', ''),
-            'assignedTo': req.get('assignedTo'),
-            'assignedAt': req.get('assignedAt'),
-            'viewCount': req.get('viewCount', 0),
-            'shortlistCount': req.get('shortlistCount', 0),
-        })
-    return jsonify(formatted)
+    # ?limit=&cursor=&sort=&count=1 -> one page, read from the sorted order
+    # indexes (only that page is formatted)
+    if pagination.wants_page(request.args):
+        payload, status = pagination.page_payload(request_repository.ordered, request.args, fmt=_csr_row)
+        return jsonify(payload), status
+    return jsonify([_csr_row(req) for req in requests_view()])
 
-def _inject_counts_and_assignment(result, request_id):
-    vc = view_count_page.showViewCount(request_id)
-    if isinstance(vc, int):
-        result['viewCount'] = vc
-    sc = shortlist_count_page.showShortlistCount(request_id)
-    if isinstance(sc, int):
-        result['shortlistCount'] = sc
-    # Pull assignment from storage
-    for r in load_requests():
-        if str(r.get('id')) == str(request_id):
-            result['assignedTo'] = r.get('assignedTo')
-            result['assignedAt'] = r.get('assignedAt')
-            break
-    return result
+def _detail_with_counts(rec):
+    """Full request record plus viewCount, shortlistCount and assignment (CSR row keys)."""
+    return {**thaw(rec), **_csr_row(rec)}
 
 @app.route('/api/requests/search', methods=['POST', 'GET'])
 def search_requests_api():
@@ -469,6 +487,11 @@ def search_requests_api():
         }
         data = {k: v for k, v in data.items() if v is not None}
 
+    # PIN users only ever see their own requests: filter by owner first
+    role = (session.get('role') or '').lower()
+    if role == 'pin' and isinstance(data, dict):
+        data['owner'] = session.get('username') or session.get('name') or ''
+
     # Run your existing search controller
     result = search_request_page.submitSearch(data)
     if isinstance(result, str) and result.startswith('Error:'):
@@ -477,7 +500,6 @@ def search_requests_api():
         return jsonify({'success': False, 'message': 'Unknown error occurred.'}), 500
 
     # 🔒 If this is a PIN user, ONLY return their own requests
-    role = (session.get('role') or '').lower()
     if role == 'pin':
         me = (session.get('username') or session.get('name') or '').strip().lower()
         owned = [
@@ -489,6 +511,19 @@ def search_requests_api():
     # Non-PIN roles (CSR/Admin/etc.) keep existing behavior
     return jsonify({'success': True, 'requests': result, 'count': len(result)})
 
+# Streamed NDJSON / CSV export with the search filters (query string);
+# a PIN user only ever exports their own requests
+@app.route('/api/requests/export', methods=['GET'])
+def export_requests_api():
+    owner = None
+    if _require_role('pin'):
+        owner = session.get('username') or session.get('name') or ''
+    try:
+        body, mimetype, headers = export_stream.export_requests(request.args, owner=owner)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return Response(body, mimetype=mimetype, headers=headers)
+
 @app.route('/api/csr/requests/search', methods=['POST', 'GET'])
 def csr_search_requests_api():
     if request.method == 'POST':
@@ -507,25 +542,22 @@ def csr_search_requests_api():
     if isinstance(result, str) and result.startswith('Error:'):
         return jsonify({'success': False, 'message': result}), 400
     if isinstance(result, list):
+        # paging parameters always come in the query string (also for POST)
+        if pagination.wants_page(request.args):
+            payload, status = pagination.page_payload(result, request.args)
+            return jsonify(payload), status
         return jsonify({'success': True, 'requests': result, 'count': len(result)})
     return jsonify({'success': False, 'message': 'Unknown error occurred.'}), 500
 
 # ---------- per-CSR shortlist (these replace the old global shortlist routes) ----------
 @app.route('/api/csr/shortlist', methods=['GET'])
+@http_cache.conditional('requests', 'shortlists', extra=view_counter.generation)
 def csr_shortlist_get():
     if not _require_role('csr'):
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     me = session.get('name') or session.get('username') or ''
-    all_reqs = load_requests()
-    sl = load_shortlists()
-    my_ids = set(sl.get(me, []))
-
-    by_id = {str(r.get('id')): r for r in all_reqs}
-    results = []
-    for rid in my_ids:
-        r = by_id.get(str(rid)) or by_id.get(str(rid).replace('REQ-',''))
-        if r:
-            results.append(r)
+    # forward index (csr -> ids) + id index: O(k) in the size of my shortlist
+    results = [r for r in map(request_repository.get, shortlist_store.store.list(me)) if r is not None]
 
     payload = []
     for r in results:
@@ -541,8 +573,8 @@ def csr_shortlist_get():
             'location': r.get('location', ''),
             'assignedTo': r.get('assignedTo'),
             'assignedAt': r.get('assignedAt'),
-            'viewCount': r.get('viewCount', 0),
-            'shortlistCount': r.get('shortlistCount', 0),
+            'viewCount': view_counter.total(r),
+            'shortlistCount': shortlist_store.store.count(r.get('id')),
         })
     return jsonify({'success': True, 'requests': payload, 'count': len(payload)})
 
@@ -551,28 +583,9 @@ def csr_shortlist_save(request_id):
     if not _require_role('csr'):
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     me = session.get('name') or session.get('username') or ''
-    rid = str(request_id if str(request_id).upper().startswith('REQ-') else f'REQ-{request_id}')
-
-    sl = load_shortlists()
-    current = sl.get(me, [])
-    if rid in current:
+    # one locked write of the shortlist document; counts come from its reverse index
+    if not shortlist_store.store.add(me, request_id):
         return jsonify({'success': True, 'message': 'Already shortlisted'}), 200
-
-    current.append(rid)
-    sl[me] = current
-    save_shortlists(sl)
-
-    # optional: keep per-request 'shortlisted_by' compatible for analytics
-    reqs = load_requests()
-    for r in reqs:
-        if str(r.get('id')) == rid or str(r.get('id')) == rid.replace('REQ-',''):
-            by = set(r.get('shortlisted_by') or [])
-            by.add(me)
-            r['shortlisted_by'] = sorted(by)
-            r['shortlisted'] = True  # legacy flag (means shortlisted by at least one person)
-            break
-    save_requests(reqs)
-
     return jsonify({'success': True, 'message': 'Saved to your shortlist'})
 
 @app.route('/api/csr/shortlist/<request_id>', methods=['DELETE'])
@@ -580,25 +593,7 @@ def csr_shortlist_remove(request_id):
     if not _require_role('csr'):
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     me = session.get('name') or session.get('username') or ''
-    rid = str(request_id if str(request_id).upper().startswith('REQ-') else f'REQ-{request_id}')
-
-    sl = load_shortlists()
-    current = sl.get(me, [])
-    if rid in current:
-        current = [x for x in current if x != rid]
-        sl[me] = current
-        save_shortlists(sl)
-        # remove my mark from per-request metadata (not others')
-        reqs = load_requests()
-        for r in reqs:
-            if str(r.get('id')) == rid or str(r.get('id')) == rid.replace('REQ-',''):
-                arr = list(r.get('shortlisted_by') or [])
-                if me in arr:
-                    arr.remove(me)
-                r['shortlisted_by'] = arr
-                r['shortlisted'] = bool(arr)  # keep true if others still have it
-                break
-        save_requests(reqs)
+    if shortlist_store.store.remove(me, request_id):
         return jsonify({'success': True, 'message': 'Removed from your shortlist'})
     return jsonify({'success': True, 'message': 'Already not in your shortlist'}), 200
 
@@ -609,10 +604,7 @@ def _is_suspended(role_key: str, username: str) -> bool:
     Return True if the user exists and is Suspended/Inactive in users.json.
     Works with your shared users.json produced by the admin app.
     """
-    data = load_users() or {}
-    rec = ((data.get(role_key) or {}).get(username or "")) or {}
-    status = (rec.get("status") or "").strip().lower()
-    return status in ("suspended", "inactive")
+    return auth_cache.directory.is_suspended(role_key, username)
 
 
 # ---------- View Count (read) ----------
@@ -624,36 +616,16 @@ def get_request_view_count(request_id):
     return jsonify({'success': True, 'viewCount': result})
 
 # ---------- View Count (increment & persist) ----------
-def _canon_req_id(rid):
-    s = str(rid).strip()
-    if s.upper().startswith("REQ-"):
-        s = s.split("-", 1)[1]
-    return f"REQ-{s}"
-
-def _req_plain_id(s):
-    if isinstance(s, int):
-        return str(s)
-    s = str(s)
-    return s.split('-', 1)[1] if s.upper().startswith('REQ-') else s
-
 def _now_iso():
     return datetime.now(timezone.utc).isoformat(timespec='seconds')
 
 def _increment_view_count(request_id: str, by: int = 1) -> int:
-    """Persistently increment viewCount on the request and return new count."""
-    cid = _canon_req_id(request_id)
-    reqs = load_requests()
-    new_val = None
-    for r in reqs:
-        if _canon_req_id(r.get('id')) == cid:
-            r['viewCount'] = int(r.get('viewCount', 0) or 0) + by
-            r['lastViewedAt'] = _now_iso()
-            new_val = r['viewCount']
-            break
-    if new_val is None:
+    """Record a view (persisted in batches by view_counter) and return the new count."""
+    r = request_repository.get(request_id)
+    if r is None:
         return 0
-    save_requests(reqs)
-    return new_val
+    view_counter.add(r.get('id'), by)
+    return view_counter.total(r)
 
 @app.route('/api/requests/<request_id>/views', methods=['POST'])
 def increment_request_view_count(request_id):
@@ -667,20 +639,55 @@ def get_request_shortlist_count(request_id):
         return jsonify({'success': False, 'message': result}), 404
     return jsonify({'success': True, 'shortlistCount': result})
 
+# ---------- Live changes (server-sent events, see change_feed.py) ----------
+@app.route('/api/events', methods=['GET'])
+def change_events():
+    role, user = change_feed.session_identity(session)
+    if not role:
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    body, mimetype, headers = change_feed.sse_response_args(role, user, last_id)
+    return Response(body, mimetype=mimetype, headers=headers)
+
+# ---------- Batch detail + counts (one round trip for dashboards) ----------
+BATCH_MAX_IDS = int(os.environ.get('BATCH_MAX_IDS') or 500)
+
+@app.route('/api/requests/batch', methods=['GET', 'POST'])
+def get_requests_batch():
+    """
+    Details + viewCount + shortlistCount + assignment for many requests.
+    POST {"ids": [...], "inc": true} or GET ?ids=REQ-1,REQ-2&inc=1.
+    With inc, one view is recorded for every request found (in one step).
+    """
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        ids, inc = body.get('ids'), bool(body.get('inc'))
+    else:
+        ids = [i for i in (request.args.get('ids') or '').split(',') if i.strip()]
+        inc = (request.args.get('inc') or '').strip() == '1'
+    if not isinstance(ids, list) or not ids:
+        return jsonify({'success': False, 'message': 'Error: ids must be a non-empty list.'}), 400
+    if len(ids) > BATCH_MAX_IDS:
+        return jsonify({'success': False, 'message': f'Error: At most {BATCH_MAX_IDS} ids per batch.'}), 400
+
+    storage.requests_view()  # one snapshot; every id below resolves against it
+    found, missing = [], []
+    for rid in dict.fromkeys(str(i).strip() for i in ids):
+        rec = storage.request_index.get(rid)
+        (found if rec is not None else missing).append(rec if rec is not None else rid)
+    if inc:
+        view_counter.add_many(r.get('id') for r in found)
+    return jsonify({'success': True, 'requests': [_detail_with_counts(r) for r in found],
+                    'missing': missing, 'count': len(found)})
+
 @app.route('/api/requests/completed/<request_id>', methods=['GET'])
 def get_completed_request_detail(request_id):
     result = view_prev_request_page.getRequestDetail(request_id, requestStatus='Completed')
     if isinstance(result, str) and result.startswith('Error:'):
         return jsonify({'success': False, 'message': result}), 404
     if isinstance(result, dict):
-        # ensure we return persisted viewCount
-        reqs = load_requests()
-        vc = 0
-        for r in reqs:
-            if _canon_req_id(r.get('id')) == _canon_req_id(request_id):
-                vc = int(r.get('viewCount', 0) or 0)
-                break
-        result['viewCount'] = vc
+        # persisted + pending viewCount
+        result['viewCount'] = view_counter.total(request_repository.get(request_id))
         sc = shortlist_count_page.showShortlistCount(request_id)
         if isinstance(sc, int):
             result['shortlistCount'] = sc
@@ -693,13 +700,7 @@ def csr_get_completed_request_detail(request_id):
     if isinstance(result, str) and result.startswith('Error:'):
         return jsonify({'success': False, 'message': result}), 404
     if isinstance(result, dict):
-        reqs = load_requests()
-        vc = 0
-        for r in reqs:
-            if _canon_req_id(r.get('id')) == _canon_req_id(request_id):
-                vc = int(r.get('viewCount', 0) or 0)
-                break
-        result['viewCount'] = vc
+        result['viewCount'] = view_counter.total(request_repository.get(request_id))
         sc = shortlist_count_page.showShortlistCount(request_id)
         if isinstance(sc, int):
             result['shortlistCount'] = sc
@@ -713,35 +714,21 @@ def max_csr_assign_request(request_id):
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     me = session.get('name') or session.get('username') or 'CSR'
 
-    rid = _req_plain_id(request_id)
-    reqs = load_requests()
-    found = next((r for r in reqs if _req_plain_id(r.get('id')) == rid), None)
+    # compare-and-swap on the record version; re-applied if another writer won
+    found = request_repository.modify(request_id, bulk_requests.mutation('assign', me), event='assign')
     if not found:
         return jsonify({'success': False, 'message': 'Not found'}), 404
-
-    found['assignedTo'] = me
-    found['assignedAt'] = _now_iso()
-    if (found.get('status') or '').lower() != 'completed':
-        found['status'] = 'in progress'
-    save_requests(reqs)
     return jsonify({'success': True, 'request': found})
 
 @app.route('/api/csr/requests/<request_id>/assign', methods=['DELETE'])
 def max_csr_unassign_request(request_id):
     if not session.get('role'):
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    me = session.get('name') or session.get('username') or 'CSR'
 
-    rid = _req_plain_id(request_id)
-    reqs = load_requests()
-    found = next((r for r in reqs if _req_plain_id(r.get('id')) == rid), None)
+    found = request_repository.modify(request_id, bulk_requests.mutation('unassign', me), event='unassign')
     if not found:
         return jsonify({'success': False, 'message': 'Not found'}), 404
-
-    found['assignedTo'] = None
-    found['assignedAt'] = None
-    if (found.get('status') or '').lower() != 'completed':
-        found['status'] = 'pending'
-    save_requests(reqs)
     return jsonify({'success': True, 'request': found})
 
 @app.route('/api/csr/requests/<request_id>/complete', methods=['POST'])
@@ -750,20 +737,20 @@ def max_csr_complete_request(request_id):
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     me = session.get('name') or session.get('username') or 'CSR'
 
-    rid = _req_plain_id(request_id)
-    reqs = load_requests()
-    found = next((r for r in reqs if _req_plain_id(r.get('id')) == rid), None)
+    found = request_repository.modify(request_id, bulk_requests.mutation('complete', me), event='complete')
     if not found:
         return jsonify({'success': False, 'message': 'Not found'}), 404
-
-    found['status'] = 'Completed'
-    found['completedAt'] = _now_iso()
-    if not found.get('assignedTo'):
-        found['assignedTo'] = me
-        found['assignedAt'] = _now_iso()
-    save_requests(reqs)
     return jsonify({'success': True, 'request': found})
 
+# One action (assign / unassign / complete / status) for many requests, one write
+@app.route('/api/csr/requests/bulk', methods=['POST'])
+def max_csr_bulk_update():
+    if not session.get('role'):
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    me = session.get('name') or session.get('username') or 'CSR'
+    payload, status = bulk_requests.update_payload(request.get_json(silent=True) or {}, me)
+    return jsonify(payload), status
+
 # ---- CRUD for PIN requests ----
 @app.route('/api/requests', methods=['POST'])
 def create_request_api():
@@ -786,22 +773,41 @@ def create_request_api():
     if isinstance(result, str) and result.startswith('Error:'):
         return jsonify({'success': False, 'message': result}), 400
     if isinstance(result, dict):
+        if data.get('id'):
+            id_allocator.allocator.observe('requests', result.get('id'))
         # normalize the created field if caller provided it
         if 'created' in data:
             result['created'] = data.get('created')
         # also persist owner if BCE didn’t set it
         if owner_to_use and not result.get('owner'):
             result['owner'] = owner_to_use
-            reqs = load_requests()
-            for r in reqs:
-                if str(r.get('id')) == str(result.get('id')):
-                    r['owner'] = owner_to_use
-                    break
-            save_requests(reqs)
+            request_repository.modify(result.get('id'), lambda rec: rec.update(owner=owner_to_use))
         return jsonify({'success': True, 'request': result})
     return jsonify({'success': False, 'message': 'Unknown error occurred.'}), 500
 
+# Bulk import: JSON array / JSON lines / CSV body, validated with the
+# UserStory13 rules, ids allocated as a block, one write for all rows.
+@app.route('/api/requests/bulk', methods=['POST'])
+def bulk_import_requests():
+    owner_username, _owner_disp = _pin_identity()
+    try:
+        fmt = bulk_requests.detect_format(request.args.get('format'), request.content_type)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    flag = lambda name: (request.args.get(name) or '').strip().lower() in ('1', 'true', 'yes')
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    payload, status = bulk_requests.import_payload(
+        stream, fmt,
+        owner=owner_username,
+        force_owner=bool(owner_username),  # a PIN imports for themselves, like POST /api/requests
+        dry_run=flag('dryRun'),
+        atomic=flag('atomic'),
+    )
+    return jsonify(payload), status
+
 @app.route('/api/requests/<request_id>', methods=['GET'])
+@http_cache.conditional('requests', 'shortlists', extra=view_counter.generation,
+                         skip=lambda: (request.args.get('inc') or '').strip() == '1')
 def get_request_detail(request_id):
     # optional auto-increment: /api/requests/<id>?inc=1
     if (request.args.get('inc') or '').strip() == '1':
@@ -811,14 +817,8 @@ def get_request_detail(request_id):
     if isinstance(result, str) and result.startswith('Error:'):
         return jsonify({'success': False, 'message': result}), 404
     if isinstance(result, dict):
-        # return persisted viewCount (after optional increment above)
-        reqs = load_requests()
-        vc = 0
-        for r in reqs:
-            if _canon_req_id(r.get('id')) == _canon_req_id(request_id):
-                vc = int(r.get('viewCount', 0) or 0)
-                break
-        result['viewCount'] = vc
+        # persisted + pending viewCount (after optional increment above)
+        result['viewCount'] = view_counter.total(request_repository.get(request_id))
 
         sc = shortlist_count_page.showShortlistCount(request_id)
         if isinstance(sc, int):
@@ -838,14 +838,8 @@ def csr_get_request_detail(request_id):
         return jsonify({'success': False, 'message': result}), 404
 
     if isinstance(result, dict):
-        # return persisted viewCount
-        reqs = load_requests()
-        vc = 0
-        for r in reqs:
-            if _canon_req_id(r.get('id')) == _canon_req_id(request_id):
-                vc = int(r.get('viewCount', 0) or 0)
-                break
-        result['viewCount'] = vc
+        # persisted + pending viewCount
+        result['viewCount'] = view_counter.total(request_repository.get(request_id))
         sc = shortlist_count_page.showShortlistCount(request_id)
         if isinstance(sc, int):
             result['shortlistCount'] = sc
@@ -864,43 +858,48 @@ def _owns(rec, me: str) -> bool:
     return owner.lower() == me.lower()
 
 @app.route('/api/pin/requests', methods=['GET'])
+@http_cache.conditional('requests')
 def pin_list_my_requests():
     """List only the logged-in PIN user's own requests."""
     uname, _ = _pin_identity()
     if not uname:
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
 
-    rows = []
-    for r in load_requests():
-        if _owns(r, uname):
-            rows.append({
-                'id': r.get('id'),
-                'title': r.get('title'),
-                'category': r.get('category'),
-                'date': r.get('date'),
-                'created': r.get('created', r.get('date')),
-                'status': r.get('status', 'Pending'),
-                'owner': r.get('owner'),
-                'description': r.get('description', ''),
-                'location': r.get('location', ''),
-            })
+    def row(r):
+        return {
+            'id': r.get('id'),
+            'title': r.get('title'),
+            'category': r.get('category'),
+            'date': r.get('date'),
+            'created': r.get('created', r.get('date')),
+            'status': r.get('status', 'Pending'),
+            'owner': r.get('owner'),
+            'description': r.get('description', ''),
+            'location': r.get('location', ''),
+        }
+
+    mine = [r for r in request_repository.query({'owner': uname}, exact=('owner',)) if _owns(r, uname)]
+    if pagination.wants_page(request.args):
+        payload, status = pagination.page_payload(mine, request.args, fmt=row)
+        return jsonify(payload), status
+    rows = [row(r) for r in mine]
     return jsonify({'success': True, 'requests': rows, 'count': len(rows)})
 
 @app.route('/api/pin/requests/<request_id>', methods=['GET'])
+@http_cache.conditional('requests', 'shortlists', extra=view_counter.generation)
 def pin_get_request_detail(request_id):
     """Return details only if the request belongs to the logged-in PIN user."""
     uname, _ = _pin_identity()
     if not uname:
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
 
-    reqs = load_requests()
-    rec = next((r for r in reqs if str(r.get('id')) == str(request_id) or _canon_req_id(r.get('id')) == _canon_req_id(request_id)), None)
+    rec = request_repository.copy(request_id)
     if not rec or not _owns(rec, uname):
         return jsonify({'success': False, 'message': 'Not found'}), 404
 
     # include persisted counts
     rec_copy = dict(rec)
-    rec_copy['viewCount'] = int(rec.get('viewCount', 0) or 0)
+    rec_copy['viewCount'] = view_counter.total(rec)
     sc = shortlist_count_page.showShortlistCount(request_id)
     if isinstance(sc, int):
         rec_copy['shortlistCount'] = sc
@@ -927,6 +926,9 @@ def pin_search_my_requests():
         }
         data = {k: v for k, v in data.items() if v is not None}
 
+    # owner filter goes first, so only this user's requests are examined
+    if isinstance(data, dict):
+        data['owner'] = uname
     result = search_request_page.submitSearch(data)
     if isinstance(result, str) and result.startswith('Error:'):
         return jsonify({'success': False, 'message': result}), 400
@@ -975,9 +977,19 @@ def delete_request(request_id):
     if isinstance(result, str) and result.startswith('Error:'):
         return jsonify({'success': False, 'message': result}), 404
     if isinstance(result, str) and 'deleted successfully' in result:
+        shortlist_store.store.forget(request_id)  # drop it from every CSR's shortlist
         return jsonify({'success': True, 'message': result})
     return jsonify({'success': False, 'message': 'Unknown error occurred.'}), 500
 
+# -----------------------------
+# Platform reports (pre-aggregated, see report_engine.py)
+# -----------------------------
+@app.route('/api/reports', methods=['GET'])
+@http_cache.conditional(*report_engine.SOURCE_DOCS, extra=report_engine.today)
+def api_reports():
+    payload, status = report_engine.report_payload(request.args)
+    return jsonify(payload), status
+
 # -----------------------------
 # Legacy WTForms demo page
 # -----------------------------
@@ -29,10 +29,13 @@ class CreateRequestPage:
 
 # --- Controller ---
 class CreateRequestController:
-    def __init__(self, entity=None, load_requests_func=None, save_requests_func=None):
+    def __init__(self, entity=None, load_requests_func=None, save_requests_func=None, insert_request_func=None,
+                 next_id_func=None):
         self.entity = entity or Request()
         self.load_requests = load_requests_func
         self.save_requests = save_requests_func
+        self.insert_request = insert_request_func
+        self.next_id = next_id_func
 
     def createRequest(self, requestTitle, requestDescription, requestCategory, requestDate, requestLocation, 
                      owner=None, time=None, request_id=None) -> str:
@@ -58,6 +61,8 @@ class CreateRequestController:
             requestLocation,
             load_requests_func=self.load_requests,
             save_requests_func=self.save_requests,
+            insert_request_func=self.insert_request,
+            next_id_func=self.next_id,
             owner=owner,
             time=time,
             request_id=request_id
@@ -76,7 +81,8 @@ class Request:
         self._requestLocation = None
 
     def createRequest(self, requestTitle, requestDescription, requestCategory, requestDate, requestLocation, 
-                     load_requests_func=None, save_requests_func=None, owner=None, time=None, request_id=None) -> str:
+                     load_requests_func=None, save_requests_func=None, owner=None, time=None, request_id=None,
+                     insert_request_func=None, next_id_func=None) -> str:
 
         # Set entity attributes
         self._requestTitle = requestTitle
@@ -91,9 +97,11 @@ class Request:
         else:
             return "Error: load_requests function not provided."
         
-        # Generate new request ID
+        # Generate new request ID (from the id sequence when one is provided)
         if request_id:
             self._requestID = request_id
+        elif next_id_func:
+            self._requestID = next_id_func()
         else:
             self._requestID = len(all_requests) + 100
         
@@ -111,7 +119,13 @@ class Request:
             'created': datetime.now().isoformat()
         }
         
-        # Save to storage
+        # Save to storage (single-record insert when available)
+        if insert_request_func:
+            try:
+                insert_request_func(new_request)
+                return new_request
+            except Exception as e:
+                return f"Error saving request: {str(e)}"
         if save_requests_func:
             all_requests.append(new_request)
             try:
@@ -16,9 +16,10 @@ class ViewRequestPage:
 
 # --- Controller ---
 class ViewRequestController:
-    def __init__(self, entity=None, load_requests_func=None):
+    def __init__(self, entity=None, load_requests_func=None, find_request_func=None):
         self.entity = entity or ViewRequestEntity()
         self.load_requests = load_requests_func
+        self.find_request = find_request_func
 
     def getRequestDetail(self, requestID) -> str:
         # Validate required input
@@ -28,7 +29,8 @@ class ViewRequestController:
         # Delegate to entity
         result = self.entity.getRequestDetail(
             requestID,
-            load_requests_func=self.load_requests
+            load_requests_func=self.load_requests,
+            find_request_func=self.find_request
         )
         return result
 
@@ -46,26 +48,22 @@ class ViewRequestEntity:
         self._requestLocation = None
         self._CSRRepInCharge = None
 
-    def getRequestDetail(self, requestID, load_requests_func=None) -> str:
+    def getRequestDetail(self, requestID, load_requests_func=None, find_request_func=None) -> str:
 
-        # Load requests from storage
-        if load_requests_func:
-            all_requests = load_requests_func()
+        # Resolve the request: O(1) through the id index when available
+        if find_request_func:
+            request_found = find_request_func(requestID)
+        elif load_requests_func:
+            request_found = None
+            for req in load_requests_func():
+                req_id = str(req.get('id', '')).strip()
+                request_id_str = str(requestID).strip()
+                if req_id == request_id_str or req_id.replace('REQ-', '') == request_id_str.replace('REQ-', ''):
+                    request_found = req
+                    break
         else:
             return "Error: load_requests function not provided."
         
-        # Find the request by ID
-        request_found = None
-        for req in all_requests:
-            
-            req_id = str(req.get('id', '')).strip()
-            request_id_str = str(requestID).strip()
-            
-           
-            if req_id == request_id_str or req_id.replace('REQ-', '') == request_id_str.replace('REQ-', ''):
-                request_found = req
-                break
-        
         if not request_found:
             return f"Error: Request with ID '{requestID}' not found."
         
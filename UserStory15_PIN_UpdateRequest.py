@@ -18,10 +18,13 @@ class UpdateRequestPage:
 
 # --- Controller ---
 class UpdateRequestController:
-    def __init__(self, entity=None, load_requests_func=None, save_requests_func=None):
+    def __init__(self, entity=None, load_requests_func=None, save_requests_func=None,
+                 find_request_func=None, update_request_func=None):
         self.entity = entity or Request()
         self.load_requests = load_requests_func
         self.save_requests = save_requests_func
+        self.find_request = find_request_func
+        self.update_request = update_request_func
 
     def submitUpdate(self, data) -> str:
         # Validate required input
@@ -32,6 +35,17 @@ class UpdateRequestController:
         if not requestID:
             return "Error: Request ID is required."
         
+        # Single-record path: look up and write back just this request
+        if self.find_request and self.update_request:
+            request_found = self.find_request(requestID)
+            if not request_found:
+                return f"Error: Request with ID '{requestID}' not found."
+            return self.entity.submitUpdate(
+                request_found,
+                data,
+                update_request_func=self.update_request
+            )
+
         # Load existing requests
         if not self.load_requests:
             return "Error: load_requests function not provided."
@@ -75,7 +89,8 @@ class Request:
         self._requestDate = None
         self._requestLocation = None
 
-    def submitUpdate(self, request_data, update_data, save_requests_func=None, all_requests=None, request_index=-1) -> str:
+    def submitUpdate(self, request_data, update_data, save_requests_func=None, all_requests=None, request_index=-1,
+                     update_request_func=None) -> str:
         # Extract update fields from data
         newTitle = update_data.get('title') or update_data.get('requestTitle')
         newCategory = update_data.get('category') or update_data.get('requestCategory')
@@ -126,7 +141,13 @@ class Request:
         # Update last_updated timestamp
         request_data['last_updated'] = datetime.now().isoformat()
         
-        # Save updated requests
+        # Save updated request(s)
+        if update_request_func:
+            try:
+                update_request_func(request_data)
+                return request_data
+            except Exception as e:
+                return f"Error saving updated request: {str(e)}"
         if save_requests_func and all_requests is not None:
             try:
                 save_requests_func(all_requests)
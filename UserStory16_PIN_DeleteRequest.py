@@ -20,16 +20,30 @@ class DeleteRequestPage:
 
 # --- Controller ---
 class DeleteRequestController:
-    def __init__(self, entity=None, load_requests_func=None, save_requests_func=None):
+    def __init__(self, entity=None, load_requests_func=None, save_requests_func=None,
+                 find_request_func=None, delete_request_func=None):
         self.entity = entity or Request()
         self.load_requests = load_requests_func
         self.save_requests = save_requests_func
+        self.find_request = find_request_func
+        self.delete_request = delete_request_func
 
     def deleteRequest(self, requestID) -> str:
         # Validate required input
         if not requestID:
             return "Error: Request ID is required."
         
+        # Single-record path: look up and remove just this request
+        if self.find_request and self.delete_request:
+            request_found = self.find_request(requestID)
+            if not request_found:
+                return f"Error: Request with ID '{requestID}' not found."
+            return self.entity.deleteRequest(
+                requestID,
+                delete_request_func=self.delete_request,
+                request_found=request_found
+            )
+
         # Load existing requests
         if not self.load_requests:
             return "Error: load_requests function not provided."
@@ -67,10 +81,18 @@ class Request:
     def __init__(self):
         self._requestID = None
 
-    def deleteRequest(self, requestID, save_requests_func=None, all_requests=None, request_index=-1) -> str:
+    def deleteRequest(self, requestID, save_requests_func=None, all_requests=None, request_index=-1,
+                      delete_request_func=None, request_found=None) -> str:
         # Set entity attribute
         self._requestID = requestID
         
+        if delete_request_func and request_found is not None:
+            try:
+                delete_request_func(request_found.get('id'))
+                return f"Request '{requestID}' deleted successfully."
+            except Exception as e:
+                return f"Error saving after deletion: {str(e)}"
+
         # Remove request from list
         if all_requests is not None and request_index >= 0:
             deleted_request = all_requests.pop(request_index)
@@ -3,6 +3,8 @@
 # BCE Structure
 # ============================================
 
+from search_fields import plain_id, request_shadow
+
 
 # --- Boundary ---
 class SearchRequestPage:
@@ -16,15 +18,23 @@ class SearchRequestPage:
 
 # --- Controller ---
 class SearchRequestController:
-    def __init__(self, entity=None, load_requests_func=None):
+    def __init__(self, entity=None, load_requests_func=None, index_search_func=None):
         self.entity = entity or Request()
         self.load_requests = load_requests_func
+        self.index_search = index_search_func
 
     def searchRequest(self, data) -> str:
         # Validate input (allow empty dict to return all requests)
         if data is None or not isinstance(data, dict):
             return "Error: Search data must be a dictionary."
         
+        # Indexed path: only the requests matching the filters are loaded
+        if self.index_search:
+            return self.entity.searchRequest(
+                data,
+                index_search_func=self.index_search
+            )
+        
         # Load existing requests
         if not self.load_requests:
             return "Error: load_requests function not provided."
@@ -49,7 +59,9 @@ class Request:
         self._requestDate = None
         self._requestStatus = None
 
-    def searchRequest(self, data, all_requests=None) -> str:
+    KEYWORD_FIELDS = ('title', 'description', 'category')
+
+    def searchRequest(self, data, all_requests=None, index_search_func=None) -> str:
         # Extract search criteria
         searchID = data.get('id') or data.get('requestID')
         searchTitle = data.get('title') or data.get('requestTitle')
@@ -57,67 +69,70 @@ class Request:
         searchDate = data.get('date') or data.get('requestDate')
         searchStatus = data.get('status') or data.get('requestStatus')
         searchKeyword = data.get('keyword') or data.get('search')
+        searchOwner = data.get('owner')
         
         # If no search criteria provided, return all requests
-        if not any([searchID, searchTitle, searchCategory, searchDate, searchStatus, searchKeyword]):
+        if not any([searchID, searchTitle, searchCategory, searchDate, searchStatus, searchKeyword, searchOwner]):
+            if index_search_func:
+                return index_search_func({})
             if all_requests:
                 return all_requests
             else:
                 return []
         
-        # Filter requests based on search criteria
-        matched_requests = []
+        # Narrow the candidates with the secondary / full-text indexes; the
+        # checks below still run on them, except the keyword one (the index
+        # matches words and ranks the hits)
+        indexed = bool(index_search_func)
+        if indexed:
+            all_requests = index_search_func(
+                {'id': searchID, 'status': searchStatus, 'category': searchCategory,
+                 'date': searchDate, 'owner': searchOwner},
+                keyword=searchKeyword,
+                keyword_fields=self.KEYWORD_FIELDS,
+                exact=('owner',)
+            )
         
+        # Filter requests based on search criteria: the query is normalized
+        # once, each request is compared through its stored shadow fields
+        # (see search_fields.py)
+        search_id_str = plain_id(searchID)
+        search_title_str = str(searchTitle or '').lower()
+        search_category_str = str(searchCategory or '').lower()
+        search_date_str = str(searchDate or '').strip()
+        search_status_str = str(searchStatus or '').lower()
+        search_owner_str = str(searchOwner or '').strip().lower()
+        keyword = str(searchKeyword).lower() if searchKeyword and not indexed else ''
+
+        matched_requests = []
+
         for req in all_requests or []:
-            match = True
-            
+            s = request_shadow(req)
+
             # Search by ID
-            if searchID:
-                req_id = str(req.get('id', '')).strip()
-                search_id_str = str(searchID).strip()
-                if not (req_id == search_id_str or req_id.replace('REQ-', '') == search_id_str.replace('REQ-', '')):
-                    match = False
-            
-            # Search by title
-            if match and searchTitle:
-                req_title = str(req.get('title', '')).lower()
-                search_title_str = str(searchTitle).lower()
-                if search_title_str not in req_title:
-                    match = False
-            
-            # Search by category
-            if match and searchCategory:
-                req_category = str(req.get('category', '')).lower()
-                search_category_str = str(searchCategory).lower()
-                if search_category_str not in req_category:
-                    match = False
-            
-            # Search by date
-            if match and searchDate:
-                req_date = str(req.get('date', '')).strip()
-                search_date_str = str(searchDate).strip()
-                if search_date_str not in req_date:
-                    match = False
-            
-            # Search by status
-            if match and searchStatus:
-                req_status = str(req.get('status', '')).lower()
-                search_status_str = str(searchStatus).lower()
-                if search_status_str not in req_status:
-                    match = False
-            
+            if searchID and s['id'] != search_id_str:
+                continue
+
+            # Search by title / category / date / status
+            if searchTitle and search_title_str not in s['title']:
+                continue
+            if searchCategory and search_category_str not in s['category']:
+                continue
+            if searchDate and search_date_str not in s['date']:
+                continue
+            if searchStatus and search_status_str not in s['status']:
+                continue
+
+            # Search by owner (exact username, as used for PIN users)
+            if searchOwner and s['owner'] != search_owner_str:
+                continue
+
             # Search by keyword (searches in title, description, category)
-            if match and searchKeyword:
-                keyword = str(searchKeyword).lower()
-                req_title = str(req.get('title', '')).lower()
-                req_description = str(req.get('description', '')).lower()
-                req_category = str(req.get('category', '')).lower()
-                
-                if keyword not in req_title and keyword not in req_description and keyword not in req_category:
-                    match = False
-            
-            if match:
-                matched_requests.append(req)
-        
+            if keyword and keyword not in s['title'] and keyword not in s['description'] \
+                    and keyword not in s['category']:
+                continue
+
+            matched_requests.append(req)
+
         return matched_requests
 
@@ -3,6 +3,8 @@
 # BCE Structure
 # ============================================
 
+from search_fields import plain_id, request_shadow
+
 
 # --- Boundary ---
 class SearchSLRequestPage:
@@ -16,9 +18,10 @@ class SearchSLRequestPage:
 
 # --- Controller ---
 class SearchSLRequestController:
-    def __init__(self, entity=None, load_requests_func=None):
+    def __init__(self, entity=None, load_requests_func=None, index_search_func=None):
         self.entity = entity or Request()
         self.load_requests = load_requests_func
+        self.index_search = index_search_func
 
     def searchRequest(self, shortlisted=True, data=None) -> str:
         # Validate input
@@ -30,6 +33,14 @@ class SearchSLRequestController:
         if shortlisted is None:
             shortlisted = True
 
+        # Indexed path: only the requests matching the filters are loaded
+        if self.index_search:
+            return self.entity.searchRequest(
+                shortlisted=shortlisted,
+                data=data,
+                index_search_func=self.index_search
+            )
+
         # Load existing requests
         if not self.load_requests:
             return "Error: load_requests function not provided."
@@ -63,8 +74,7 @@ class Request:
             if isinstance(value, bool) and value:
                 return True
 
-        status = str(req.get('status', '')).lower()
-        if status == 'shortlisted':
+        if request_shadow(req)['status'] == 'shortlisted':
             return True
 
         list_keys = ['shortlisted_by', 'favorites', 'shortlist']
@@ -77,7 +87,9 @@ class Request:
 
         return False
 
-    def searchRequest(self, shortlisted=True, data=None, all_requests=None) -> str:
+    KEYWORD_FIELDS = ('title', 'description', 'category')
+
+    def searchRequest(self, shortlisted=True, data=None, all_requests=None, index_search_func=None) -> str:
         if data is None:
             data = {}
 
@@ -91,6 +103,25 @@ class Request:
         searchStatus = data.get('status') or data.get('requestStatus')
         searchKeyword = data.get('keyword') or data.get('search')
 
+        # Narrow the candidates with the secondary / full-text indexes; the
+        # checks below still run on them, except the keyword one
+        indexed = bool(index_search_func)
+        if indexed:
+            all_requests = index_search_func(
+                {'id': searchID, 'status': searchStatus, 'category': searchCategory, 'date': searchDate},
+                keyword=searchKeyword,
+                keyword_fields=self.KEYWORD_FIELDS
+            )
+
+        # query normalized once; requests compared through their stored
+        # shadow fields (see search_fields.py)
+        search_id_str = plain_id(searchID)
+        search_title_str = str(searchTitle or '').lower()
+        search_category_str = str(searchCategory or '').lower()
+        search_date_str = str(searchDate or '').strip()
+        search_status_str = str(searchStatus or '').lower()
+        keyword = str(searchKeyword).lower() if searchKeyword and not indexed else ''
+
         matched_requests = []
 
         for req in all_requests:
@@ -98,44 +129,22 @@ class Request:
             if shortlisted and not is_shortlisted:
                 continue
 
-            match = True
-
-            if searchID:
-                req_id = str(req.get('id', '')).strip()
-                search_id_str = str(searchID).strip()
-                if not (req_id == search_id_str or req_id.replace('REQ-', '') == search_id_str.replace('REQ-', '')):
-                    match = False
-
-            if match and searchTitle:
-                req_title = str(req.get('title', '')).lower()
-                if str(searchTitle).lower() not in req_title:
-                    match = False
-
-            if match and searchCategory:
-                req_category = str(req.get('category', '')).lower()
-                if str(searchCategory).lower() not in req_category:
-                    match = False
-
-            if match and searchDate:
-                req_date = str(req.get('date', '')).strip()
-                if str(searchDate).strip() not in req_date:
-                    match = False
-
-            if match and searchStatus:
-                req_status = str(req.get('status', '')).lower()
-                if str(searchStatus).lower() not in req_status:
-                    match = False
-
-            if match and searchKeyword:
-                keyword = str(searchKeyword).lower()
-                req_title = str(req.get('title', '')).lower()
-                req_description = str(req.get('description', '')).lower()
-                req_category = str(req.get('category', '')).lower()
-
-                if keyword not in req_title and keyword not in req_description and keyword not in req_category:
-                    match = False
-
-            if match:
-                matched_requests.append(req)
+            s = request_shadow(req)
+
+            if searchID and s['id'] != search_id_str:
+                continue
+            if searchTitle and search_title_str not in s['title']:
+                continue
+            if searchCategory and search_category_str not in s['category']:
+                continue
+            if searchDate and search_date_str not in s['date']:
+                continue
+            if searchStatus and search_status_str not in s['status']:
+                continue
+            if keyword and keyword not in s['title'] and keyword not in s['description'] \
+                    and keyword not in s['category']:
+                continue
+
+            matched_requests.append(req)
 
         return matched_requests
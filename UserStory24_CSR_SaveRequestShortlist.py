@@ -16,15 +16,26 @@ class SaveRequestPage:
 
 # --- Controller ---
 class SaveRequestSLController:
-    def __init__(self, entity=None, load_requests_func=None, save_requests_func=None):
+    def __init__(self, entity=None, load_requests_func=None, save_requests_func=None,
+                 find_request_func=None, update_request_func=None):
         self.entity = entity or Request()
         self.load_requests = load_requests_func
         self.save_requests = save_requests_func
+        self.find_request = find_request_func
+        self.update_request = update_request_func
 
     def saveRequestSL(self, requestID) -> str:
         if not requestID or not str(requestID).strip():
             return "Error: Request ID is required."
 
+        # Single-record path: look up and write back just this request
+        if self.find_request and self.update_request:
+            return self.entity.saveRequestSL(
+                requestID,
+                request_found=self.find_request(requestID),
+                update_request_func=self.update_request
+            )
+
         if not self.load_requests:
             return "Error: load_requests function not provided."
         if not self.save_requests:
@@ -45,16 +56,17 @@ class Request:
     def __init__(self):
         self._requestID = None
 
-    def saveRequestSL(self, requestID, all_requests=None, save_requests_func=None) -> str:
+    def saveRequestSL(self, requestID, all_requests=None, save_requests_func=None,
+                      request_found=None, update_request_func=None) -> str:
         if all_requests is None:
             all_requests = []
 
-        request_found = None
-        for req in all_requests:
-            req_id = str(req.get('id', '')).strip()
-            if req_id == str(requestID).strip() or req_id.replace('REQ-', '') == str(requestID).strip().replace('REQ-', ''):
-                request_found = req
-                break
+        if request_found is None:
+            for req in all_requests:
+                req_id = str(req.get('id', '')).strip()
+                if req_id == str(requestID).strip() or req_id.replace('REQ-', '') == str(requestID).strip().replace('REQ-', ''):
+                    request_found = req
+                    break
 
         if not request_found:
             return f"Error: Request with ID '{requestID}' not found."
@@ -110,6 +122,13 @@ class Request:
 
         self._requestID = requestID
 
+        if update_request_func:
+            try:
+                update_request_func(request_found)
+                return f"Request '{requestID}' saved to shortlist successfully."
+            except Exception as e:
+                return f"Error saving shortlist update: {str(e)}"
+
         if save_requests_func:
             try:
                 save_requests_func(all_requests)
@@ -16,20 +16,24 @@ class ViewCountPage:
 
 # --- Controller ---
 class ViewCountController:
-    def __init__(self, entity=None, load_requests_func=None):
+    def __init__(self, entity=None, load_requests_func=None, find_request_func=None, pending_count_func=None):
         self.entity = entity or Request()
         self.load_requests = load_requests_func
+        self.find_request = find_request_func
+        self.pending_count = pending_count_func
 
     def showViewCount(self, requestID) -> int:
         if not requestID or not str(requestID).strip():
             return "Error: Request ID is required."
 
-        if not self.load_requests:
+        if not self.load_requests and not self.find_request:
             return "Error: load_requests function not provided."
 
         result = self.entity.showViewCount(
             requestID,
-            load_requests_func=self.load_requests
+            load_requests_func=self.load_requests,
+            find_request_func=self.find_request,
+            pending_count_func=self.pending_count
         )
         return result
 
@@ -39,26 +43,38 @@ class Request:
     def __init__(self):
         self._viewCount = 0
 
-    def showViewCount(self, requestID, load_requests_func=None) -> int:
-        if not load_requests_func:
+    def _find_request(self, requestID, load_requests_func=None, find_request_func=None):
+        # O(1) through the shared id index when the app provides it
+        if find_request_func:
+            return find_request_func(requestID)
+        for req in load_requests_func() or []:
+            req_id = str(req.get('id', '')).strip()
+            if req_id == str(requestID).strip() or req_id.replace('REQ-', '') == str(requestID).strip().replace('REQ-', ''):
+                return req
+        return None
+
+    def showViewCount(self, requestID, load_requests_func=None, find_request_func=None,
+                      pending_count_func=None) -> int:
+        if not load_requests_func and not find_request_func:
             return "Error: load_requests function not provided."
 
-        all_requests = load_requests_func()
+        req = self._find_request(requestID, load_requests_func, find_request_func)
+        if req is None:
+            return f"Error: Request with ID '{requestID}' not found."
 
-        for req in all_requests:
-            req_id = str(req.get('id', '')).strip()
-            if req_id == str(requestID).strip() or req_id.replace('REQ-', '') == str(requestID).strip().replace('REQ-', ''):
-                raw_value = req.get('viewCount')
-                if raw_value is None:
-                    raw_value = req.get('view_count')
-                if raw_value is None:
-                    raw_value = req.get('views')
+        raw_value = req.get('viewCount')
+        if raw_value is None:
+            raw_value = req.get('view_count')
+        if raw_value is None:
+            raw_value = req.get('views')
 
-                try:
-                    self._viewCount = int(raw_value) if raw_value is not None else 0
-                except (ValueError, TypeError):
-                    self._viewCount = 0
+        try:
+            self._viewCount = int(raw_value) if raw_value is not None else 0
+        except (ValueError, TypeError):
+            self._viewCount = 0
 
-                return self._viewCount
+        # views recorded but not flushed to storage yet
+        if pending_count_func:
+            self._viewCount += int(pending_count_func(req.get('id', requestID)) or 0)
 
-        return f"Error: Request with ID '{requestID}' not found."
+        return self._viewCount
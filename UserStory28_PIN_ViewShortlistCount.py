@@ -15,20 +15,24 @@ class ShortlistCountPage:
 
 # --- Controller ---
 class ShortlistCountController:
-    def __init__(self, entity=None, load_requests_func=None):
+    def __init__(self, entity=None, load_requests_func=None, find_request_func=None, shortlist_count_func=None):
         self.entity = entity or Request()
         self.load_requests = load_requests_func
+        self.find_request = find_request_func
+        self.shortlist_count = shortlist_count_func
 
     def showShortlistCount(self, requestID) -> int:
         if not requestID or not str(requestID).strip():
             return "Error: Request ID is required."
 
-        if not self.load_requests:
+        if not self.load_requests and not self.find_request:
             return "Error: load_requests function not provided."
 
         return self.entity.showShortlistCount(
             requestID,
-            load_requests_func=self.load_requests
+            load_requests_func=self.load_requests,
+            find_request_func=self.find_request,
+            shortlist_count_func=self.shortlist_count
         )
 
 
@@ -37,32 +41,45 @@ class Request:
     def __init__(self):
         self._shortlistCount = 0
 
-    def showShortlistCount(self, requestID, load_requests_func=None) -> int:
-        if not load_requests_func:
-            return "Error: load_requests function not provided."
-
-        all_requests = load_requests_func()
-
-        for req in all_requests:
+    def _find_request(self, requestID, load_requests_func=None, find_request_func=None):
+        # O(1) through the shared id index when the app provides it
+        if find_request_func:
+            return find_request_func(requestID)
+        for req in load_requests_func() or []:
             req_id = str(req.get('id', '')).strip()
             if req_id == str(requestID).strip() or req_id.replace('REQ-', '') == str(requestID).strip().replace('REQ-', ''):
-                raw_value = req.get('shortlistCount')
-                if raw_value is None:
-                    raw_value = req.get('shortlist_count')
-                if raw_value is None:
-                    shortlist_by = req.get('shortlisted_by') or req.get('shortlist') or req.get('favorites')
-                    if isinstance(shortlist_by, list):
-                        raw_value = len(shortlist_by)
-                    elif isinstance(shortlist_by, str) and shortlist_by.strip():
-                        raw_value = len([v for v in shortlist_by.split(',') if v.strip()])
-                    else:
-                        raw_value = 0
-
-                try:
-                    self._shortlistCount = int(raw_value)
-                except (TypeError, ValueError):
-                    self._shortlistCount = 0
-
-                return self._shortlistCount
-
-        return f"Error: Request with ID '{requestID}' not found."
+                return req
+        return None
+
+    def showShortlistCount(self, requestID, load_requests_func=None, find_request_func=None,
+                           shortlist_count_func=None) -> int:
+        if not load_requests_func and not find_request_func:
+            return "Error: load_requests function not provided."
+
+        req = self._find_request(requestID, load_requests_func, find_request_func)
+        if req is None:
+            return f"Error: Request with ID '{requestID}' not found."
+
+        # maintained count from the shortlist store, when the app has one
+        if shortlist_count_func:
+            self._shortlistCount = int(shortlist_count_func(req.get('id', requestID)) or 0)
+            return self._shortlistCount
+
+        raw_value = req.get('shortlistCount')
+        if raw_value is None:
+            raw_value = req.get('shortlist_count')
+        if raw_value is None:
+            shortlist_by = req.get('shortlisted_by') or req.get('shortlist') or req.get('favorites')
+            if isinstance(shortlist_by, (list, tuple)):
+                raw_value = len(shortlist_by)
+            elif isinstance(shortlist_by, str) and shortlist_by.strip():
+                raw_value = len([v for v in shortlist_by.split(',') if v.strip()])
+            else:
+                raw_value = 0
+
+        try:
+            self._shortlistCount = int(raw_value)
+        except (TypeError, ValueError):
+            self._shortlistCount = 0
+
+        return self._shortlistCount
@@ -3,6 +3,8 @@
 # BCE Structure
 # ============================================
 
+from search_fields import request_shadow
+
 
 # --- Boundary ---
 class SearchPrevRequestPage:
@@ -19,9 +21,10 @@ class SearchPrevRequestPage:
 
 # --- Controller ---
 class SearchPrevRequestController:
-    def __init__(self, entity=None, load_requests_func=None):
+    def __init__(self, entity=None, load_requests_func=None, index_search_func=None):
         self.entity = entity or Request()
         self.load_requests = load_requests_func
+        self.index_search = index_search_func
 
     def searchRequest(self, requestStatus='Completed', filterCriteria=None, data=None) -> str:
         if data is None:
@@ -35,6 +38,15 @@ class SearchPrevRequestController:
         if not requestStatus:
             requestStatus = 'Completed'
 
+        # Indexed path: only the requests matching the filters are loaded
+        if self.index_search:
+            return self.entity.searchRequest(
+                requestStatus=requestStatus,
+                filterCriteria=filterCriteria,
+                data=data,
+                index_search_func=self.index_search
+            )
+
         if not self.load_requests:
             return "Error: load_requests function not provided."
 
@@ -57,18 +69,29 @@ class Request:
         self._requestDate = None
         self._requestStatus = None
 
-    def _matches_filters(self, req, filters):
+    # lowercase text fields kept in the record's shadow (see search_fields.py)
+    SHADOW_TEXT = ('title', 'description', 'category', 'location', 'status', 'owner')
+
+    def _matches_filters(self, req, filters, shadow=None):
+        """`filters` string values are expected lowercase (see searchRequest)."""
         for key, expected in (filters or {}).items():
             value = req.get(key)
             if isinstance(expected, str):
-                if str(expected).lower() not in str(value or '').lower():
+                if key in self.SHADOW_TEXT and shadow is not None:
+                    have = shadow[key]
+                else:
+                    have = str(value or '').lower()
+                if expected not in have:
                     return False
             else:
                 if value != expected:
                     return False
         return True
 
-    def searchRequest(self, requestStatus='Completed', filterCriteria=None, data=None, all_requests=None) -> str:
+    KEYWORD_FIELDS = ('title', 'description', 'location')
+
+    def searchRequest(self, requestStatus='Completed', filterCriteria=None, data=None, all_requests=None,
+                      index_search_func=None) -> str:
         if filterCriteria is None:
             filterCriteria = {}
         if data is None:
@@ -80,33 +103,42 @@ class Request:
         searchCategory = data.get('category')
         searchDate = data.get('date')
 
+        # Narrow the candidates with the secondary / full-text indexes; the
+        # checks below still run on them, except the keyword one
+        indexed = bool(index_search_func)
+        if indexed:
+            all_requests = index_search_func(
+                {'status': requestStatus, 'category': searchCategory, 'date': searchDate},
+                keyword=keyword,
+                keyword_fields=self.KEYWORD_FIELDS
+            )
+
+        # query normalized once; requests compared through their stored
+        # shadow fields (see search_fields.py)
+        target_status = str(requestStatus or '').lower()
+        filters = {k: (v.lower() if isinstance(v, str) else v) for k, v in filterCriteria.items()}
+        kw = str(keyword).lower() if keyword and not indexed else ''
+        search_category_str = str(searchCategory or '').lower()
+        search_date_str = str(searchDate or '').strip()
+
         matched_requests = []
 
         for req in all_requests:
-            status = str(req.get('status', '')).lower()
-            target_status = str(requestStatus).lower()
-            if target_status and status != target_status:
+            s = request_shadow(req)
+            if target_status and s['status'] != target_status:
                 continue
 
-            if not self._matches_filters(req, filterCriteria):
+            if not self._matches_filters(req, filters, s):
                 continue
 
-            if keyword:
-                kw = str(keyword).lower()
-                if (
-                    kw not in str(req.get('title', '')).lower()
-                    and kw not in str(req.get('description', '')).lower()
-                    and kw not in str(req.get('location', '')).lower()
-                ):
-                    continue
-
-            if searchCategory:
-                if str(searchCategory).lower() not in str(req.get('category', '')).lower():
-                    continue
-
-            if searchDate:
-                if str(searchDate).strip() not in str(req.get('date', '')).strip():
-                    continue
+            if kw and kw not in s['title'] and kw not in s['description'] and kw not in s['location']:
+                continue
+
+            if searchCategory and search_category_str not in s['category']:
+                continue
+
+            if searchDate and search_date_str not in s['date']:
+                continue
 
             matched_requests.append(req)
 
@@ -15,21 +15,23 @@ class ViewPrevRequestPage:
 
 # --- Controller ---
 class ViewPrevRequestController:
-    def __init__(self, entity=None, load_requests_func=None):
+    def __init__(self, entity=None, load_requests_func=None, find_request_func=None):
         self.entity = entity or Request()
         self.load_requests = load_requests_func
+        self.find_request = find_request_func
 
     def getRequestDetail(self, requestID, requestStatus='Completed') -> str:
         if not requestID or not str(requestID).strip():
             return "Error: Request ID is required."
 
-        if not self.load_requests:
+        if not self.load_requests and not self.find_request:
             return "Error: load_requests function not provided."
 
         return self.entity.getRequestDetail(
             requestID,
             requestStatus=requestStatus,
-            load_requests_func=self.load_requests
+            load_requests_func=self.load_requests,
+            find_request_func=self.find_request
         )
 
 
@@ -46,39 +48,46 @@ class Request:
         self._requestLocation = None
         self._CSRRepInCharge = None
 
-    def getRequestDetail(self, requestID, requestStatus='Completed', load_requests_func=None) -> str:
-        if not load_requests_func:
-            return "Error: load_requests function not provided."
-
-        all_requests = load_requests_func()
-
-        for req in all_requests:
+    def _find_request(self, requestID, load_requests_func=None, find_request_func=None):
+        # O(1) through the shared id index when the app provides it
+        if find_request_func:
+            return find_request_func(requestID)
+        for req in load_requests_func() or []:
             req_id = str(req.get('id', '')).strip()
             if req_id == str(requestID).strip() or req_id.replace('REQ-', '') == str(requestID).strip().replace('REQ-', ''):
-                status = str(req.get('status', '')).lower()
-                if requestStatus and status != str(requestStatus).lower():
-                    return f"Error: Request '{requestID}' is not in requested status '{requestStatus}'."
-
-                self._requestID = req_id
-                self._requestTitle = req.get('title', '')
-                self._requestCategory = req.get('category', '')
-                self._requestStatus = req.get('status', '')
-                self._requestDescription = req.get('description', '')
-                self._requestDate = req.get('date', '')
-                self._requestLocation = req.get('location', '')
-                self._PIN = req.get('owner', '')
-                self._CSRRepInCharge = req.get('assignee') or req.get('csr') or req.get('CSRRepInCharge') or ''
-
-                return {
-                    'id': self._requestID,
-                    'title': self._requestTitle,
-                    'category': self._requestCategory,
-                    'status': self._requestStatus,
-                    'description': self._requestDescription,
-                    'date': self._requestDate,
-                    'location': self._requestLocation,
-                    'owner': self._PIN,
-                    'csrRepInCharge': self._CSRRepInCharge
-                }
-
-        return f"Error: Request with ID '{requestID}' not found."
+                return req
+        return None
+
+    def getRequestDetail(self, requestID, requestStatus='Completed', load_requests_func=None, find_request_func=None) -> str:
+        if not load_requests_func and not find_request_func:
+            return "Error: load_requests function not provided."
+
+        req = self._find_request(requestID, load_requests_func, find_request_func)
+        if req is None:
+            return f"Error: Request with ID '{requestID}' not found."
+
+        status = str(req.get('status', '')).lower()
+        if requestStatus and status != str(requestStatus).lower():
+            return f"Error: Request '{requestID}' is not in requested status '{requestStatus}'."
+
+        self._requestID = str(req.get('id', '')).strip()
+        self._requestTitle = req.get('title', '')
+        self._requestCategory = req.get('category', '')
+        self._requestStatus = req.get('status', '')
+        self._requestDescription = req.get('description', '')
+        self._requestDate = req.get('date', '')
+        self._requestLocation = req.get('location', '')
+        self._PIN = req.get('owner', '')
+        self._CSRRepInCharge = req.get('assignee') or req.get('csr') or req.get('CSRRepInCharge') or ''
+
+        return {
+            'id': self._requestID,
+            'title': self._requestTitle,
+            'category': self._requestCategory,
+            'status': self._requestStatus,
+            'description': self._requestDescription,
+            'date': self._requestDate,
+            'location': self._requestLocation,
+            'owner': self._PIN,
+            'csrRepInCharge': self._CSRRepInCharge
+        }
@@ -1,33 +1,20 @@
 # ================================================
 # User Story #39 – Platform Management: Generate Weekly Report (BCE)
-# Live data from categories.json, users.json, requests.json
+# Live data from the pre-aggregated counters in report_engine.py
 # ================================================
 
 from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from pathlib import Path
-import json
 from typing import Dict, List, Any
 
-# ---------- Config ----------
-BASE_DIR = Path(__file__).resolve().parent
-CATEGORIES_FILE = BASE_DIR / "categories.json"
-USERS_FILE      = BASE_DIR / "users.json"
-REQUESTS_FILE   = BASE_DIR / "requests.json"
+import analytics
+import report_engine
+import storage
+from field_index import activity_ts
 
 
 # ---------- Small helpers ----------
-def _load_json(path: Path, default):
-    if not path.exists():
-        return default
-    try:
-        raw = path.read_text(encoding="utf-8").strip()
-        return json.loads(raw) if raw else default
-    except Exception:
-        return default
-
-
 def _parse_iso_date(s: str | None) -> datetime | None:
     if not s:
         return None
@@ -112,104 +99,88 @@ class GenerateReportController:
         self.request = Request()
 
     def generateReport(self, dateOption: str) -> str:
-        # Live pulls
-        cats = self.category.generateReport()
-        users = self.userProfile.generateReport()
-        req_summary = self.request.generateReport(dateOption)  # dict of lists
-
-        pending = len(req_summary["Pending"])
-        assigned = len(req_summary["Assigned"])
-        completed = len(req_summary["Completed"])
+        # Counters are kept up to date by report_engine; no file re-reads
+        try:
+            start, end = report_engine.period(dateOption)
+        except ValueError as e:
+            return str(e)
+        report_engine.refresh()
+        cats = self.category.generateReport(start, end)
+        users = self.userProfile.generateReport(start, end)
+        req_summary = self.request.generateReport(dateOption, start, end)
 
         return (
             "Report (weekly)\n"
-            f"Categories: {len(cats)}\n"
-            f"UserProfiles: {len(users)}\n"
-            f"Requests Pending: {pending}\n"
-            f"Requests Assigned: {assigned}\n"
-            f"Requests Completed: {completed}"
+            f"Categories: {cats['total']}\n"
+            f"UserProfiles: {users['total']}\n"
+            f"Requests Pending: {req_summary['Pending']}\n"
+            f"Requests Assigned: {req_summary['Assigned']}\n"
+            f"Requests Completed: {req_summary['Completed']}"
         )
 
 
 # --- Entity: Category ---
 class Category:
-    def generateReport(self) -> List[Dict[str, Any]]:
-        """
-        Returns a list of categories from categories.json.
-        Expected shape per item (any extra fields are fine):
-          { "id": "CAT-001", "name": "Transportation", "desc": "...", ... }
-        """
-        cats = _load_json(CATEGORIES_FILE, [])
-        # Normalize to a tiny list the BCE can display if needed
-        out = []
-        for c in cats:
-            out.append({
-                "categoryID": c.get("id") or c.get("categoryID"),
-                "categoryName": c.get("name") or c.get("categoryName") or "—",
-                "createdAt": c.get("createdAt"),
-                "updatedAt": c.get("updatedAt"),
-            })
-        return out
+    def generateReport(self, start: str, end: str) -> Dict[str, Any]:
+        """{"total", "created", "updated"} for the period."""
+        return report_engine.engine.categories_report(start, end)
 
 
 # --- Entity: UserProfile ---
 class UserProfile:
-    def generateReport(self) -> List[Dict[str, Any]]:
-        """
-        Flattens users.json buckets (admin/csr/pin/platform) into a list.
-        Normalizes status to Active/Inactive for consistency with UI.
-        """
-        data = _load_json(USERS_FILE, {})
-        flat = []
-        for role_bucket, users in (data or {}).items():
-            for uname, rec in (users or {}).items():
-                flat.append({
-                    "userProfileID": rec.get("id"),
-                    "userProfileName": rec.get("fullName") or uname,
-                    "userRole": (rec.get("role") or role_bucket or "").strip().title(),  # Admin|Csr|Pin|Platform
-                    "userProfileStatus": "Active" if (rec.get("status", "Active").lower() == "active") else "Inactive",
-                    "createdAt": rec.get("createdAt"),
-                    "updatedAt": rec.get("updatedAt"),
-                })
-        # Keep stable ordering
-        flat.sort(key=lambda r: (r.get("userRole") or "", int(r.get("userProfileID") or 0)))
-        return flat
+    def generateReport(self, start: str, end: str) -> Dict[str, Any]:
+        """{"total", "byRole", "active", "suspended", "created"}."""
+        return report_engine.engine.users_report(start, end)
 
 
 # --- Entity: Request ---
 class Request:
-    def generateReport(self, dateOption: str = "weekly") -> Dict[str, List[Dict[str, Any]]]:
+    def generateReport(self, dateOption: str, start: str, end: str) -> Dict[str, Any]:
+        """Pending / Assigned / Completed counts (plus per-category / per-day) for the period."""
+        return report_engine.engine.requests_report(start, end)
+
+    def listRequests(self, dateOption: str = "weekly") -> Dict[str, List[Dict[str, Any]]]:
         """
-        Reads requests.json and returns weekly buckets:
+        The requests behind the weekly counts, as buckets:
           { "Pending": [...], "Assigned": [...], "Completed": [...] }
-        A request is included if ANY of these timestamps falls in the last 7 days:
-          - updatedAt
-          - createdAt
-          - (fallback) 'date' (YYYY-MM-DD)
+        A request is included if its last activity (field_index.activity_ts:
+        latest of updatedAt / assignedAt / completedAt, else created) falls in
+        the last 7 days, the same day the report counts use.
         """
         today = _now_utc_date()
-        reqs = _load_json(REQUESTS_FILE, [])
         out = {"Pending": [], "Assigned": [], "Completed": []}
 
-        for r in reqs:
-            # Pick the most relevant timestamp (updatedAt > createdAt > date)
-            ts = r.get("updatedAt") or r.get("createdAt") or r.get("date")
-            if not _in_last_7_days(ts, today):
+        snap = analytics.current()
+        if snap is not None:
+            # Vectorized: bucket + 7-day window evaluated over the columnar snapshot
+            start = (today - timedelta(days=6)).date().isoformat()
+            for bucket in out:
+                for r in snap.select([bucket], start, today.date().isoformat(), on="activity"):
+                    out[bucket].append(self._summary(r, bucket, today))
+            return out
+
+        for r in storage.requests_view():
+            if not _in_last_7_days(activity_ts(r), today):
                 continue
 
             bucket = _norm_status(r.get("status"))
-            # minimal info for the BCE output
-            out[bucket].append({
-                "requestID": r.get("id"),
-                "requestDate": (_parse_iso_date(ts) or today).date().isoformat(),
-                "requestStatus": bucket,
-                "requestTitle": r.get("title") or r.get("categoryName") or "Assistance",
-                "requestCategory": r.get("categoryName") or r.get("categoryId"),
-                "requestLocation": r.get("location") or "",
-            })
+            out[bucket].append(self._summary(r, bucket, today))
 
         return out
 
+    @staticmethod
+    def _summary(r, bucket: str, today: datetime) -> Dict[str, Any]:
+        # minimal info for the BCE output
+        ts = activity_ts(r)
+        return {
+            "requestID": r.get("id"),
+            "requestDate": (_parse_iso_date(ts) or today).date().isoformat(),
+            "requestStatus": bucket,
+            "requestTitle": r.get("title") or r.get("categoryName") or "Assistance",
+            "requestCategory": r.get("categoryName") or r.get("categoryId"),
+            "requestLocation": r.get("location") or "",
+        }
+
 
 # --- Run ---
 if __name__ == "__main__":
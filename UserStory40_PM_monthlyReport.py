@@ -1,7 +1,10 @@
 # ================================================
 # User Story #40 – Platform Management: Generate Monthly Report (BCE)
+# Live data from the pre-aggregated counters in report_engine.py
 # ================================================
 
+import report_engine
+
 # --- Boundary ---
 class GenerateReportPage:
     def __init__(self):
@@ -34,78 +37,38 @@ class GenerateReportController:
         self.request = Request()
 
     def generateReport(self, dateOption: str) -> str:
-        cats = self.category.generateReport()
-        users = self.userProfile.generateReport()
-        reqs = self.request.generateReport(dateOption)  # dict of lists
-        pending = len(reqs["Pending"])
-        assigned = len(reqs["Assigned"])
-        completed = len(reqs["Completed"])
+        try:
+            start, end = report_engine.period(dateOption)
+        except ValueError as e:
+            return str(e)
+        report_engine.refresh()
+        cats = self.category.generateReport(start, end)
+        users = self.userProfile.generateReport(start, end)
+        reqs = self.request.generateReport(dateOption, start, end)
         return (
             "Report (monthly)\n"
-            f"Categories: {len(cats)}\n"
-            f"UserProfiles: {len(users)}\n"
-            f"Requests Pending: {pending}\n"
-            f"Requests Assigned: {assigned}\n"
-            f"Requests Completed: {completed}"
+            f"Categories: {cats['total']}\n"
+            f"UserProfiles: {users['total']}\n"
+            f"Requests Pending: {reqs['Pending']}\n"
+            f"Requests Assigned: {reqs['Assigned']}\n"
+            f"Requests Completed: {reqs['Completed']}"
         )
 
 # --- Entity: Category ---
 class Category:
-    def __init__(self):
-        self.categories = [
-            {"categoryID": 1, "categoryName": "Healthcare"},
-            {"categoryID": 2, "categoryName": "Education"},
-            {"categoryID": 3, "categoryName": "Transport"},
-            {"categoryID": 4, "categoryName": "Food Assistance"},
-        ]
-
-    def generateReport(self) -> list:
-        return list(self.categories)
+    def generateReport(self, start: str, end: str) -> dict:
+        return report_engine.engine.categories_report(start, end)
 
 # --- Entity: UserProfile ---
 class UserProfile:
-    def __init__(self):
-        self.users = [
-            {"userProfileID": 1, "userProfileName": "Alice", "userRole": "CSR", "userProfileStatus": "Active"},
-            {"userProfileID": 2, "userProfileName": "Bob", "userRole": "PIN", "userProfileStatus": "Active"},
-            {"userProfileID": 3, "userProfileName": "Clara", "userRole": "CSR", "userProfileStatus": "Inactive"},
-            {"userProfileID": 4, "userProfileName": "Daniel", "userRole": "Admin", "userProfileStatus": "Active"},
-            {"userProfileID": 5, "userProfileName": "Emma", "userRole": "CSR", "userProfileStatus": "Active"},
-        ]
-
-    def generateReport(self) -> list:
-        return list(self.users)
+    def generateReport(self, start: str, end: str) -> dict:
+        return report_engine.engine.users_report(start, end)
 
 # --- Entity: Request ---
 class Request:
-    def __init__(self):
-        self.requests = [
-            {"PIN": "P001", "requestID": 1, "requestTitle": "Healthcare Outreach",
-             "requestCategory": "Healthcare", "requestStatus": "Pending",
-             "requestDescription": "Vaccination drive", "requestDate": "2025-11-01",
-             "requestLocation": "Bukit Timah", "CSRRepInCharge": "CSR_Alice", "shortlisted": True},
-            {"PIN": "P002", "requestID": 2, "requestTitle": "Food Drive Expansion",
-             "requestCategory": "Food Assistance", "requestStatus": "Assigned",
-             "requestDescription": "Monthly food distribution", "requestDate": "2025-11-10",
-             "requestLocation": "Jurong West", "CSRRepInCharge": "CSR_Bob", "shortlisted": True},
-            {"PIN": "P003", "requestID": 3, "requestTitle": "Transport Aid Program",
-             "requestCategory": "Transport", "requestStatus": "Completed",
-             "requestDescription": "Elderly transport", "requestDate": "2025-11-18",
-             "requestLocation": "Tampines", "CSRRepInCharge": "CSR_Clara", "shortlisted": False},
-            {"PIN": "P004", "requestID": 4, "requestTitle": "School Tutoring Drive",
-             "requestCategory": "Education", "requestStatus": "Completed",
-             "requestDescription": "Monthly tutoring", "requestDate": "2025-11-25",
-             "requestLocation": "Woodlands", "CSRRepInCharge": "CSR_Daniel", "shortlisted": True},
-        ]
-
-    def generateReport(self, dateOption: str = "monthly") -> dict:
-        out = {"Pending": [], "Assigned": [], "Completed": []}
-        for r in self.requests:
-            if r["requestStatus"] in out:
-                out[r["requestStatus"]].append(
-                    {"requestDate": r["requestDate"], "requestStatus": r["requestStatus"]}
-                )
-        return out
+    def generateReport(self, dateOption: str, start: str, end: str) -> dict:
+        """Pending / Assigned / Completed counts for requests active in the period."""
+        return report_engine.engine.requests_report(start, end)
 
 # --- Run ---
 if __name__ == "__main__":
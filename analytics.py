@@ -0,0 +1,278 @@
+# ================================================
+# analytics.py — columnar (NumPy) snapshot of requests for analytics
+#
+# Requests are mirrored into fixed-width arrays, one slot per request:
+#   status, category     dictionary-encoded ints (codes into a vocabulary)
+#   created, assigned, completed   datetime64[s]   (NaT when missing)
+#   date, activity       datetime64[D]  (activity = field_index.activity_ts,
+#                                        the timestamp the weekly report uses)
+#   views                int64
+#   alive                bool (deleted slots are reused)
+#
+# Shortlist counts are not a column: shortlist_store keeps them per request
+# and summary() reads them from there.
+#
+# The snapshot follows the request cache like the other indexes: one slot
+# is rewritten per create/update/delete, arrays grow by doubling. Group-by
+# and duration queries are then vectorized over the live slots.
+#
+# NumPy is optional: without it `snapshot` is None and callers keep their
+# list-of-dicts code path.
+#
+#   python analytics.py     # print a summary of the current requests
+# ================================================
+
+from __future__ import annotations
+
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+import shortlist_store
+import storage
+from field_index import activity_ts
+from report_engine import BUCKETS, status_bucket
+from request_index import canonical_id
+
+_INITIAL = 64
+
+
+def _parse_ts(ts) -> Optional[datetime]:
+    """ISO string ('...Z', offset, or plain date) -> naive UTC datetime."""
+    s = str(ts or "").strip()
+    if not s:
+        return None
+    try:
+        dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            dt = datetime.strptime(s[:19], "%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _seconds(ts):
+    dt = _parse_ts(ts)
+    return np.datetime64(dt, "s") if dt else np.datetime64("NaT", "s")
+
+
+def _day(ts):
+    dt = _parse_ts(ts)
+    return np.datetime64(dt.date(), "D") if dt else np.datetime64("NaT", "D")
+
+
+class Vocabulary:
+    """value <-> small int code, codes never reused."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        c = self.codes.get(value)
+        if c is None:
+            c = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+
+class ColumnarSnapshot:
+    COLUMNS = {
+        "status": "int32", "category": "int32",
+        "created": "datetime64[s]", "assigned": "datetime64[s]", "completed": "datetime64[s]",
+        "date": "datetime64[D]", "activity": "datetime64[D]",
+        "views": "int64",
+        "alive": "bool",
+    }
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.status_vocab = Vocabulary()
+        self.category_vocab = Vocabulary()
+        self.cols: Dict[str, Any] = {name: np.zeros(_INITIAL, dtype=dt) for name, dt in self.COLUMNS.items()}
+        for name, dt in self.COLUMNS.items():
+            if dt.startswith("datetime64"):
+                self.cols[name][:] = np.datetime64("NaT")
+        self._slot: Dict[str, int] = {}
+        self._rows: List[Optional[Mapping]] = []
+        self._free: List[int] = []
+
+    # ---- maintenance ----
+    def _grow(self) -> None:
+        size = len(self.cols["alive"]) * 2
+        for name, arr in self.cols.items():
+            new = np.zeros(size, dtype=arr.dtype)
+            if arr.dtype.kind == "M":
+                new[:] = np.datetime64("NaT")
+            new[:len(arr)] = arr
+            self.cols[name] = new
+
+    def _write(self, i: int, rec: Mapping) -> None:
+        c = self.cols
+        c["status"][i] = self.status_vocab.code((rec.get("status") or "").strip().lower())
+        c["category"][i] = self.category_vocab.code(
+            str(rec.get("category") or rec.get("categoryName") or rec.get("categoryId") or "—"))
+        c["created"][i] = _seconds(rec.get("createdAt") or rec.get("created"))
+        c["assigned"][i] = _seconds(rec.get("assignedAt"))
+        c["completed"][i] = _seconds(rec.get("completedAt"))
+        c["date"][i] = _day(rec.get("date"))
+        c["activity"][i] = _day(activity_ts(rec))
+        c["views"][i] = int(rec.get("viewCount", 0) or 0)
+        c["alive"][i] = True
+        self._rows[i] = rec
+
+    def _add(self, rec: Mapping) -> None:
+        rid = canonical_id(rec.get("id"))
+        if rid in self._slot:
+            return  # duplicate id: first record wins, as in the indexes
+        if self._free:
+            i = self._free.pop()
+        else:
+            i = len(self._rows)
+            if i >= len(self.cols["alive"]):
+                self._grow()
+            self._rows.append(None)
+        self._slot[rid] = i
+        self._write(i, rec)
+
+    def _remove(self, rid) -> None:
+        i = self._slot.pop(canonical_id(rid), None)
+        if i is None:
+            return
+        self.cols["alive"][i] = False
+        self._rows[i] = None
+        self._free.append(i)
+
+    def apply(self, rows, change) -> None:
+        """Cache listener, same protocol as RequestIndex.apply."""
+        with self._lock:
+            if change is None:
+                self._reset()
+                for rec in rows:
+                    self._add(rec)
+            elif change[0] == "upsert":
+                self._remove(change[1].get("id"))
+                self._add(change[1])
+            elif change[0] == "upsert_many":
+                for rec in change[1]:
+                    self._remove(rec.get("id"))
+                    self._add(rec)
+            elif change[0] == "delete":
+                self._remove(change[1])
+
+    # ---- vectorized queries ----
+    def _live(self) -> Any:
+        n = len(self._rows)
+        return np.flatnonzero(self.cols["alive"][:n])
+
+    def buckets(self) -> Any:
+        """Status bucket (index into BUCKETS) per slot, via the status vocabulary."""
+        lut = np.array([BUCKETS.index(status_bucket(v)) for v in self.status_vocab.values] or [0], dtype=np.int8)
+        return lut[self.cols["status"][:len(self._rows)]]
+
+    def select(self, buckets: Optional[Sequence[str]] = None, start=None, end=None,
+               on: str = "activity") -> List[Mapping]:
+        """Live requests whose bucket is in `buckets` and whose `on` day is in [start, end]."""
+        with self._lock:
+            idx = self._live()
+            if buckets is not None:
+                want = np.array([BUCKETS.index(b) for b in buckets], dtype=np.int8)
+                idx = idx[np.isin(self.buckets()[idx], want)]
+            days = self.cols[on][idx].astype("datetime64[D]")
+            keep = np.ones(len(idx), dtype=bool)  # NaT compares False: undated rows drop out
+            if start is not None:
+                keep &= days >= np.datetime64(start, "D")
+            if end is not None:
+                keep &= days <= np.datetime64(end, "D")
+            return [self._rows[i] for i in idx[keep]]
+
+    def group_counts(self, by: str = "status") -> Dict[str, int]:
+        """Live requests per status / category / bucket."""
+        with self._lock:
+            idx = self._live()
+            if by == "bucket":
+                counts = np.bincount(self.buckets()[idx], minlength=len(BUCKETS))
+                return {b: int(n) for b, n in zip(BUCKETS, counts)}
+            vocab = self.status_vocab if by == "status" else self.category_vocab
+            counts = np.bincount(self.cols[by][idx], minlength=len(vocab.values))
+            return {vocab.values[c]: int(n) for c, n in enumerate(counts) if n}
+
+    def per_day(self, on: str = "created") -> Dict[str, int]:
+        """Live requests per calendar day of `on` (created / date / activity / ...)."""
+        with self._lock:
+            days = self.cols[on][self._live()].astype("datetime64[D]")
+            days = days[~np.isnat(days)]
+            values, counts = np.unique(days, return_counts=True)
+            return {str(d): int(n) for d, n in zip(values, counts)}
+
+    def _durations(self, frm: str, to: str) -> Any:
+        with self._lock:
+            idx = self._live()
+            a, b = self.cols[frm][idx], self.cols[to][idx]
+            ok = ~(np.isnat(a) | np.isnat(b))
+            return (b[ok] - a[ok]).astype("int64") / 3600.0  # hours
+
+    @staticmethod
+    def distribution(hours) -> Dict[str, Any]:
+        if not len(hours):
+            return {"count": 0}
+        p50, p90 = np.percentile(hours, [50, 90])
+        return {"count": int(len(hours)), "meanHours": round(float(hours.mean()), 2),
+                "p50Hours": round(float(p50), 2), "p90Hours": round(float(p90), 2),
+                "maxHours": round(float(hours.max()), 2)}
+
+    def time_to_assign(self) -> Dict[str, Any]:
+        return self.distribution(self._durations("created", "assigned"))
+
+    def time_to_complete(self) -> Dict[str, Any]:
+        return self.distribution(self._durations("created", "completed"))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "requests": len(self._slot),
+            "byBucket": self.group_counts("bucket"),
+            "byStatus": self.group_counts("status"),
+            "byCategory": self.group_counts("category"),
+            "createdPerDay": self.per_day("created"),
+            "views": int(self.cols["views"][self._live()].sum()),
+            # maintained per-request counts from the shortlist store
+            "shortlists": sum(n for rid, n in shortlist_store.store.counts().items() if rid in self._slot),
+            "timeToAssign": self.time_to_assign(),
+            "timeToComplete": self.time_to_complete(),
+        }
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+
+snapshot: Optional[ColumnarSnapshot] = None
+if np is not None:
+    snapshot = ColumnarSnapshot()
+    storage.cache.subscribe(storage.REQUESTS_DOC, snapshot.apply)
+
+
+def current() -> Optional[ColumnarSnapshot]:
+    """The snapshot, brought up to date with storage; None without NumPy."""
+    if snapshot is not None:
+        storage.requests_view()
+    return snapshot
+
+
+if __name__ == "__main__":
+    import json
+    snap = current()
+    if snap is None:
+        sys.exit("numpy is not installed; analytics snapshot unavailable.")
+    print(json.dumps(snap.summary(), indent=2))
@@ -1,9 +1,22 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, session, jsonify
 from pathlib import Path
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 import json
 
+import auth_cache
+import category_cache
+import change_feed
+import export_stream
+import http_cache
+import id_allocator
+import pagination
+import report_engine
+import request_repository
+import search_fields
+import shortlist_store
+import storage
+import user_directory
+
 # ========== Admin ==========
 from UserStory11_Admin_login import LoginController as AdminLoginController
 from UserStory12_Admin_logout import LogOutPageController as AdminLogoutController
@@ -31,6 +44,7 @@ from UserStory37_PM_SearchCetegory import SearchCategoryController
 
 # ========= App / Utilities =========
 app = Flask(__name__)
+app.json = http_cache.JSONProvider(app)
 app.secret_key = "super_secret_key"
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -49,64 +63,45 @@ def _ensure_file(path: Path, default):
 def now_iso():
     return datetime.utcnow().isoformat(timespec="seconds") + "Z"
 
+# Data files are read/written through the storage backend (json | sqlite);
+# a file like categories.json is the "categories" document.
 def load_json(path: Path, default):
-    _ensure_file(path, default)
-    try:
-        raw = path.read_text()
-        return json.loads(raw) if raw.strip() else default
-    except Exception:
-        return default
+    return storage.load_doc(path.stem, default)
 
-def save_json(path: Path, data):
-    tmp = path.with_name("." + path.name + ".tmp")
-    tmp.write_text(json.dumps(data, indent=2))
-    tmp.replace(path)
+def save_json(path: Path, data, change=None):
+    storage.save_doc(path.stem, data, change)
 
 def load_all_users():
-    _ensure_file(USERS_FILE, {})
-    raw = USERS_FILE.read_text() or "{}"
-    return json.loads(raw)
+    return load_json(USERS_FILE, {})
 
-def save_all_users(data):
-    save_json(USERS_FILE, data)
+def save_all_users(data, change=None):
+    """`change`: ("upsert", role, username) when one account changed (see user_directory.py)."""
+    search_fields.stamp_users(data)  # normalized search fields, written with the users
+    save_json(USERS_FILE, data, change)
 
 def migrate_users_file():
     """Backfill id/uid/etc so Admin dashboard can list old accounts."""
-    data = load_all_users()
-    max_id = 0
-    for bucket in data.values():
-        for rec in bucket.values():
-            try:
-                max_id = max(max_id, int(rec.get("id", 0)))
-            except Exception:
-                pass
-
-    changed = False
-    next_id = max_id + 1
-    for role, bucket in (data or {}).items():
-        for uname, rec in bucket.items():
-            if "id" not in rec:
-                rec["id"] = next_id
-                rec["uid"] = f"U-{next_id:03d}"
-                rec.setdefault("fullName", uname)
-                rec.setdefault("email", "")
-                rec.setdefault("username", uname)
-                rec.setdefault("role", role)
-                rec.setdefault("status", "Active")
-                rec.setdefault("createdAt", now_iso())
-                rec["updatedAt"] = now_iso()
-                next_id += 1
-                changed = True
-
-    if changed:
+    with storage.transaction():
+        data = load_all_users()
+        missing = [(role, uname, rec) for role, bucket in (data or {}).items()
+                   for uname, rec in bucket.items() if "id" not in rec]
+        if not missing:
+            return
+        # one block of ids from the users sequence for all old accounts
+        for next_id, (role, uname, rec) in zip(id_allocator.allocator.reserve("users", len(missing)), missing):
+            rec["id"] = next_id
+            rec["uid"] = id_allocator.user_uid(next_id)
+            rec.setdefault("fullName", uname)
+            rec.setdefault("email", "")
+            rec.setdefault("username", uname)
+            rec.setdefault("role", role)
+            rec.setdefault("status", "Active")
+            rec.setdefault("createdAt", now_iso())
+            rec["updatedAt"] = now_iso()
         save_all_users(data)
 
 def verify_password(stored: str, provided: str) -> bool:
-    if not stored:
-        return False
-    if isinstance(stored, str) and (stored.startswith("scrypt:") or stored.startswith("pbkdf2:")):
-        return check_password_hash(stored, provided)
-    return stored == provided
+    return auth_cache.verify(stored, provided)
 
 def normalize_role(role: str) -> str:
     role = (role or "").strip().lower()
@@ -131,39 +126,35 @@ def file_status_to_ui(status_file: str) -> str:
     return "active"
 
 def _find_by_id(data, user_id: int):
-    for role, bucket in (data or {}).items():
-        for uname, rec in bucket.items():
-            if isinstance(rec, dict) and rec.get("id") == user_id:
-                return role, uname, rec
-    return None, None, None
-
-def _flatten(all_users):
-    flat = []
-    for role_bucket, users in (all_users or {}).items():
-        for uname, rec in users.items():
-            rid = rec.get("id")
-            if not rid:
-                continue
-            flat.append({
-                "id": rid,
-                "uid": rec.get("uid"),
-                "fullName": rec.get("fullName") or uname,
-                "name": rec.get("fullName") or uname,
-                "email": rec.get("email") or "",
-                "username": rec.get("username") or uname,
-                "role": (rec.get("role") or role_bucket or "").lower(),  # admin|csr|pin|platform
-                "status": file_status_to_ui(rec.get("status") or "Active"),  # active|inactive
-                "createdAt": rec.get("createdAt"),
-                "updatedAt": rec.get("updatedAt"),
-            })
-    flat.sort(key=lambda u: int(u["id"]))
-    return flat
+    """(role, username, record) in `data` via the id index (user_directory.py)."""
+    return user_directory.find(data, user_id)
+
+def _flat_user(role_bucket, uname, rec):
+    """One users.json record in the Admin dashboard shape; None if it has no id."""
+    rid = rec.get("id")
+    if not rid:
+        return None
+    return {
+        "id": rid,
+        "uid": rec.get("uid"),
+        "fullName": rec.get("fullName") or uname,
+        "name": rec.get("fullName") or uname,
+        "email": rec.get("email") or "",
+        "username": rec.get("username") or uname,
+        "role": (rec.get("role") or role_bucket or "").lower(),  # admin|csr|pin|platform
+        "status": file_status_to_ui(rec.get("status") or "Active"),  # active|inactive
+        "createdAt": rec.get("createdAt"),
+        "updatedAt": rec.get("updatedAt"),
+    }
+
+def _flat_users(keys):
+    """Admin dashboard rows for user_directory keys (already in id order)."""
+    found = user_directory.index.resolve(keys)
+    return [u for u in (_flat_user(role, uname, rec) for role, uname, rec in found) if u is not None]
 
 # --------- Platform login helper (first-party, hashed/legacy compatible) ---------
 def _platform_login(username: str, password: str):
-    data = load_all_users()
-    platform_bucket = (data or {}).get("platform") or {}
-    rec = platform_bucket.get(username or "")
+    rec = auth_cache.directory.get("platform", username)
     if not rec:
         return False, "Invalid PM credentials."
     # Block suspended
@@ -172,6 +163,7 @@ def _platform_login(username: str, password: str):
     if not verify_password(rec.get("password", ""), password or ""):
         return False, "Invalid PM credentials."
     # OK
+    auth_cache.login_succeeded("platform", username, password)
     return True, rec
 
 # =========================================================
@@ -302,25 +294,22 @@ def admin_create_profile():
             flash("Error: Username already exists for this role.")
             return redirect(url_for('admin_dashboard'))
 
-        next_id = 1 + max(
-            (rec.get("id", 0) for bucket in data.values() for rec in bucket.values()),
-            default=0
-        )
+        next_id = id_allocator.next_user_id()
 
         rec = {
             "id": next_id,
-            "uid": f"U-{next_id:03d}",
+            "uid": id_allocator.user_uid(next_id),
             "fullName": full_name,
             "email": email,
             "username": username,
-            "password": generate_password_hash(password),
+            "password": auth_cache.hash_password(password),
             "role": role,
             "status": status,
             "createdAt": now_iso(),
             "updatedAt": now_iso()
         }
         data[role][username] = rec
-        save_all_users(data)
+        save_all_users(data, change=("upsert", role, username))
         flash("Profile created successfully.")
         return redirect(url_for('admin_dashboard'))
 
@@ -329,70 +318,67 @@ def admin_create_profile():
 @app.route('/admin/view-profile')
 def admin_view_profile():
     user_id = request.args.get('id', type=int)
-    data = load_all_users()
-    result = None
-    for bucket in data.values():
-        for rec in bucket.values():
-            if rec.get("id") == user_id:
-                result = rec
-                break
-        if result:
-            break
+    found = user_directory.index.get_by_id(user_id)
+    result = found[2] if found else None
     return render_template('view-requests.html', result=result)
 
 @app.route('/admin/suspend-profile', methods=['POST'])
 def admin_suspend_profile():
     user_id = request.form.get('id', type=int)
     data = load_all_users()
-    for bucket in data.values():
-        for uname, rec in bucket.items():
-            if rec.get("id") == user_id:
-                rec["status"] = "Suspended"
-                rec["updatedAt"] = now_iso()
-                save_all_users(data)
-                flash("User suspended.")
-                return redirect(url_for('admin_dashboard'))
+    role, uname, rec = _find_by_id(data, user_id)
+    if rec:
+        rec["status"] = "Suspended"
+        rec["updatedAt"] = now_iso()
+        save_all_users(data, change=("upsert", role, uname))
+        flash("User suspended.")
+        return redirect(url_for('admin_dashboard'))
     flash("Error: User not found.")
     return redirect(url_for('admin_dashboard'))
 
 @app.route('/admin/search-profile')
 def admin_search_profile():
     q = (request.args.get('name') or "").strip().lower()
-    data = load_all_users()
-    flat = [rec for bucket in data.values() for rec in bucket.values()]
-    if not q:
-        result = flat
-    else:
-        result = [
-            u for u in flat
-            if q in (u.get("fullName","").lower())
-            or q in (u.get("email","").lower())
-            or q in (u.get("username","").lower())
-            or q == str(u.get("id","")).lower()
-            or q == (u.get("uid","") or "").lower()
-            or q == (u.get("role","") or "").lower()
-        ]
+    index = user_directory.index
+    result = [rec for _, _, rec in index.resolve(index.search(q))]
     return render_template('search-requests.html', result=result)
 
 # =========================================================
 # JSON-backed Users API (existing)
 # =========================================================
 @app.get("/api/users")
+@http_cache.conditional("users")
 def api_users_list():
-    data = load_all_users()
-    items = _flatten(data)
-    q = (request.args.get('q') or '').strip().lower()
-    if q:
-        items = [
-            u for u in items
-            if q in (u.get("name","").lower())
-            or q in (u.get("email","").lower())
-            or q in (u.get("username","").lower())
-            or q == (u.get("uid","") or "").lower()
-            or q == (u.get("role","") or "").lower()
-            or q == str(u.get("id","")).lower()
-        ]
-    return jsonify(items)
+    # ?q= matches a substring of name / email / username, or an exact
+    # id / uid / role; ?role= / ?status= (active|inactive) narrow the list
+    keys = user_directory.index.search(request.args.get('q') or '',
+                                       role=request.args.get('role') or '',
+                                       status=request.args.get('status') or '')
+    return jsonify(_flat_users(keys))
+
+# Type-ahead: the first ?limit= (default 10) users with a word starting with ?q=
+@app.get("/api/users/suggest")
+@http_cache.conditional("users")
+def api_users_suggest():
+    q = (request.args.get('q') or '').strip()
+    limit = max(1, min(request.args.get('limit', default=10, type=int) or 10, 100))
+    if not q:
+        return jsonify([])
+    return jsonify(_flat_users(user_directory.index.search(q, limit=limit, prefix=True)))
+
+# Streamed NDJSON / CSV export (?format=ndjson|csv&q=), one line per user
+@app.get("/api/users/export")
+def api_users_export():
+    q = (request.args.get('q') or '').strip()
+    wanted = set(user_directory.index.search(q)) if q else None
+    try:
+        body, mimetype, headers = export_stream.export_users(
+            request.args,
+            lambda role, uname, rec: _flat_user(role, uname, rec)
+            if wanted is None or (role, uname) in wanted else None)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return Response(body, mimetype=mimetype, headers=headers)
 
 @app.route('/api/users/<int:user_id>', methods=['GET', 'PATCH', 'PUT'])
 def api_user_detail(user_id):
@@ -427,7 +413,7 @@ def api_user_detail(user_id):
         rec["username"] = new_username.strip()
 
     if new_password:
-        rec["password"] = generate_password_hash(new_password)
+        rec["password"] = auth_cache.hash_password(new_password)
 
     if new_status_input:
         rec["status"] = ui_status_to_file(new_status_input)
@@ -444,7 +430,7 @@ def api_user_detail(user_id):
         rec["role"] = role
 
     rec["updatedAt"] = now_iso()
-    save_all_users(data)
+    save_all_users(data, change=("upsert", role, uname))
     return jsonify(rec)
 
 @app.post("/api/users/<int:user_id>/status")
@@ -467,7 +453,7 @@ def api_user_status(user_id):
 
     rec["updatedAt"] = now_iso()
     data[role][uname] = rec
-    save_all_users(data)
+    save_all_users(data, change=("upsert", role, uname))
     return jsonify({"ok": True, "status": rec["status"]})
 
 # =========================================================
@@ -560,24 +546,25 @@ def _load_categories():
         cats = _seed_categories_if_empty()
     return cats
 
+def _categories_view():
+    """Read-only category rows from the versioned cache (seeded when empty)."""
+    rows = category_cache.categories.rows()
+    if not rows:
+        _seed_categories_if_empty()
+        rows = category_cache.categories.rows()
+    return rows
+
 def _save_categories(cats):
     save_json(CATS_FILE, cats)
 
-def _next_cat_id(cats):
-    max_num = 0
-    for c in cats:
-        try:
-            part = str(c.get("id","")).split("-")[-1]
-            num = int(part)
-            if num > max_num:
-                max_num = num
-        except Exception:
-            continue
-    return f"CAT-{max_num+1:03d}"
+def _next_cat_id(cats=None):
+    # from the persisted categories sequence; `cats` is no longer scanned
+    return id_allocator.next_category_id()
 
 @app.get("/api/categories")
+@http_cache.conditional("categories")
 def api_categories_list():
-    cats = _load_categories()
+    cats = _categories_view()
     q = (request.args.get("q") or "").strip().lower()
     vis = (request.args.get("visibility") or "").strip().lower()  # public|hidden
     if q:
@@ -597,9 +584,9 @@ def api_categories_create():
     if visibility not in ("public","hidden"):
         visibility = "public"
 
-    cats = _load_categories()
-    if any(c for c in cats if (c.get("name") or "").lower() == name.lower()):
+    if category_cache.categories.by_name(name):
         return jsonify({"error":"Duplicate category name"}), 400
+    cats = _load_categories()
 
     new_cat = {
         "id": _next_cat_id(cats),
@@ -620,61 +607,61 @@ def api_categories_update(cat_id):
     desc = (body.get("desc") or "").strip()
     visibility = (body.get("visibility") or "").strip().lower() or None
 
-    cats = _load_categories()
-    idx = next((i for i, c in enumerate(cats) if str(c.get("id")) == str(cat_id)), -1)
-    if idx == -1:
-        return jsonify({"error":"Not found"}), 404
-
-    if name:
-        cats[idx]["name"] = name
-    cats[idx]["desc"] = desc if desc is not None else cats[idx].get("desc","")
-    if visibility in ("public","hidden"):
-        cats[idx]["visibility"] = visibility
-    cats[idx]["updatedAt"] = now_iso()
-    _save_categories(cats)
+    # category + the requests' denormalized name change together
+    with storage.transaction():
+        cats = _load_categories()
+        idx = next((i for i, c in enumerate(cats) if str(c.get("id")) == str(cat_id)), -1)
+        if idx == -1:
+            return jsonify({"error":"Not found"}), 404
+
+        old = dict(cats[idx])
+        if name:
+            cats[idx]["name"] = name
+        cats[idx]["desc"] = desc if desc is not None else cats[idx].get("desc","")
+        if visibility in ("public","hidden"):
+            cats[idx]["visibility"] = visibility
+        cats[idx]["updatedAt"] = now_iso()
+        _save_categories(cats)
+        if name and name != old.get("name"):
+            # only the requests in the category's reverse index, one batch write
+            category_cache.propagate_rename(old, name)
     return jsonify(cats[idx])
 
 @app.delete("/api/categories/<cat_id>")
 def api_categories_delete(cat_id):
-    cats = _load_categories()
-    idx = next((i for i, c in enumerate(cats) if str(c.get("id")) == str(cat_id)), -1)
-    if idx == -1:
-        return jsonify({"error":"Not found"}), 404
-
-    # Block deletion if any request references this category
-    reqs = load_json(REQUESTS_FILE, [])
-    in_use = [r for r in reqs if str(r.get("categoryId")) == str(cat_id)]
-    if in_use:
-        return jsonify({
-            "error": "Category is in use by existing requests.",
-            "usageCount": len(in_use)
-        }), 409
-
-    removed = cats.pop(idx)
-    _save_categories(cats)
+    with storage.transaction():
+        cats = _load_categories()
+        idx = next((i for i, c in enumerate(cats) if str(c.get("id")) == str(cat_id)), -1)
+        if idx == -1:
+            return jsonify({"error":"Not found"}), 404
+
+        # Block deletion if any request references this category (O(1) from
+        # the maintained category -> requests index)
+        in_use = category_cache.usage_count(cats[idx])
+        if in_use:
+            return jsonify({
+                "error": "Category is in use by existing requests.",
+                "usageCount": in_use
+            }), 409
+
+        removed = cats.pop(idx)
+        _save_categories(cats)
     return jsonify({"ok": True, "deleted": removed.get("id")})
 
 # Optional CSR-friendly alias — same data
 @app.get("/api/request-categories")
+@http_cache.conditional("categories")
 def api_request_categories():
-    return jsonify(_load_categories())
+    return jsonify(_categories_view())
 
 # =========================================================
 # CSR-FACING ENDPOINTS (compat with your CSR HTML)
 # =========================================================
 
-# ---- Requests (shared) ----
-def _load_requests():
-    return load_json(REQUESTS_FILE, [])
-
-def _save_requests(reqs):
-    save_json(REQUESTS_FILE, reqs)
-
-def _next_req_id(reqs):
-    return 1 + max([int(r.get("id", 0)) for r in reqs] or [0])
-
+# ---- Requests (shared with Max_app, see request_repository.py) ----
 def _cat_by_id(cat_id, cats=None):
-    cats = cats or _load_categories()
+    if cats is None:
+        return category_cache.categories.get(cat_id)
     return next((c for c in cats if str(c.get("id")) == str(cat_id)), None)
 
 def _req_id_to_string(req_id):
@@ -695,22 +682,16 @@ def _req_string_to_int(sid):
     except Exception:
         return None
 
-def _map_req_to_csr(rec, cats_index=None, shortlist_ids=None):
-    """Map internal request record to the structure used by CSR UI."""
-    rid = _req_id_to_string(rec.get("id"))
-    cat_name = rec.get("categoryName")
-    cat_id = rec.get("categoryId")
-    if not cat_name and cats_index and cat_id:
-        c = cats_index.get(str(cat_id))
-        if c:
-            cat_name = c.get("name")
+def _map_req_to_csr(rec, cats_index=None):
+    """Map a request record (either app's shape) to the structure used by CSR UI."""
+    k = request_repository.keys(rec)  # precomputed id / status / dates / names
+    rid = k.id
+    cat_name = request_repository.category_name(rec, cats_index)
     title = rec.get("title") or (cat_name or "Assistance")  # fallback title
-    created = rec.get("createdAt") or now_iso()
-    date_only = (created or now_iso())[:10]  # YYYY-MM-DD
-    owner = rec.get("createdBy") or ""
-    status = rec.get("status", "pending").strip().title()  # Pending/In Progress/Completed
-
-    shortlist_count = 1 if (shortlist_ids and rid in shortlist_ids) else 0
+    created = k.created or now_iso()
+    date_only = k.day or created[:10]  # YYYY-MM-DD
+    owner = k.owner
+    status = k.status.title()  # Pending/In Progress/Completed
 
     return {
         "id": rid,
@@ -723,30 +704,37 @@ def _map_req_to_csr(rec, cats_index=None, shortlist_ids=None):
         "description": rec.get("description") or "",
         "location": rec.get("location") or "",
         "viewCount": 0,
-        "shortlistCount": shortlist_count,
+        "shortlistCount": shortlist_store.store.count(rid),
         "assignedTo": rec.get("assignedTo"),
         "assignedAt": rec.get("assignedAt"),
     }
 
+# Streamed export of the raw request records, one line each
+# (?format=ndjson|csv plus the search filters: status, category, owner,
+# date, from, to, title, keyword)
+@app.get("/api/requests/export")
+def api_requests_export():
+    try:
+        body, mimetype, headers = export_stream.export_requests(request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return Response(body, mimetype=mimetype, headers=headers)
+
 # Create/list requests (JSON)
 @app.route("/api/requests", methods=["GET", "POST"])
+@http_cache.conditional("requests", "categories")
 def api_requests():
     if request.method == "GET":
-        reqs = _load_requests()
-        cats = _load_categories()
-        cat_index = {str(c["id"]): c for c in cats}
-        enriched = []
-        for r in reqs:
-            c = cat_index.get(str(r.get("categoryId")))
-            enriched.append({
-                **r,
-                "expandedCategory": {
-                    "id": c.get("id"),
-                    "name": c.get("name"),
-                    "visibility": c.get("visibility")
-                } if c else None
-            })
-        return jsonify(enriched)
+        reqs = request_repository.view()
+        # enriched rows (and their JSON) are memoized until the request or
+        # any category changes; see category_cache.py
+        # ?limit=&cursor=&sort=&count=1 -> one page from the sorted order
+        # indexes; only that page is enriched
+        if pagination.wants_page(request.args):
+            payload, status = pagination.page_payload(request_repository.ordered, request.args,
+                                                      fmt=category_cache.enriched.enrich)
+            return jsonify(payload), status
+        return Response(category_cache.enriched.json_array(reqs), mimetype="application/json")
 
     # POST -> create request
     body = request.get_json(force=True, silent=True) or {}
@@ -758,13 +746,14 @@ def api_requests():
     if not category_id:
         return jsonify({"error": "categoryId is required"}), 400
 
-    cats = _load_categories()
-    cat = _cat_by_id(category_id, cats)
+    _categories_view()
+    cat = _cat_by_id(category_id)
     if not cat:
         return jsonify({"error": "Invalid categoryId"}), 400
 
-    reqs = _load_requests()
-    new_id = _next_req_id(reqs)
+    # ids come from the persisted requests sequence: unique across threads
+    # and processes, never reused after a delete
+    new_id = id_allocator.allocator.next("requests")
     rec = {
         "id": new_id,
         "categoryId": cat["id"],
@@ -775,8 +764,7 @@ def api_requests():
         "createdAt": now_iso(),
         "updatedAt": now_iso()
     }
-    reqs.append(rec)
-    _save_requests(reqs)
+    request_repository.insert(rec)
 
     return jsonify({
         **rec,
@@ -788,35 +776,40 @@ def api_requests():
 # Update/Delete a single request (JSON)
 @app.route("/api/requests/<int:req_id>", methods=["PUT", "PATCH", "DELETE"])
 def api_request_detail(req_id):
-    reqs = _load_requests()
-    idx = next((i for i, r in enumerate(reqs) if int(r.get("id", 0)) == int(req_id)), -1)
-    if idx == -1:
+    found = request_repository.get(req_id)
+    if found is None:
         return jsonify({"error": "Not found"}), 404
 
     if request.method == "DELETE":
-        removed = reqs.pop(idx)
-        _save_requests(reqs)
-        return jsonify({"ok": True, "deleted": removed.get("id")})
+        request_repository.delete(found.get("id"))
+        shortlist_store.store.forget(found.get("id"))
+        return jsonify({"ok": True, "deleted": found.get("id")})
 
     body = request.get_json(force=True, silent=True) or {}
-    if "description" in body:
-        reqs[idx]["description"] = (body.get("description") or "").strip()
-    if "status" in body:
-        reqs[idx]["status"] = (body.get("status") or "").strip().lower()
-
+    new_cat = None
     if "categoryId" in body and body.get("categoryId") is not None:
-        cat = _cat_by_id(body.get("categoryId"))
-        if not cat:
+        new_cat = _cat_by_id(body.get("categoryId"))
+        if not new_cat:
             return jsonify({"error": "Invalid categoryId"}), 400
-        reqs[idx]["categoryId"] = cat["id"]
-        reqs[idx]["categoryName"] = cat["name"]
 
-    reqs[idx]["updatedAt"] = now_iso()
-    _save_requests(reqs)
+    def apply(rec):
+        if "description" in body:
+            rec["description"] = (body.get("description") or "").strip()
+        if "status" in body:
+            rec["status"] = (body.get("status") or "").strip().lower()
+        if new_cat:
+            rec["categoryId"] = new_cat["id"]
+            rec["categoryName"] = new_cat["name"]
+        rec["updatedAt"] = now_iso()
+
+    # compare-and-swap: re-applied if another writer got in first
+    updated = request_repository.modify(req_id, apply)
+    if updated is None:
+        return jsonify({"error": "Not found"}), 404
 
-    cat = _cat_by_id(reqs[idx]["categoryId"])
+    cat = _cat_by_id(updated.get("categoryId"))
     return jsonify({
-        **reqs[idx],
+        **updated,
         "expandedCategory": {
             "id": cat["id"], "name": cat["name"], "visibility": cat["visibility"]
         } if cat else None
@@ -836,21 +829,25 @@ def csr_assign_request(rid):
     if num is None:
         return jsonify({"success": False, "message": "Invalid id"}), 400
 
-    reqs = _load_requests()
-    idx = next((i for i, r in enumerate(reqs) if int(r.get("id", 0)) == int(num)), -1)
-    if idx == -1:
+    held_by = []
+
+    def assign(rec):
+        current = rec.get("assignedTo")
+        if current and current != me:
+            held_by.append(current)
+            return False
+        rec["assignedTo"] = me
+        rec["assignedAt"] = now_iso()
+        # Optional: reflect progress in status while preserving your UI logic
+        rec["status"] = (rec.get("status") or "pending").lower()
+
+    # compare-and-swap, so two CSRs racing for one request can't both win
+    found = request_repository.modify(num, assign, event="assign")
+    if found is None:
         return jsonify({"success": False, "message": "Not found"}), 404
-
-    current = reqs[idx].get("assignedTo")
-    if current and current != me:
-        return jsonify({"success": False, "message": f"Already assigned to {current}"}), 409
-
-    reqs[idx]["assignedTo"] = me
-    reqs[idx]["assignedAt"] = now_iso()
-    # Optional: reflect progress in status while preserving your UI logic
-    reqs[idx]["status"] = (reqs[idx].get("status") or "pending").lower()
-    _save_requests(reqs)
-    return jsonify({"success": True, "assignedTo": me, "assignedAt": reqs[idx]["assignedAt"]})
+    if held_by:
+        return jsonify({"success": False, "message": f"Already assigned to {held_by[-1]}"}), 409
+    return jsonify({"success": True, "assignedTo": me, "assignedAt": found["assignedAt"]})
 
 @app.delete("/api/csr/requests/<rid>/assign")
 def csr_unassign_request(rid):
@@ -862,51 +859,56 @@ def csr_unassign_request(rid):
     if num is None:
         return jsonify({"success": False, "message": "Invalid id"}), 400
 
-    reqs = _load_requests()
-    idx = next((i for i, r in enumerate(reqs) if int(r.get("id", 0)) == int(num)), -1)
-    if idx == -1:
-        return jsonify({"success": False, "message": "Not found"}), 404
+    held_by = []
 
-    # If someone else owns it, block unassign from here
-    current = reqs[idx].get("assignedTo")
-    if current and current != me:
-        return jsonify({"success": False, "message": f"Assigned to {current}"}), 409
+    def unassign(rec):
+        # If someone else owns it, block unassign from here
+        current = rec.get("assignedTo")
+        if current and current != me:
+            held_by.append(current)
+            return False
+        rec["assignedTo"] = None
+        rec["assignedAt"] = None
 
-    reqs[idx]["assignedTo"] = None
-    reqs[idx]["assignedAt"] = None
-    _save_requests(reqs)
+    found = request_repository.modify(num, unassign, event="unassign")
+    if found is None:
+        return jsonify({"success": False, "message": "Not found"}), 404
+    if held_by:
+        return jsonify({"success": False, "message": f"Assigned to {held_by[-1]}"}), 409
     return jsonify({"success": True})
 
 
 # CSR list
 @app.get("/api/csr/requests")
+@http_cache.conditional("requests", "categories", "shortlists")
 def csr_requests_list():
-    reqs = _load_requests()
-    cats = _load_categories()
-    cat_index = {str(c["id"]): c for c in cats}
-    shortlist_ids = set(load_json(SHORTLISTS_FILE, []))
-    items = [_map_req_to_csr(r, cat_index, shortlist_ids) for r in reqs]
+    reqs = request_repository.view()
+    cat_index = category_cache.categories.by_id()
+    if pagination.wants_page(request.args):
+        payload, status = pagination.page_payload(
+            request_repository.ordered, request.args, fmt=lambda r: _map_req_to_csr(r, cat_index))
+        return jsonify(payload), status
+    items = [_map_req_to_csr(r, cat_index) for r in reqs]
     return jsonify(items)
 
 # CSR detail (with counts)
 @app.get("/api/csr/requests/<rid>")
+@http_cache.conditional("requests", "categories", "shortlists")
 def csr_request_detail(rid):
     num = _req_string_to_int(rid)
     if num is None:
         return jsonify({"success": False, "message": "Invalid id"}), 404
-    reqs = _load_requests()
-    rec = next((r for r in reqs if int(r.get("id", 0)) == num), None)
+    rec = request_repository.get(num)
     if not rec:
         return jsonify({"success": False, "message": "Not found"}), 404
 
-    cats = _load_categories()
-    cat_index = {str(c["id"]): c for c in cats}
-    shortlist_ids = set(load_json(SHORTLISTS_FILE, []))
-    mapped = _map_req_to_csr(rec, cat_index, shortlist_ids)
+    cat_index = category_cache.categories.by_id()
+    mapped = _map_req_to_csr(rec, cat_index)
     return jsonify({"success": True, "request": mapped})
 
 # CSR search
 @app.route("/api/csr/requests/search", methods=["POST", "GET"])
+@http_cache.conditional("requests", "categories", "shortlists")
 def csr_requests_search():
     if request.method == "POST":
         body = request.get_json(silent=True, force=True) or {}
@@ -918,47 +920,40 @@ def csr_requests_search():
         cat = (request.args.get("category") or "").strip()
         status = (request.args.get("status") or "").strip().lower()
 
-    reqs = _load_requests()
-    cats = _load_categories()
-    cat_index = {str(c["id"]): c for c in cats}
-    shortlist_ids = set(load_json(SHORTLISTS_FILE, []))
-    rows = [_map_req_to_csr(r, cat_index, shortlist_ids) for r in reqs]
-
-    if kw:
-        rows = [r for r in rows if kw in (r["title"] or "").lower()
-                or kw in (r["description"] or "").lower()
-                or kw in str(r["id"]).lower()]
-    if cat:
-        rows = [r for r in rows if r["category"] == cat]
-    if status:
-        rows = [r for r in rows if (r["status"] or "").lower() == status]
+    # filtered on the precomputed keys; only the hits are mapped
+    cat_index = category_cache.categories.by_id()
+    rows = [_map_req_to_csr(r, cat_index)
+            for r in request_repository.match(keyword=kw, category=cat, status=status,
+                                                 cats_index=cat_index)]
 
+    # paging parameters always come in the query string (also for POST)
+    if pagination.wants_page(request.args):
+        payload, code = pagination.page_payload(rows, request.args)
+        return jsonify(payload), code
     return jsonify({"success": True, "requests": rows, "count": len(rows)})
 
+def _shortlist_owner():
+    """Shortlists are kept per CSR (see shortlist_store.py)."""
+    return session.get("name") or session.get("username") or ""
+
 # CSR shortlist list
 @app.get("/api/csr/shortlist")
+@http_cache.conditional("requests", "categories", "shortlists")
 def csr_shortlist_list():
-    ids = set(load_json(SHORTLISTS_FILE, []))
-    reqs = _load_requests()
-    cats = _load_categories()
-    cat_index = {str(c["id"]): c for c in cats}
-    rows = []
-    for r in reqs:
-        rid = _req_id_to_string(r.get("id"))
-        if rid in ids:
-            rows.append(_map_req_to_csr(r, cat_index, ids))
+    cat_index = category_cache.categories.by_id()
+    recs = map(request_repository.get, shortlist_store.store.list(_shortlist_owner()))
+    rows = [_map_req_to_csr(r, cat_index) for r in recs if r is not None]
     return jsonify({"success": True, "requests": rows, "count": len(rows)})
 
 # CSR shortlist save
 @app.post("/api/csr/shortlist/save/<rid>")
 def csr_shortlist_save(rid):
     rid_str = _req_id_to_string(_req_string_to_int(rid) or rid)
-    ids = load_json(SHORTLISTS_FILE, [])
-    if rid_str in ids:
+
+    # one locked write of the shortlist document
+    if not shortlist_store.store.add(_shortlist_owner(), rid_str):
         # Return a shaped error your front-end already understands
         return jsonify({"success": False, "message": f"Error: Request '{rid_str}' is already shortlisted."}), 409
-    ids.append(rid_str)
-    save_json(SHORTLISTS_FILE, ids)
     return jsonify({"success": True, "message": f"Request '{rid_str}' saved to shortlist."})
 
 
@@ -968,10 +963,7 @@ def csr_shortlist_save(rid):
 def csr_shortlist_delete(rid):
     rid_num = _req_string_to_int(rid)
     rid_str = _req_id_to_string(rid_num) if rid_num is not None else _req_id_to_string(rid)
-    ids = set(load_json(SHORTLISTS_FILE, []))
-    if rid_str in ids:
-        ids.remove(rid_str)
-        save_json(SHORTLISTS_FILE, list(ids))
+    if shortlist_store.store.remove(_shortlist_owner(), rid_str):
         return jsonify({"success": True, "message": f"Request '{rid_str}' removed from shortlist."})
     # idempotent OK if not present
     return jsonify({"success": True, "message": f"Request '{rid_str}' was not in shortlist."})
@@ -990,15 +982,51 @@ def csr_dashboard_page():
 # Misc (matches existing JSON pages in your project)
 # =========================================================
 @app.get("/api/matches")
+@http_cache.conditional("matches")
 def api_matches_list():
     matches = load_json(MATCHES_FILE, [])
     return jsonify(matches)
 
 @app.get("/api/shortlists")
+@http_cache.conditional("shortlists")
 def api_shortlists_list():
-    short = load_json(SHORTLISTS_FILE, [])
+    short = load_json(SHORTLISTS_FILE, {})
     return jsonify(short)
 
+@app.get("/api/events")
+def api_change_events():
+    """Live request / shortlist changes as server-sent events (see change_feed.py)."""
+    role, user = change_feed.session_identity(session)
+    if not role:
+        return jsonify({"error": "Not authenticated"}), 401
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+    body, mimetype, headers = change_feed.sse_response_args(role, user, last_id)
+    return Response(body, mimetype=mimetype, headers=headers)
+
+@app.get("/api/cache/stats")
+def api_cache_stats():
+    """Hit / miss counters of the in-process caches."""
+    if not session.get("role"):
+        return jsonify({"error": "Not authenticated"}), 401
+    return jsonify({**category_cache.stats(), "auth": auth_cache.stats(),
+                    "userDirectory": {"users": len(user_directory.index), **user_directory.index.counts()}})
+
+@app.get("/api/reports")
+@http_cache.conditional(*report_engine.SOURCE_DOCS, extra=report_engine.today)
+def api_reports():
+    """Daily / weekly / monthly / custom platform report from the pre-aggregated counters."""
+    payload, status = report_engine.report_payload(request.args)
+    return jsonify(payload), status
+
+@app.get("/api/reports/export")
+def api_reports_export():
+    """Per-day report rows for the same period parameters, streamed as NDJSON / CSV."""
+    try:
+        body, mimetype, headers = export_stream.export_report(request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return Response(body, mimetype=mimetype, headers=headers)
+
 # =========================================================
 # RUN APP
 # =========================================================
@@ -1007,7 +1035,7 @@ if __name__ == '__main__':
     _seed_categories_if_empty()
     _ensure_file(REQUESTS_FILE, [])
     _ensure_file(MATCHES_FILE, [])
-    _ensure_file(SHORTLISTS_FILE, [])
+    _ensure_file(SHORTLISTS_FILE, {})
     migrate_users_file()
     app.run(debug=True)
 
@@ -0,0 +1,372 @@
+# ================================================
+# auth_cache.py — login fast path
+#
+#   directory   (role, username) -> account record, kept in sync with the
+#               cached users document (no users.json re-read / copy per login)
+#   verified    short-lived cache of successful password checks. Entries are
+#               keyed by HMAC-SHA256(process secret, stored hash + password),
+#               so neither passwords nor reusable hashes are kept in memory,
+#               and a changed password (new stored hash) never matches an old
+#               entry. Bounded by AUTH_CACHE_SIZE entries (default 1024) and
+#               AUTH_CACHE_TTL seconds (default 300; 0 disables the cache).
+#   rehash      legacy plaintext passwords (and hashes made with another
+#               method than AUTH_HASH_METHOD) are re-hashed by a background
+#               thread after a successful login; the login never waits.
+#
+# AUTH_HASH_METHOD is the Werkzeug method for new hashes, e.g.
+# "scrypt:32768:8:1" (default) or "pbkdf2:sha256:600000". Lowering the cost
+# speeds up cold logins; existing hashes are upgraded/downgraded on login.
+# Short forms ("scrypt", "pbkdf2:sha256") mean Werkzeug's default parameters
+# and are expanded before stored hashes are compared against them.
+#
+#   python auth_cache.py bench [--seconds S] [--users N]   # logins/sec, one core
+#   python auth_cache.py rehash                            # hash all plaintext now
+# ================================================
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import storage
+from data_cache import freeze
+
+USERS_DOC = "users"
+HASH_METHOD = os.environ.get("AUTH_HASH_METHOD") or "scrypt:32768:8:1"
+HASH_PREFIXES = ("scrypt", "pbkdf2")
+
+log = logging.getLogger(__name__)
+
+
+def _role_key(role) -> str:
+    return str(role or "").strip().lower()
+
+
+def is_hashed(stored) -> bool:
+    return isinstance(stored, str) and stored.split(":", 1)[0].lower() in HASH_PREFIXES and ":" in stored
+
+
+def hash_password(password: str) -> str:
+    """Hash a new password with the configured method / cost."""
+    return generate_password_hash(password, method=HASH_METHOD)
+
+
+@lru_cache(maxsize=32)
+def method_params(method: str) -> Tuple[str, ...]:
+    """
+    Full Werkzeug parameters of a method, short forms filled in with the
+    installed Werkzeug's defaults: "scrypt" -> ("scrypt", "32768", "8", "1"),
+    "pbkdf2:sha256" -> ("pbkdf2", "sha256", "<default iterations>").
+    """
+    try:
+        method = generate_password_hash("", method=method).split("$", 1)[0]
+    except (ValueError, TypeError):
+        pass  # unknown to this Werkzeug: compare as written
+    return tuple(p.strip().lower() for p in method.split(":"))
+
+
+def needs_rehash(stored) -> bool:
+    """Plaintext, or hashed with another method / cost than HASH_METHOD."""
+    if not is_hashed(stored):
+        return True
+    return method_params(stored.split("$", 1)[0]) != method_params(HASH_METHOD)
+
+
+def check(stored, provided) -> bool:
+    """Uncached check: Werkzeug hashes, or legacy plaintext."""
+    if not isinstance(stored, str) or not stored:
+        return False
+    if is_hashed(stored):
+        try:
+            return check_password_hash(stored, provided or "")
+        except Exception:
+            return False
+    return hmac.compare_digest(stored.encode("utf-8"), str(provided or "").encode("utf-8"))
+
+
+# -----------------------------
+# (role, username) -> account
+# -----------------------------
+class UserDirectory:
+    """Flat index of the users document, rebuilt whenever the document changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_key: Dict[Tuple[str, str], Mapping] = {}
+        self._users: Mapping = {}
+
+    def apply(self, view, change) -> None:
+        """Cache listener: users changes are whole-document, so rebuild."""
+        by_key = {}
+        for role, bucket in (view or {}).items():
+            if not isinstance(bucket, Mapping):
+                continue
+            for uname, rec in bucket.items():
+                if isinstance(rec, Mapping):
+                    by_key[(_role_key(role), uname)] = rec
+        with self._lock:
+            self._by_key, self._users = by_key, view or {}
+
+    def get(self, role, username) -> Optional[Mapping]:
+        """Read-only account record, or None."""
+        storage.doc_view(USERS_DOC)  # refresh first if another process wrote
+        return self._by_key.get((_role_key(role), username or ""))
+
+    def users(self) -> Mapping:
+        """The whole users document, read-only (for the BCE login entity)."""
+        storage.doc_view(USERS_DOC)
+        return self._users
+
+    def items(self):
+        storage.doc_view(USERS_DOC)
+        return list(self._by_key.items())
+
+    def is_suspended(self, role, username) -> bool:
+        rec = self.get(role, username) or {}
+        return (rec.get("status") or "").strip().lower() in ("suspended", "inactive")
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+
+# -----------------------------
+# Successful verifications
+# -----------------------------
+class VerifiedCache:
+    """HMAC(secret, stored + password) -> expiry, LRU-bounded."""
+
+    def __init__(self, size: int | None = None, ttl: float | None = None):
+        self.size = int(size if size is not None else os.environ.get("AUTH_CACHE_SIZE") or 1024)
+        self.ttl = float(ttl if ttl is not None else os.environ.get("AUTH_CACHE_TTL") or 300)
+        self._secret = os.urandom(32)
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, stored: str, provided: str) -> bytes:
+        msg = stored.encode("utf-8") + b"\0" + str(provided).encode("utf-8")
+        return hmac.new(self._secret, msg, hashlib.sha256).digest()
+
+    def verify(self, stored, provided) -> bool:
+        """check(), answered from the cache for a recently verified pair."""
+        if self.ttl <= 0 or not isinstance(stored, str) or not stored:
+            return check(stored, provided)
+        key = self._key(stored, provided)
+        now = time.monotonic()
+        with self._lock:
+            expiry = self._entries.get(key)
+            if expiry is not None:
+                if expiry > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True
+                del self._entries[key]
+            self.misses += 1
+        if not check(stored, provided):
+            return False  # failures are never cached
+        with self._lock:
+            self._entries[key] = now + self.ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def after_fork(self) -> None:
+        # a worker gets its own secret and an empty cache
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# -----------------------------
+# Background rehash
+# -----------------------------
+class Rehasher:
+    """Re-hashes accounts off the request path, one locked users write each."""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Tuple[str, str, str]]" = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.done = 0
+
+    def submit(self, role, username, password) -> None:
+        key = (_role_key(role), username)
+        with self._lock:
+            if key in self._queued:
+                return
+            self._queued.add(key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="auth-rehash", daemon=True)
+                self._thread.start()
+        self._queue.put((key[0], username, password))
+
+    def rehash(self, role, username, password) -> bool:
+        """Replace the stored password if it still verifies; returns True if written."""
+        new_hash = hash_password(password)  # slow part, outside the write lock
+        written = []
+
+        def swap(data):
+            bucket = next((b for r, b in (data or {}).items() if _role_key(r) == role and isinstance(b, dict)), {})
+            rec = bucket.get(username)
+            stored = rec.get("password") if isinstance(rec, dict) else None
+            # the password may have been changed since the login
+            if not stored or not needs_rehash(stored) or not check(stored, password):
+                return False
+            rec["password"] = new_hash
+            written.append(True)
+
+        storage.modify_doc(USERS_DOC, swap, {})
+        return bool(written)
+
+    def _run(self) -> None:
+        while True:
+            role, username, password = self._queue.get()
+            try:
+                if self.rehash(role, username, password):
+                    self.done += 1
+            except Exception:
+                log.exception("rehash of %s/%s failed", role, username)
+            finally:
+                with self._lock:
+                    self._queued.discard((role, username))
+                self._queue.task_done()
+
+    def wait(self) -> None:
+        """Block until everything submitted so far is written."""
+        self._queue.join()
+
+    def after_fork(self) -> None:
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+
+directory = UserDirectory()
+storage.cache.subscribe(USERS_DOC, directory.apply)
+verified = VerifiedCache()
+rehasher = Rehasher()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: (verified.after_fork(), rehasher.after_fork()))
+
+
+def verify(stored, provided) -> bool:
+    """Drop-in password_checker(stored, provided) backed by the verification cache."""
+    return verified.verify(stored, provided)
+
+
+def authenticate(role, username, password) -> Optional[Mapping]:
+    """Account record if the password matches (suspension is the caller's check), else None."""
+    rec = directory.get(role, username)
+    if rec is None or not verify(rec.get("password"), password):
+        return None
+    login_succeeded(role, username, password)
+    return rec
+
+
+def login_succeeded(role, username, password) -> None:
+    """Queue a transparent rehash if the account's stored password needs one."""
+    rec = directory.get(role, username)
+    if rec is not None and needs_rehash(rec.get("password")):
+        rehasher.submit(role, username, password)
+
+
+def rehash_all() -> int:
+    """Hash every plaintext password now (the stored value is the password)."""
+    count = 0
+    for (role, username), rec in directory.items():
+        stored = rec.get("password")
+        if isinstance(stored, str) and stored and not is_hashed(stored):
+            count += rehasher.rehash(role, username, stored)
+    return count
+
+
+def stats() -> Dict[str, Any]:
+    return {"users": len(directory), "cached": len(verified), "hits": verified.hits,
+            "misses": verified.misses, "rehashed": rehasher.done, "method": HASH_METHOD}
+
+
+# -----------------------------
+# Benchmark
+# -----------------------------
+def _bench(seconds: float, users: int) -> None:
+    import copy
+
+    accounts = {"csr": {f"user{i}": {"username": f"user{i}", "password": hash_password(f"pw{i}"), "status": "Active"}
+                        for i in range(users)}}
+
+    def before(i):
+        # old path: copy of users.json for _is_suspended and again for the
+        # login entity, then a full hash check
+        for _ in range(2):
+            data = copy.deepcopy(accounts)
+        rec = data["csr"][f"user{i}"]
+        return check(rec["password"], f"pw{i}")
+
+    fast = UserDirectory()
+    fast.apply(freeze(accounts), None)
+    cache = VerifiedCache(size=max(users, 1), ttl=300)
+
+    def after(i):
+        rec = fast.get("csr", f"user{i}")
+        return cache.verify(rec["password"], f"pw{i}")
+
+    def run(fn):
+        n, start = 0, time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            assert fn(n % users)
+            n += 1
+        return n / (time.perf_counter() - start)
+
+    print(f"method {HASH_METHOD}, {users} users, {seconds:g}s per run, one thread (one core)")
+    print(f"  before (copy users + hash check) : {run(before):10.1f} logins/sec")
+    cache.clear()
+    cold = cache.ttl
+    cache.ttl = 0
+    print(f"  after, cache disabled            : {run(after):10.1f} logins/sec")
+    cache.ttl = cold
+    for i in range(users):  # every user has logged in once within the TTL
+        after(i)
+    print(f"  after, warm verification cache   : {run(after):10.1f} logins/sec")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Login fast path tools.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("bench", help="logins/sec per core, before and after")
+    b.add_argument("--seconds", type=float, default=2.0)
+    b.add_argument("--users", type=int, default=20)
+    sub.add_parser("rehash", help="hash every legacy plaintext password in users.json")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "bench":
+        _bench(args.seconds, max(1, args.users))
+    elif args.cmd == "rehash":
+        storage.doc_view(USERS_DOC)
+        print(f"Rehashed {rehash_all()} plaintext password(s) with {HASH_METHOD}.")
+
+
+if __name__ == "__main__":
+    main()
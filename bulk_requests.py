@@ -0,0 +1,309 @@
+# ================================================
+# bulk_requests.py — bulk import and bulk CSR updates for requests
+#
+# Import: rows arrive as a JSON array (or {"requests": [...]}), JSON lines,
+# or CSV with a header row (title, description, category, date, location,
+# time, owner, id, created). Every row goes through the UserStory13
+# CreateRequestController rules and record shape; valid rows get ids as one
+# block from the requests sequence (id_allocator.py) and are written with a
+# single storage batch, so N rows cost one write instead of N. Invalid rows
+# are reported by row number and skipped (or, with atomic, nothing is
+# written).
+#
+# Update: one action (assign / unassign / complete / status) applied to
+# many ids under the storage write lock and written as one batch.
+#
+#   POST /api/requests/bulk          ?format=json|jsonl|csv &dryRun=1 &atomic=1
+#   POST /api/csr/requests/bulk      {"ids": [...], "action": "...", "status": "..."}
+#
+#   python bulk_requests.py import FILE|- [--format F] [--owner U] [--dry-run] [--atomic]
+#   python bulk_requests.py update ACTION ID [ID ...] [--status S] [--by NAME]
+# ================================================
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import id_allocator
+import storage
+from request_index import canonical_id
+from UserStory13_PIN_CreateRequest import CreateRequestController, Request
+
+FORMATS = ("json", "jsonl", "csv")
+MAX_ROWS = int(os.environ.get("BULK_MAX_ROWS") or 5000)
+ACTIONS = ("assign", "unassign", "complete", "status")
+STATUSES = {"pending": "pending", "in progress": "in progress", "completed": "Completed"}
+
+_CONTENT_TYPES = {
+    "application/json": "json",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/x-jsonlines": "jsonl",
+    "text/csv": "csv",
+}
+_PENDING_ID = "REQ-?"  # placeholder until the block is reserved
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+# -----------------------------
+# Parsing
+# -----------------------------
+def detect_format(fmt: Optional[str] = None, content_type: Optional[str] = None, filename: Optional[str] = None) -> str:
+    """Explicit format, else Content-Type, else file extension; JSON by default."""
+    if fmt:
+        fmt = fmt.strip().lower().replace("ndjson", "jsonl")
+        if fmt not in FORMATS:
+            raise ValueError(f"Error: Unknown format '{fmt}' (use one of: {', '.join(FORMATS)}).")
+        return fmt
+    ctype = (content_type or "").split(";", 1)[0].strip().lower()
+    if ctype in _CONTENT_TYPES:
+        return _CONTENT_TYPES[ctype]
+    ext = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if ext in ("jsonl", "ndjson"):
+        return "jsonl"
+    return ext if ext in FORMATS else "json"
+
+
+def iter_rows(stream: Iterable[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    (row number, row) pairs from a text stream. JSON lines and CSV are read
+    line by line; a row that cannot be parsed is yielded as a ValueError.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for n, row in enumerate(reader, start=1):
+            yield n, {k.strip(): (v or "").strip() for k, v in row.items() if k}
+    elif fmt == "jsonl":
+        n = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            n += 1
+            try:
+                yield n, json.loads(line)
+            except ValueError as e:
+                yield n, ValueError(f"Error: Invalid JSON ({e}).")
+    else:
+        text = stream.read() if hasattr(stream, "read") else "".join(stream)
+        try:
+            data = json.loads(text or "[]")
+        except ValueError as e:
+            raise ValueError(f"Error: Invalid JSON ({e}).")
+        if isinstance(data, dict):
+            data = data.get("requests", [data])
+        if not isinstance(data, list):
+            raise ValueError("Error: Expected a JSON array of requests.")
+        for n, row in enumerate(data, start=1):
+            yield n, row
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def import_rows(rows: Iterable[Tuple[int, Any]], owner: Optional[str] = None, force_owner: bool = False,
+                dry_run: bool = False, atomic: bool = False) -> Dict[str, Any]:
+    """
+    Validate + build every row with the UserStory13 controller, then take
+    ids for the valid rows as one block from the requests sequence and write
+    them as one batch.
+
+    Returns {"created": [ids], "errors": [{"row", "message"}], "written": bool}.
+    """
+    staged: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    auto: List[Dict[str, Any]] = []  # staged records that still need an id
+    explicit: List[str] = []         # ids given in the rows
+    controller = CreateRequestController(
+        entity=Request(),
+        load_requests_func=lambda: staged,
+        insert_request_func=staged.append,  # stage only; written below in one batch
+    )
+
+    with storage.transaction():
+        taken = {canonical_id(r.get("id")) for r in storage.requests_view()}
+        count = 0
+        for n, row in rows:
+            count += 1
+            if count > MAX_ROWS:
+                errors.append({"row": n, "message": f"Error: At most {MAX_ROWS} rows per import."})
+                break
+            if isinstance(row, Exception):
+                errors.append({"row": n, "message": str(row)})
+                continue
+            if not isinstance(row, Mapping):
+                errors.append({"row": n, "message": "Error: Row must be an object."})
+                continue
+
+            rid = str(row.get("id") or "").strip()
+            if rid and canonical_id(rid) in taken:
+                errors.append({"row": n, "message": f"Error: Request id '{rid}' already exists."})
+                continue
+
+            row_owner = owner if (force_owner or not row.get("owner")) else row.get("owner")
+            result = controller.createRequest(
+                str(row.get("title") or ""),
+                str(row.get("description") or ""),
+                str(row.get("category") or ""),
+                str(row.get("date") or ""),
+                str(row.get("location") or ""),
+                owner=row_owner or "",
+                time=str(row.get("time") or ""),
+                request_id=rid or _PENDING_ID,
+            )
+            if isinstance(result, str):
+                errors.append({"row": n, "message": result})
+                continue
+            if row.get("created"):
+                result["created"] = row.get("created")
+            if rid:
+                taken.add(canonical_id(rid))
+                explicit.append(rid)
+            else:
+                auto.append(result)
+
+        written = bool(staged) and not dry_run and not (atomic and errors)
+        if written:
+            if explicit:  # first, so the block starts above them
+                id_allocator.allocator.observe("requests", max(explicit, key=id_allocator.number_of))
+            for rec, num in zip(auto, id_allocator.allocator.reserve("requests", len(auto))):
+                rec["id"] = f"REQ-{num}"
+            storage.update_requests(staged, event="create")
+    return {"created": [r["id"] for r in staged] if written else [],
+            "valid": len(staged), "errors": errors, "written": written}
+
+
+def import_payload(stream, fmt: str, **kw) -> Tuple[Dict[str, Any], int]:
+    """import_rows() shaped as a JSON payload + HTTP status."""
+    try:
+        result = import_rows(iter_rows(stream, fmt), **kw)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}, 400
+    ok = not result["errors"]
+    status = 200 if ok or result["written"] else 400
+    return {"success": ok, **result}, status
+
+
+# -----------------------------
+# Bulk update (CSR triage)
+# -----------------------------
+def mutation(action: str, by: str, status: Optional[str] = None) -> Callable[[Dict[str, Any]], Any]:
+    """The per-record edit for an action, as the single-request CSR endpoints do it."""
+    if action == "assign":
+        def edit(rec):
+            rec["assignedTo"] = by
+            rec["assignedAt"] = _now_iso()
+            if (rec.get("status") or "").lower() != "completed":
+                rec["status"] = "in progress"
+    elif action == "unassign":
+        def edit(rec):
+            rec["assignedTo"] = None
+            rec["assignedAt"] = None
+            if (rec.get("status") or "").lower() != "completed":
+                rec["status"] = "pending"
+    elif action == "complete":
+        def edit(rec):
+            rec["status"] = "Completed"
+            rec["completedAt"] = _now_iso()
+            if not rec.get("assignedTo"):
+                rec["assignedTo"] = by
+                rec["assignedAt"] = _now_iso()
+    elif action == "status":
+        value = STATUSES.get((status or "").strip().lower())
+        if value is None:
+            raise ValueError(f"Error: Unknown status '{status}' (use one of: {', '.join(STATUSES)}).")
+
+        def edit(rec):
+            if value == "Completed":
+                return mutation("complete", by)(rec)
+            rec["status"] = value
+    else:
+        raise ValueError(f"Error: Unknown action '{action}' (use one of: {', '.join(ACTIONS)}).")
+    return edit
+
+
+def update_many(ids: Iterable, edit: Callable[[Dict[str, Any]], Any], event: str) -> Dict[str, Any]:
+    """Apply `edit` to every id under the write lock; one batch write. Unknown ids are errors."""
+    recs, errors, seen = [], [], set()
+    with storage.transaction():
+        for rid in ids:
+            key = canonical_id(rid)
+            if key in seen:
+                continue
+            seen.add(key)
+            rec = storage.get_request(rid)
+            if rec is None:
+                errors.append({"id": rid, "message": "Not found"})
+                continue
+            if edit(rec) is not False:
+                recs.append(rec)
+        storage.update_requests(recs, event=event)
+    return {"updated": [r.get("id") for r in recs], "errors": errors}
+
+
+def update_payload(body: Mapping, by: str) -> Tuple[Dict[str, Any], int]:
+    """POST /api/csr/requests/bulk body -> JSON payload + HTTP status."""
+    ids = body.get("ids")
+    if not isinstance(ids, list) or not ids:
+        return {"success": False, "message": "Error: ids must be a non-empty list."}, 400
+    if len(ids) > MAX_ROWS:
+        return {"success": False, "message": f"Error: At most {MAX_ROWS} ids per update."}, 400
+    action = (body.get("action") or "").strip().lower()
+    try:
+        edit = mutation(action, by, body.get("status"))
+    except ValueError as e:
+        return {"success": False, "message": str(e)}, 400
+    result = update_many(ids, edit, event=action)
+    return {"success": not result["errors"], **result}, 200
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main(argv=None):
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Bulk request import / update")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="import requests from a JSON / JSONL / CSV file ('-' = stdin)")
+    imp.add_argument("file")
+    imp.add_argument("--format", choices=FORMATS)
+    imp.add_argument("--owner", help="owner for rows that have none")
+    imp.add_argument("--dry-run", action="store_true", help="validate only")
+    imp.add_argument("--atomic", action="store_true", help="write nothing if any row is invalid")
+    upd = sub.add_parser("update", help="apply one CSR action to many requests")
+    upd.add_argument("action", choices=ACTIONS)
+    upd.add_argument("ids", nargs="+")
+    upd.add_argument("--status", help="new status for the 'status' action")
+    upd.add_argument("--by", default="CSR", help="CSR name recorded as assignee")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "import":
+        fmt = detect_format(args.format, filename=args.file)
+        kw = dict(owner=args.owner, dry_run=args.dry_run, atomic=args.atomic)
+        if args.file == "-":
+            payload, _ = import_payload(io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline=""), fmt, **kw)
+        else:
+            with open(args.file, encoding="utf-8-sig", newline="") as f:
+                payload, _ = import_payload(f, fmt, **kw)
+    else:
+        try:
+            edit = mutation(args.action, args.by, args.status)
+        except ValueError as e:
+            print(e)
+            return 1
+        payload = update_many(args.ids, edit, event=args.action)
+    print(json.dumps(payload, indent=2))
+    return 0 if not payload.get("errors") else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,206 @@
+# ================================================
+# category_cache.py — versioned category maps + memoized enriched requests
+#
+# categories   follows the cached categories document. Each new snapshot
+#              bumps `version`; the first read after that builds, once:
+#                  rows      list of plain dicts (document order)
+#                  by_id     str(id)        -> category
+#                  by_name   lowercase name -> category
+#              and every later read is served from them (hits / misses).
+#
+# enriched     request record + "expandedCategory", as served by app.py's
+#              GET /api/requests, memoized per request together with its JSON
+#              text. An entry is valid while the request snapshot record is
+#              the same object and the category version is unchanged, so a
+#              request write or any category write invalidates it; listeners
+#              drop stale entries so the memo never outgrows the requests.
+#
+# references   category -> requests pointing at it, from the maintained
+#              "categoryRef" field index (storage.field_indexes): usage counts
+#              are O(1) for the delete check, and a rename rewrites just those
+#              requests' denormalized name as one batched write.
+#
+# Everything handed out is shared: callers must not mutate it (copy first).
+# ================================================
+
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Dict, List, Mapping, Optional
+
+import storage
+from data_cache import thaw
+from field_index import category_ref
+from request_index import canonical_id
+from search_fields import public
+
+CATEGORIES_DOC = "categories"
+
+
+class CategoryCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0
+        self._built = -1
+        self._doc = ()
+        self._rows: List[Dict[str, Any]] = []
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def apply(self, doc, change) -> None:
+        """Cache listener: any categories write is a new version (maps rebuilt lazily)."""
+        with self._lock:
+            self._doc = doc if isinstance(doc, (list, tuple)) else ()
+            self.version += 1
+
+    def _current(self) -> None:
+        storage.doc_view(CATEGORIES_DOC)  # picks up other processes' writes
+        with self._lock:
+            if self._built == self.version:
+                self.hits += 1
+                return
+            self.misses += 1
+            rows = [thaw(c) for c in self._doc if isinstance(c, Mapping)]
+            self._rows = rows
+            self._by_id = {str(c.get("id")): c for c in rows}
+            self._by_name = {}
+            for c in rows:
+                self._by_name.setdefault(str(c.get("name") or "").strip().lower(), c)
+            self._built = self.version
+
+    def rows(self) -> List[Dict[str, Any]]:
+        self._current()
+        return self._rows
+
+    def by_id(self) -> Dict[str, Dict[str, Any]]:
+        self._current()
+        return self._by_id
+
+    def get(self, cat_id) -> Optional[Dict[str, Any]]:
+        return self.by_id().get(str(cat_id))
+
+    def by_name(self, name) -> Optional[Dict[str, Any]]:
+        self._current()
+        return self._by_name.get(str(name or "").strip().lower())
+
+
+class EnrichedRequests:
+    """canonical id -> (record, category version, enriched dict, JSON text)."""
+
+    def __init__(self, cats: CategoryCache):
+        self._cats = cats
+        self._memo: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def apply_requests(self, rows, change) -> None:
+        """Requests listener: forget entries for records that changed."""
+        with self._lock:
+            if change is None:
+                self._memo.clear()
+            elif change[0] == "upsert":
+                self._memo.pop(canonical_id(change[1].get("id")), None)
+            elif change[0] == "upsert_many":
+                for rec in change[1]:
+                    self._memo.pop(canonical_id(rec.get("id")), None)
+            elif change[0] == "delete":
+                self._memo.pop(canonical_id(change[1]), None)
+
+    def apply_categories(self, doc, change) -> None:
+        with self._lock:
+            self._memo.clear()
+
+    def _entry(self, rec: Mapping) -> list:
+        key = canonical_id(rec.get("id"))
+        version = self._cats.version
+        entry = self._memo.get(key)
+        if entry is not None and entry[0] is rec and entry[1] == version:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        c = self._cats.get(rec.get("categoryId"))
+        enriched = {
+            **public(rec),
+            "expandedCategory": {
+                "id": c.get("id"),
+                "name": c.get("name"),
+                "visibility": c.get("visibility"),
+            } if c else None,
+        }
+        entry = [rec, version, enriched, None]
+        with self._lock:
+            self._memo[key] = entry
+        return entry
+
+    def enrich(self, rec: Mapping) -> Dict[str, Any]:
+        """The enriched request (shared, read-only)."""
+        return self._entry(rec)[2]
+
+    def json(self, rec: Mapping) -> str:
+        """The enriched request serialized, memoized with it."""
+        entry = self._entry(rec)
+        if entry[3] is None:
+            entry[3] = json.dumps(entry[2], ensure_ascii=False, separators=(",", ":"), default=str)
+        return entry[3]
+
+    def json_array(self, rows) -> str:
+        return "[" + ",".join(self.json(r) for r in rows) + "]"
+
+
+categories = CategoryCache()
+storage.cache.subscribe(CATEGORIES_DOC, categories.apply)
+enriched = EnrichedRequests(categories)
+storage.cache.subscribe(storage.REQUESTS_DOC, enriched.apply_requests)
+storage.cache.subscribe(CATEGORIES_DOC, enriched.apply_categories)
+
+
+# -----------------------------
+# Category -> requests (referential integrity)
+# -----------------------------
+def _ref_keys(cat: Mapping) -> List[str]:
+    keys = [category_ref(cat.get("id"))]
+    if str(cat.get("name") or "").strip():
+        keys.append(category_ref(None, cat.get("name")))
+    return keys
+
+
+def usage_count(cat: Mapping) -> int:
+    """Requests referencing `cat` by id, or by name where a request has no categoryId."""
+    storage.requests_view()
+    return sum(storage.field_indexes.count("categoryRef", k) for k in _ref_keys(cat))
+
+
+def request_ids(cat: Mapping) -> List[str]:
+    storage.requests_view()
+    return sorted(set().union(*(storage.field_indexes.exact("categoryRef", k) for k in _ref_keys(cat))))
+
+
+def propagate_rename(cat: Mapping, new_name: str) -> int:
+    """
+    Rewrite the denormalized category name on every request that references
+    `cat` (categoryName, or category for name-only records) in one batch.
+    Call inside storage.transaction() with the category write. Returns the
+    number of requests written.
+    """
+    recs = []
+    for rid in request_ids(cat):
+        rec = storage.get_request(rid)
+        if rec is None:
+            continue
+        field = "categoryName" if rec.get("categoryId") not in (None, "") else "category"
+        if rec.get(field) != new_name:
+            rec[field] = new_name
+            recs.append(rec)
+    storage.update_requests(recs, event="category_rename")
+    return len(recs)
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "categories": {"version": categories.version, "hits": categories.hits, "misses": categories.misses},
+        "enrichedRequests": {"entries": len(enriched._memo), "hits": enriched.hits, "misses": enriched.misses},
+    }
@@ -0,0 +1,309 @@
+# ================================================
+# change_feed.py — live request changes as server-sent events
+#
+# The feed listens to the cached requests and shortlists documents, so every
+# mutation path that goes through storage (create, update, assign, unassign,
+# complete, view, delete, shortlist add / remove — Max_app.py, app.py, the
+# bulk tools) becomes one event, with no call sites to keep in step:
+#
+#   event: request    {"op": "upsert"|"delete", "type": "<write event>",
+#                      "id": "REQ-7", "request": {...}}
+#   event: shortlist  {"op": "add"|"remove", "id": "REQ-7",
+#                      "shortlistCount": 3, "csr": "..." (own changes only)}
+#   event: reset      the requested position is gone; re-fetch, then follow
+#
+# Writes made by another process show up when this process next reads the
+# documents (the stream polls every CHANGE_FEED_POLL seconds); the new
+# snapshot is diffed against the record versions seen before, type "sync".
+#
+# Event ids are "<process epoch>-<seq>". The last CHANGE_FEED_SIZE events
+# (default 1000) are kept, so a client reconnecting with Last-Event-ID (or
+# ?lastEventId=) gets what it missed; an id from another process or one
+# that has been evicted gets a reset.
+#
+# Thread budget: an open stream holds one server thread. At most
+# CHANGE_FEED_MAX_STREAMS streams (default WEB_THREADS // 2, i.e. 2; the
+# --prod runner uses half its --threads) are held per process, each for
+# CHANGE_FEED_MAX_SECONDS (default 25) before EventSource reconnects and
+# resumes. A client arriving when every slot is taken gets what it missed
+# and is told to come back in CHANGE_FEED_BUSY_RETRY seconds (default 5),
+# long-poll style, so dashboards can never use up the pool.
+#
+# Per-role filtering: csr / admin see everything; platform sees request
+# summaries (no record body); pin sees only requests it owns.
+#
+#   GET /api/events
+# ================================================
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import storage
+from request_index import canonical_id
+from search_fields import public
+from shortlist_store import SHORTLISTS_DOC, store as shortlists
+
+FEED_SIZE = int(os.environ.get("CHANGE_FEED_SIZE") or 1000)
+POLL_SECONDS = float(os.environ.get("CHANGE_FEED_POLL") or 1)
+KEEPALIVE_SECONDS = float(os.environ.get("CHANGE_FEED_KEEPALIVE") or 15)
+MAX_SECONDS = float(os.environ.get("CHANGE_FEED_MAX_SECONDS") or 25)
+MAX_STREAMS = int(os.environ.get("CHANGE_FEED_MAX_STREAMS") or int(os.environ.get("WEB_THREADS") or 4) // 2)
+BUSY_RETRY_MS = int(float(os.environ.get("CHANGE_FEED_BUSY_RETRY") or 5) * 1000)
+RETRY_MS = 3000
+
+_SUMMARY_FIELDS = ("id", "title", "category", "status", "owner", "assignedTo", "date", "version")
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _version(rec) -> int:
+    return storage.record_version(rec)
+
+
+class ChangeFeed:
+    """Bounded, sequenced log of changes plus a condition for waiting streams."""
+
+    def __init__(self, size: int = FEED_SIZE):
+        self._cond = threading.Condition()
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._seen: Optional[Dict[str, Tuple[int, str]]] = None  # canonical id -> (version, owner)
+        self._counts: Optional[Dict[str, int]] = None    # canonical id -> shortlist count
+
+    # ---- recording ----
+    def _emit(self, kind: str, data: Dict[str, Any]) -> None:
+        with self._cond:
+            self._seq += 1
+            self._events.append({"seq": self._seq, "event": kind, "ts": _now_iso(), "data": data})
+            self._cond.notify_all()
+
+    def _request_upsert(self, rec: Mapping, event: str) -> None:
+        key = canonical_id(rec.get("id"))
+        if self._seen is not None:
+            self._seen[key] = (_version(rec), rec.get("owner") or "")
+        self._emit("request", {"op": "upsert", "type": event, "id": key, "request": rec})
+
+    def _request_delete(self, rid, event: str) -> None:
+        key = canonical_id(rid)
+        _, owner = (self._seen or {}).pop(key, (0, ""))
+        self._emit("request", {"op": "delete", "type": event, "id": key, "owner": owner})
+
+    def apply_requests(self, rows, change) -> None:
+        """Cache listener for the requests document."""
+        if change is None:
+            seen = {canonical_id(r.get("id")): (_version(r), r.get("owner") or "") for r in rows or ()}
+            before, self._seen = self._seen, seen
+            if before is None:
+                return  # first load: nothing to report
+            for rec in rows or ():
+                key = canonical_id(rec.get("id"))
+                if before.get(key, (None,))[0] != seen[key][0]:
+                    self._emit("request", {"op": "upsert", "type": "sync", "id": key, "request": rec})
+            for key in before.keys() - seen.keys():
+                self._emit("request", {"op": "delete", "type": "sync", "id": key, "owner": before[key][1]})
+            return
+        event = change[2] if len(change) > 2 else "update"
+        if change[0] == "upsert":
+            self._request_upsert(change[1], event)
+        elif change[0] == "upsert_many":
+            for rec in change[1]:
+                self._request_upsert(rec, event)
+        elif change[0] == "delete":
+            self._request_delete(change[1], event)
+
+    def apply_shortlists(self, doc, change) -> None:
+        """Cache listener for the shortlists document (runs after the store's own)."""
+        counts = shortlists.counts()
+        before, self._counts = self._counts, counts
+        if change is not None and change[0] in ("add", "remove"):
+            _, csr, key = change
+            self._emit("shortlist", {"op": change[0], "id": key, "csr": csr,
+                                     "shortlistCount": counts.get(key, 0)})
+        elif before is not None:
+            for key in before.keys() | counts.keys():
+                if before.get(key, 0) != counts.get(key, 0):
+                    self._emit("shortlist", {"op": "sync", "id": key, "shortlistCount": counts.get(key, 0)})
+
+    # ---- reading ----
+    def last_id(self) -> str:
+        return f"{self._epoch}-{self._seq}"
+
+    def since(self, last_event_id: Optional[str]) -> Tuple[Optional[List[Dict[str, Any]]], int]:
+        """
+        (events after `last_event_id`, position to continue from). Events is
+        None when that id can't be resumed from (another process, evicted).
+        """
+        with self._cond:
+            if not last_event_id:
+                return [], self._seq
+            epoch, _, seq = str(last_event_id).rpartition("-")
+            if epoch != self._epoch or not seq.isdigit() or int(seq) > self._seq:
+                return None, self._seq
+            seq = int(seq)
+            oldest = self._events[0]["seq"] if self._events else self._seq + 1
+            if seq + 1 < oldest:
+                return None, self._seq
+            return [e for e in self._events if e["seq"] > seq], self._seq
+
+    def wait(self, after: int, timeout: float) -> List[Dict[str, Any]]:
+        """Events with seq > `after`, waiting up to `timeout` seconds for one."""
+        with self._cond:
+            if self._seq <= after:
+                self._cond.wait(timeout)
+            return [e for e in self._events if e["seq"] > after]
+
+    def after_fork(self) -> None:
+        # a worker has its own log; ids from the parent are not resumable
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=self._events.maxlen)
+        self._epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+
+
+class StreamSlots:
+    """Held streams of this process, against `limit`."""
+
+    def __init__(self, limit: int = MAX_STREAMS):
+        self.limit = limit
+        self.held = 0
+        self.turned_away = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.held >= self.limit:
+                self.turned_away += 1
+                return False
+            self.held += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.held = max(0, self.held - 1)
+
+    def after_fork(self) -> None:
+        self.held = 0
+        self._lock = threading.Lock()
+
+
+feed = ChangeFeed()
+slots = StreamSlots()
+storage.cache.subscribe(storage.REQUESTS_DOC, feed.apply_requests)
+storage.cache.subscribe(SHORTLISTS_DOC, feed.apply_shortlists)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=feed.after_fork)
+    os.register_at_fork(after_in_child=slots.after_fork)
+
+
+# -----------------------------
+# Per-role views of an event
+# -----------------------------
+def visible(event: Mapping, role: str, user: str) -> Optional[Dict[str, Any]]:
+    """The event data as `role` / `user` may see it, or None."""
+    data = event["data"]
+    role = (role or "").lower()
+    if event["event"] == "shortlist":
+        if role == "pin":
+            rec = storage.request_index.get(data["id"])
+            if rec is None or (rec.get("owner") or "").lower() != (user or "").lower():
+                return None
+        out = {k: v for k, v in data.items() if k != "csr"}
+        if data.get("csr") and role == "csr" and data["csr"] == user:
+            out["csr"] = data["csr"]
+        return out
+
+    rec = data.get("request")
+    if role in ("csr", "admin"):
+        return {**data, "request": public(rec)} if rec is not None else dict(data)
+    if role == "pin":
+        owner = rec.get("owner") if rec is not None else data.get("owner")
+        if not user or (owner or "").lower() != user.lower():
+            return None
+        return {**data, "request": public(rec)} if rec is not None else dict(data)
+    if role == "platform":
+        out = {k: v for k, v in data.items() if k != "request"}
+        if rec is not None:
+            out["summary"] = {f: rec.get(f) for f in _SUMMARY_FIELDS}
+        return out
+    return None
+
+
+def _frame(event_id: str, kind: str, data) -> str:
+    return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _poll() -> None:
+    # pick up other processes' writes (stamp check; a reload emits "sync")
+    storage.requests_view()
+    storage.doc_view(SHORTLISTS_DOC)
+
+
+def stream(role: str, user: str, last_event_id: Optional[str] = None,
+           max_seconds: float = MAX_SECONDS) -> Iterator[str]:
+    """text/event-stream body for one client. Role / user are captured up front."""
+    _poll()
+    yield f"retry: {RETRY_MS}\n\n"
+    backlog, pos = feed.since(last_event_id)
+    if backlog is None:
+        yield _frame(feed.last_id(), "reset", {"reason": "resume position unavailable"})
+        backlog = []
+    epoch = feed.last_id().rpartition("-")[0]
+    for e in backlog:
+        data = visible(e, role, user)
+        if data is not None:
+            yield _frame(f"{epoch}-{e['seq']}", e["event"], data)
+        pos = max(pos, e["seq"])
+
+    if not slots.acquire():
+        # every stream thread is taken: the client got what it missed and
+        # comes back later instead of holding a thread
+        yield f"retry: {BUSY_RETRY_MS}\n\n"
+        return
+    try:
+        deadline = time.monotonic() + max_seconds
+        quiet = 0.0
+        while time.monotonic() < deadline:
+            events = feed.wait(pos, POLL_SECONDS)
+            if not events:
+                _poll()
+                quiet += POLL_SECONDS
+                if quiet >= KEEPALIVE_SECONDS:
+                    quiet = 0.0
+                    yield ": keep-alive\n\n"
+                continue
+            quiet = 0.0
+            if events[0]["seq"] > pos + 1:
+                # fell out of the ring buffer while this client was slow
+                yield _frame(f"{epoch}-{events[0]['seq'] - 1}", "reset", {"reason": "events dropped"})
+            for e in events:
+                pos = e["seq"]
+                data = visible(e, role, user)
+                if data is not None:
+                    yield _frame(f"{epoch}-{e['seq']}", e["event"], data)
+    finally:
+        slots.release()
+
+
+def session_identity(sess: Mapping) -> Tuple[str, str]:
+    """(role, user key) of a login session: PIN owners by username, CSR shortlists by name."""
+    role = (sess.get("role") or "").lower()
+    if role == "pin":
+        return role, sess.get("username") or sess.get("name") or ""
+    return role, sess.get("name") or sess.get("username") or ""
+
+
+def sse_response_args(role: str, user: str, last_event_id: Optional[str]):
+    """(body generator, mimetype, headers) for a streamed Flask Response."""
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return stream(role, user, last_event_id), "text/event-stream", headers
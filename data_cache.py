@@ -0,0 +1,178 @@
+# ================================================
+# data_cache.py — process-wide, thread-safe cache of the parsed data files
+#
+# Each document (requests, users, categories, ...) is parsed once and kept in
+# memory as an immutable snapshot. A cheap "stamp" (file mtime/size for the
+# JSON backend, a version counter for SQLite) is checked on every access and
+# the document is only re-read when the stamp changes. Writes made by this
+# process replace the snapshot directly, so they never trigger a re-read.
+#
+# Readers get read-only views (tuples / MappingProxyType); callers that need
+# to mutate ask for a copy. The one exception is a list document written row
+# by row (requests): put_rows() swaps single slots of the cached list in
+# place, so one write costs O(1) instead of a copy of the whole list. Such a
+# view is a list that readers must not mutate; iterating it sees each row
+# either before or after a concurrent write. Reloads / put() still install a
+# new tuple, which is never changed afterwards.
+#
+# Derived structures (indexes) subscribe to a document and are told about
+# every new snapshot: change=None means "rebuild from the snapshot", otherwise
+# change is a small tuple such as ("upsert", record), ("upsert_many", records)
+# or ("delete", id). Request changes carry the write's event name as a third
+# element (("upsert", record, "assign")); listeners that don't care ignore it.
+# ================================================
+
+from __future__ import annotations
+
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def freeze(obj):
+    """Deep read-only view: dict -> MappingProxyType, list -> tuple."""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+def thaw(obj):
+    """Deep mutable copy of a frozen view (or of plain data)."""
+    if isinstance(obj, (dict, MappingProxyType)):
+        return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [thaw(v) for v in obj]
+    return obj
+
+
+class CachedDocument:
+    """One parsed document plus the stamp it was read at."""
+
+    def __init__(self, name: str, loader: Callable[[], Any], stamp: Callable[[], Optional[Hashable]]):
+        self.name = name
+        self._loader = loader
+        self._stamp = stamp
+        self._lock = threading.RLock()
+        self._view = None
+        self._seen: Optional[Hashable] = None
+        self._loaded = False
+        self.version = 0          # bumps on every reload / local write
+        self.reloads = 0          # how many times the backend was actually read
+        self._listeners = []
+
+    def view(self):
+        """Current read-only snapshot, re-read only if the stamp moved."""
+        stamp = self._stamp()
+        if self._loaded and stamp == self._seen:
+            return self._view
+        with self._lock:
+            stamp = self._stamp()
+            if not self._loaded or stamp != self._seen:
+                # stamp taken before the read: a write landing mid-read leaves
+                # the stamp behind, so the next access reloads again
+                self._view = freeze(self._loader())
+                self._seen = stamp
+                self._loaded = True
+                self.version += 1
+                self.reloads += 1
+                self._notify(None)
+            return self._view
+
+    def copy(self):
+        """Mutable deep copy of the current snapshot (no re-parse)."""
+        return thaw(self.view())
+
+    def put(self, data, change=None) -> None:
+        """Install data this process just wrote, at the backend's new stamp."""
+        with self._lock:
+            self._view = freeze(data)
+            self._seen = self._stamp()
+            self._loaded = True
+            self.version += 1
+            self._notify(change)
+
+    def put_rows(self, rows: Dict[int, Any], change=None) -> None:
+        """Install rows this process just wrote: {position: frozen row}, len(view) appends."""
+        with self._lock:
+            view = self._view
+            if not isinstance(view, list):
+                view = list(view or ())  # first row write after a (re)load
+            for i, row in sorted(rows.items()):
+                if i == len(view):
+                    view.append(row)
+                else:
+                    view[i] = row
+            self._view = view
+            self._seen = self._stamp()
+            self._loaded = True
+            self.version += 1
+            self._notify(change)
+
+    def subscribe(self, listener: Callable[[Any, Any], None]) -> None:
+        """listener(view, change) runs under the document lock on every new snapshot."""
+        with self._lock:
+            self._listeners.append(listener)
+            if self._loaded:
+                listener(self._view, None)
+
+    def _notify(self, change) -> None:
+        for listener in self._listeners:
+            listener(self._view, change)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded = False
+
+
+class DataCache:
+    """Registry of CachedDocument objects, one per document name."""
+
+    def __init__(self, loader: Callable[[str], Any], stamp: Callable[[str], Optional[Hashable]]):
+        self._loader = loader
+        self._stamp = stamp
+        self._docs: Dict[str, CachedDocument] = {}
+        self._lock = threading.Lock()
+
+    def document(self, name: str) -> CachedDocument:
+        doc = self._docs.get(name)
+        if doc is None:
+            with self._lock:
+                doc = self._docs.get(name)
+                if doc is None:
+                    doc = CachedDocument(
+                        name,
+                        loader=lambda: self._loader(name),
+                        stamp=lambda: self._stamp(name),
+                    )
+                    self._docs[name] = doc
+        return doc
+
+    def view(self, name: str):
+        return self.document(name).view()
+
+    def copy(self, name: str):
+        return self.document(name).copy()
+
+    def put(self, name: str, data, change=None) -> None:
+        self.document(name).put(data, change)
+
+    def put_rows(self, name: str, rows: Dict[int, Any], change=None) -> None:
+        self.document(name).put_rows(rows, change)
+
+    def lock(self, name: str):
+        """The document's lock: hold it to read a snapshot and put() its successor atomically."""
+        return self.document(name)._lock
+
+    def subscribe(self, name: str, listener) -> None:
+        self.document(name).subscribe(listener)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        names = [name] if name else list(self._docs)
+        for n in names:
+            if n in self._docs:
+                self._docs[n].invalidate()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {n: {"version": d.version, "reloads": d.reloads} for n, d in self._docs.items()}
@@ -0,0 +1,157 @@
+# ================================================
+# export_stream.py — streaming NDJSON / CSV exports
+#
+# Exports are generators over the cached read-only snapshots: one record is
+# serialized per yielded line, so memory stays flat however many rows there
+# are and the first line goes out before the last record is looked at.
+#
+#   GET /api/requests/export   ?format=ndjson|csv  + the search filters:
+#                              id, status, category, owner, date, from, to,
+#                              title, keyword (or q)
+#   GET /api/users/export      ?format=...  &q=   (same match as /api/users)
+#   GET /api/reports/export    ?format=...  + the /api/reports period params;
+#                              one row per day
+# ================================================
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple
+
+import report_engine
+import storage
+from data_cache import thaw
+from search_fields import public, request_shadow
+
+FORMATS = {"ndjson": "application/x-ndjson", "jsonl": "application/x-ndjson", "csv": "text/csv"}
+
+REQUEST_FIELDS = (
+    "id", "title", "category", "categoryId", "categoryName", "description", "location",
+    "date", "time", "status", "owner", "createdBy", "created", "createdAt", "updatedAt",
+    "assignedTo", "assignedAt", "completedAt", "viewCount", "shortlistCount", "version",
+)
+USER_FIELDS = ("id", "uid", "fullName", "email", "username", "role", "status", "createdAt", "updatedAt")
+REPORT_FIELDS = ("date", "requestsCreated", "Pending", "Assigned", "Completed",
+                 "usersCreated", "categoriesCreated", "categoriesUpdated", "matches", "shortlists")
+
+# search-API query parameter -> field index filter
+_REQUEST_FILTERS = {"status": "status", "category": "category", "owner": "owner", "date": "date",
+                    "from": "date_from", "to": "date_to", "id": "id"}
+
+
+def export_format(args: Mapping) -> str:
+    fmt = (args.get("format") or "ndjson").strip().lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Error: Unknown format '{fmt}' (use ndjson or csv).")
+    return fmt
+
+
+# -----------------------------
+# Serializers (one line per row)
+# -----------------------------
+def ndjson_lines(rows: Iterable[Mapping]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(public(row), ensure_ascii=False, default=str) + "\n"
+
+
+def _cell(value) -> Any:
+    if isinstance(value, (dict, list, tuple)) or hasattr(value, "items"):
+        return json.dumps(thaw(value), ensure_ascii=False, default=str)
+    return "" if value is None else value
+
+
+def csv_lines(rows: Iterable[Mapping], fields: Sequence[str]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def line(values) -> str:
+        writer.writerow(values)
+        out = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return out
+
+    yield line(fields)
+    for row in rows:
+        yield line([_cell(row.get(f)) for f in fields])
+
+
+def stream(rows: Iterable[Mapping], fmt: str, fields: Sequence[str], name: str) -> Tuple[Iterator[str], str, Dict[str, str]]:
+    """(body generator, mimetype, headers) for a streamed Flask Response."""
+    body = csv_lines(rows, fields) if fmt == "csv" else ndjson_lines(rows)
+    ext = "csv" if fmt == "csv" else "ndjson"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{name}.{ext}"',
+        "X-Accel-Buffering": "no",  # let proxies pass lines through as they come
+    }
+    return body, FORMATS[fmt], headers
+
+
+# -----------------------------
+# Row sources (lazy)
+# -----------------------------
+def request_query(args: Mapping) -> Tuple[Dict[str, str], Optional[str], str]:
+    """(field filters, keyword, title substring) from search-style parameters."""
+    filters = {key: str(args.get(p)).strip() for p, key in _REQUEST_FILTERS.items() if args.get(p)}
+    keyword = (args.get("keyword") or args.get("q") or "").strip() or None
+    title = (args.get("title") or "").strip().lower()
+    return filters, keyword, title
+
+
+def iter_requests(filters: Optional[Mapping] = None, keyword: Optional[str] = None, title: str = "",
+                  exact: Sequence[str] = ()) -> Iterator[Mapping]:
+    """Matching requests, read-only, resolved one at a time from the index."""
+    view = storage.requests_view()
+    if filters or keyword:
+        ids = storage.query_request_ids(filters, keyword, exact=exact)
+        rows: Iterable[Mapping] = (r for r in map(storage.request_index.get, ids) if r is not None)
+    else:
+        rows = view
+    for rec in rows:
+        if title and title not in request_shadow(rec)["title"]:
+            continue
+        yield rec
+
+
+def iter_users(row: Callable[[str, str, Mapping], Optional[Mapping]],
+               match: Optional[Callable[[Mapping], bool]] = None) -> Iterator[Mapping]:
+    """Users document flattened by `row(role, username, record)`; None rows are skipped."""
+    for role, bucket in (storage.doc_view("users") or {}).items():
+        if not isinstance(bucket, Mapping):
+            continue
+        for uname, rec in bucket.items():
+            out = row(role, uname, rec)
+            if out is not None and (match is None or match(out)):
+                yield out
+
+
+def export_requests(args: Mapping, owner: Optional[str] = None):
+    """/api/requests/export; `owner` pins the export to one PIN user's requests."""
+    fmt = export_format(args)
+    filters, keyword, title = request_query(args)
+    if owner is None:
+        rows = iter_requests(filters, keyword, title)
+    elif owner.strip():
+        filters["owner"] = owner
+        rows = iter_requests(filters, keyword, title, exact=("owner",))
+    else:
+        rows = iter(())  # a PIN session without a username owns nothing
+    return stream(rows, fmt, REQUEST_FIELDS, "requests")
+
+
+def export_users(args: Mapping, row, match=None):
+    return stream(iter_users(row, match), export_format(args), USER_FIELDS, "users")
+
+
+def export_report(args: Mapping):
+    """/api/reports/export: one row per day of the resolved report period."""
+    fmt = export_format(args)
+    start, end = report_engine.period(
+        args.get("dateOption") or args.get("option") or "daily",
+        day=args.get("date") or None, start=args.get("from") or None,
+        end=args.get("to") or None, month=args.get("month") or None,
+    )
+    report_engine.refresh()
+    return stream(report_engine.engine.day_rows(start, end), fmt, REPORT_FIELDS, f"report_{start}_{end}")
@@ -0,0 +1,326 @@
+# ================================================
+# field_index.py — secondary indexes for structured request filters
+#
+#   status   -> ids        category -> ids        owner -> ids
+#   date     -> ids  (keys kept sorted, so prefix / range lookups bisect)
+#   categoryRef -> ids   which category a request points at: its categoryId
+#                        (app.py records) or "name:<category>" (Max_app
+#                        records, which only carry the name)
+#   order    id / created -> ids kept sorted by (sort value, id), so a list
+#            page is a bisect to the cursor plus a slice (see pagination.py)
+#
+# Filters in the search stories are case-insensitive substring matches
+# ("pend" finds "Pending"). Those are answered from the distinct values of a
+# field (a handful of statuses / categories / owners) instead of from every
+# request, and multi-field queries intersect the posting sets, smallest
+# (or the owner set, for PIN users) first.
+#
+# Kept in sync with the request cache by storage.py, like RequestIndex.
+# ================================================
+
+from __future__ import annotations
+
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from request_index import canonical_id
+
+_DIGITS = re.compile(r"\d+")
+
+
+def category_ref(category_id=None, name=None) -> str:
+    """categoryRef index key: the id when there is one, else the (lowercase) name."""
+    if category_id not in (None, ""):
+        return str(category_id).strip().lower()
+    return "name:" + str(name or "").strip().lower()
+
+
+def _lower(field: str) -> Callable[[Mapping], str]:
+    return lambda rec: str(rec.get(field, "")).lower()
+
+
+def category_name(rec: Mapping) -> str:
+    """Category name of either record shape (app.py categoryName, Max_app category)."""
+    return str(rec.get("categoryName") or rec.get("category") or "")
+
+
+def id_key(rid) -> Tuple[int, str]:
+    """Sortable id: 'REQ-12' / '12' / 12 -> (12, ...); non-numeric ids sort last."""
+    s = str(rid if rid is not None else "").strip()
+    m = _DIGITS.search(s)
+    return (int(m.group()) if m else 1 << 62, s.upper())
+
+
+def created_key(rec: Mapping) -> str:
+    """Creation time as stored by either app (ISO strings compare in order)."""
+    return str(rec.get("created") or rec.get("createdAt") or rec.get("date") or "")
+
+
+def activity_ts(rec: Mapping) -> str:
+    """
+    Last activity of a request: the latest of updatedAt / assignedAt /
+    completedAt (app.py writes the first, Max_app the others), else its
+    creation time. One rule for the reports, the analytics snapshot and
+    the weekly list.
+    """
+    touched = [str(rec.get(f)) for f in ("updatedAt", "assignedAt", "completedAt") if rec.get(f)]
+    return max(touched) if touched else created_ts(rec)
+
+
+def created_ts(rec: Mapping) -> str:
+    """Creation timestamp as stored: createdAt (app.py), created (Max_app), else the request date."""
+    return str(rec.get("createdAt") or rec.get("created") or rec.get("date") or "")
+
+
+# List orders: sort value of a record (ties broken by id_key)
+ORDERS: Dict[str, Callable[[Mapping], Any]] = {
+    "id": lambda rec: id_key(rec.get("id")),
+    "created": created_key,
+}
+
+
+def order_key(name: str, rec: Mapping) -> Tuple[Any, Tuple[int, str]]:
+    return (ORDERS[name](rec), id_key(rec.get("id")))
+
+
+# How each indexed field is normalized (mirrors the checks in the entities)
+NORMALIZERS: Dict[str, Callable[[Mapping], str]] = {
+    "status": _lower("status"),
+    "category": lambda rec: category_name(rec).lower(),
+    "owner": lambda rec: str(rec.get("owner") or "").strip().lower(),
+    "date": lambda rec: str(rec.get("date", "")).strip(),
+    "categoryRef": lambda rec: category_ref(rec.get("categoryId"), category_name(rec)),
+}
+
+
+class ValueIndex:
+    """value -> set of ids, with the distinct values kept sorted."""
+
+    def __init__(self):
+        self._ids: Dict[str, Set[str]] = {}
+        self._keys: List[str] = []
+
+    def add(self, key: str, rid: str) -> None:
+        bucket = self._ids.get(key)
+        if bucket is None:
+            bucket = self._ids[key] = set()
+            insort(self._keys, key)
+        bucket.add(rid)
+
+    def discard(self, key: str, rid: str) -> None:
+        bucket = self._ids.get(key)
+        if bucket is None:
+            return
+        bucket.discard(rid)
+        if not bucket:
+            del self._ids[key]
+            self._keys.pop(bisect_left(self._keys, key))
+
+    def exact(self, key: str) -> Set[str]:
+        return set(self._ids.get(key, ()))
+
+    def contains(self, sub: str) -> Set[str]:
+        out: Set[str] = set()
+        for key in self._keys:
+            if sub in key:
+                out |= self._ids[key]
+        return out
+
+    def range(self, lo: Optional[str] = None, hi: Optional[str] = None) -> Set[str]:
+        """Ids whose value is within [lo, hi] (either bound optional)."""
+        i = bisect_left(self._keys, lo) if lo else 0
+        j = bisect_right(self._keys, hi) if hi else len(self._keys)
+        out: Set[str] = set()
+        for key in self._keys[i:j]:
+            out |= self._ids[key]
+        return out
+
+    def count(self, key: str) -> int:
+        return len(self._ids.get(key, ()))
+
+    def values(self) -> List[str]:
+        return list(self._keys)
+
+    def counts(self) -> Dict[str, int]:
+        return {k: len(self._ids[k]) for k in self._keys}
+
+
+class SortedIds:
+    """ids kept sorted by an order key, read as slices from a position."""
+
+    def __init__(self):
+        self._keys: List[Tuple] = []
+        self._ids: List[str] = []
+
+    def add(self, key: Tuple, rid: str) -> None:
+        i = bisect_right(self._keys, key)
+        self._keys.insert(i, key)
+        self._ids.insert(i, rid)
+
+    def discard(self, key: Tuple, rid: str) -> None:
+        i = bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i] == key:
+            if self._ids[i] == rid:
+                del self._keys[i], self._ids[i]
+                return
+            i += 1
+
+    def walk(self, after: Optional[Tuple] = None, desc: bool = False, limit: Optional[int] = None) -> List[str]:
+        """Up to `limit` ids strictly after the key `after` (before it when desc), in order."""
+        if desc:
+            end = bisect_left(self._keys, after) if after is not None else len(self._keys)
+            start = max(0, end - limit) if limit is not None else 0
+            return self._ids[start:end][::-1]
+        start = bisect_right(self._keys, after) if after is not None else 0
+        return self._ids[start:start + limit] if limit is not None else self._ids[start:]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class SecondaryIndexes:
+    """One ValueIndex per field in NORMALIZERS, plus request order for results."""
+
+    def __init__(self, fields: Iterable[str] = tuple(NORMALIZERS)):
+        self.fields = tuple(fields)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._by_field: Dict[str, ValueIndex] = {f: ValueIndex() for f in self.fields}
+        self._keys: Dict[str, Dict[str, str]] = {}  # id -> field -> indexed value
+        self._orders: Dict[str, SortedIds] = {o: SortedIds() for o in ORDERS}
+        self._order_keys: Dict[str, Dict[str, Tuple]] = {}  # id -> order -> key
+        self._seq: Dict[str, int] = {}
+        self._next = 0
+
+    # ---- maintenance ----
+    def rebuild(self, rows: Iterable[Mapping]) -> None:
+        with self._lock:
+            self._reset()
+            for rec in rows:
+                self._add(rec)
+
+    def upsert(self, rec: Mapping) -> None:
+        with self._lock:
+            self._remove(canonical_id(rec.get("id")))
+            self._add(rec)
+
+    def remove(self, rid) -> None:
+        with self._lock:
+            key = canonical_id(rid)
+            self._remove(key)
+            self._seq.pop(key, None)
+
+    def apply(self, rows, change) -> None:
+        """Cache listener, same protocol as RequestIndex.apply."""
+        if change is None:
+            self.rebuild(rows)
+        elif change[0] == "upsert":
+            self.upsert(change[1])
+        elif change[0] == "upsert_many":
+            for rec in change[1]:
+                self.upsert(rec)
+        elif change[0] == "delete":
+            self.remove(change[1])
+
+    def _add(self, rec: Mapping) -> None:
+        rid = canonical_id(rec.get("id"))
+        if rid in self._keys:
+            return  # duplicate id: first record wins
+        if rid not in self._seq:
+            self._seq[rid] = self._next
+            self._next += 1
+        keys = {f: NORMALIZERS[f](rec) for f in self.fields}
+        for f, k in keys.items():
+            self._by_field[f].add(k, rid)
+        self._keys[rid] = keys
+        order_keys = {o: order_key(o, rec) for o in ORDERS}
+        for o, k in order_keys.items():
+            self._orders[o].add(k, rid)
+        self._order_keys[rid] = order_keys
+
+    def _remove(self, rid: str) -> None:
+        keys = self._keys.pop(rid, None)
+        for f, k in (keys or {}).items():
+            self._by_field[f].discard(k, rid)
+        for o, k in (self._order_keys.pop(rid, None) or {}).items():
+            self._orders[o].discard(k, rid)
+
+    # ---- queries ----
+    def field(self, name: str) -> ValueIndex:
+        return self._by_field[name]
+
+    def count(self, name: str, key: str) -> int:
+        """Number of requests whose `name` field is exactly `key` (O(1))."""
+        with self._lock:
+            return self._by_field[name].count(key)
+
+    def exact(self, name: str, key: str) -> Set[str]:
+        with self._lock:
+            return self._by_field[name].exact(key)
+
+    def ordered(self, order: str, after: Optional[Tuple] = None, desc: bool = False,
+                limit: Optional[int] = None) -> List[str]:
+        """Ids in `order` (a key of ORDERS) strictly after the order key `after`."""
+        with self._lock:
+            return self._orders[order].walk(after, desc, limit)
+
+    def ordered_count(self, order: str) -> int:
+        """Number of ids ordered() walks over in `order`."""
+        with self._lock:
+            return len(self._orders[order])
+
+    def _matches(self, rid: str, f: str, want: str, exact: bool) -> bool:
+        key = self._keys[rid][f]
+        return key == want if exact else want in key
+
+    def query(self, filters: Mapping[str, object], exact: Iterable[str] = ()) -> Optional[List[str]]:
+        """
+        Ids matching every non-empty filter, in request order; None when no
+        filter applies. Values are case-insensitive substrings, except fields
+        listed in `exact`. 'date_from' / 'date_to' select a date range.
+        """
+        exact = set(exact)
+        wanted = []
+        for f in self.fields:
+            value = filters.get(f)
+            if value:
+                want = str(value).strip() if f == "date" else str(value).lower()
+                wanted.append((f, want.strip() if f in exact else want, f in exact))
+        lo, hi = filters.get("date_from"), filters.get("date_to")
+        if not wanted and not (lo or hi):
+            return None
+        with self._lock:
+            owner = next((w for w in wanted if w[0] == "owner"), None)
+            if owner is not None:
+                # PIN users: start from their own (small) set and check the
+                # other filters against each candidate's indexed values
+                f, want, is_exact = owner
+                idx = self._by_field[f]
+                ids = idx.exact(want) if is_exact else idx.contains(want)
+                rest = [w for w in wanted if w is not owner]
+                ids = {rid for rid in ids if all(self._matches(rid, *w) for w in rest)}
+                if lo or hi:
+                    ids = {rid for rid in ids
+                           if (not lo or self._keys[rid]["date"] >= lo) and (not hi or self._keys[rid]["date"] <= hi)}
+            else:
+                sets = []
+                for f, want, is_exact in wanted:
+                    idx = self._by_field[f]
+                    sets.append(idx.exact(want) if is_exact else idx.contains(want))
+                if lo or hi:
+                    sets.append(self._by_field["date"].range(lo, hi))
+                sets.sort(key=len)
+                ids = sets[0]
+                for s in sets[1:]:
+                    if not ids:
+                        break
+                    ids = ids & s
+            seq = self._seq
+            return sorted(ids, key=lambda k: seq.get(k, 0))
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,86 @@
+# ================================================
+# http_cache.py — conditional GET (ETag / If-None-Match) for JSON endpoints
+#
+# Every collection has a data version (storage.data_version(): the backend's
+# change stamp, shared by all processes). A handler decorated with
+#
+#     @conditional("requests", "categories")
+#
+# gets a strong ETag derived from the versions of the collections it reads,
+# the session identity (responses are per user) and the full URL. A request
+# whose If-None-Match matches is answered 304 before the handler runs, so
+# nothing is loaded or serialized; otherwise the handler's 200 gets the ETag
+# and "Cache-Control: private, no-cache", which makes browsers revalidate
+# every fetch() by themselves — no client changes needed.
+#
+# The tag is computed before the handler reads, so a write landing in
+# between can only make the next check miss, never answer 304 for data the
+# client has not seen.
+#
+# JSONProvider is both apps' jsonify(): stored search fields never reach a
+# client. Plain dicts holding them are copied by search_fields.without_shadow();
+# read-only record views reach the encoder's default() and are written
+# without the field there. A payload without either is serialized as is.
+# ================================================
+
+from __future__ import annotations
+
+import functools
+import hashlib
+from typing import Callable, Iterable, Mapping, Optional
+
+from flask import Response, current_app, request, session
+from flask.json.provider import DefaultJSONProvider
+
+import storage
+from search_fields import SHADOW_KEY, without_shadow
+
+CACHE_CONTROL = "private, no-cache"
+
+
+class JSONProvider(DefaultJSONProvider):
+    """jsonify() / dict returns without the internal search fields."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Mapping):  # read-only views of stored records
+            return {k: v for k, v in o.items() if k != SHADOW_KEY}
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs) -> str:
+        return super().dumps(without_shadow(obj), **kwargs)
+
+
+def etag_for(collections: Iterable[str], *extra) -> str:
+    """Strong ETag (quoted) for the current versions of `collections` + extra parts."""
+    parts = [f"{name}={storage.data_version(name)!r}" for name in collections]
+    parts.append(f"who={session.get('role')!r}/{session.get('username')!r}/{session.get('name')!r}")
+    parts.append(f"url={request.full_path}")
+    parts.extend(repr(x) for x in extra)
+    return '"' + hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def conditional(*collections: str, extra: Optional[Callable[[], object]] = None,
+                skip: Optional[Callable[[], bool]] = None):
+    """
+    Decorator for GET handlers. `extra()` adds state that is not in storage
+    (e.g. unwritten view counts); `skip()` opts a call out (e.g. ?inc=1,
+    which has a side effect and must reach the handler).
+    """
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD") or (skip and skip()):
+                return view(*args, **kwargs)
+            tag = etag_for(collections, extra() if extra else None)
+            if tag.strip('"') in request.if_none_match:
+                resp = Response(status=304)
+            else:
+                resp = current_app.make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+            resp.headers["ETag"] = tag
+            resp.headers["Cache-Control"] = CACHE_CONTROL
+            return resp
+        return wrapper
+    return decorate
@@ -0,0 +1,131 @@
+# ================================================
+# id_allocator.py — persisted, monotonic id sequences
+#
+# One counter per entity type in the "sequences" document
+# (sequences.json / the SQLite docs table):
+#     {"requests": 231, "users": 157, "categories": 12}
+# holding the last number handed out. reserve(kind, n) bumps the counter by
+# n under the storage write lock (threads and processes) and returns the
+# block, so every id is issued once, in increasing order, in O(1) — no scan
+# of the records, and deleting a record never frees its number again.
+#
+# A counter that does not exist yet is seeded once from the highest number
+# already in use (the old max()/len() schemes), so existing data keeps its
+# ids. Records written with an explicit id are reported through observe(),
+# which moves the counter past them.
+#
+#   requests    REQ-<n>   (app.py stores the bare number; same sequence)
+#   users       <n> / U-<nnn>
+#   categories  CAT-<nnn>
+# ================================================
+
+from __future__ import annotations
+
+import re
+from typing import Callable, Dict, Iterable
+
+import storage
+
+SEQUENCES_DOC = "sequences"
+
+_DIGITS = re.compile(r"(\d+)\s*$")
+
+
+def number_of(value) -> int:
+    """Trailing number of an id: 'REQ-201' -> 201, 'CAT-007' -> 7, 12 -> 12; 0 if none."""
+    if isinstance(value, int):
+        return value
+    m = _DIGITS.search(str(value or ""))
+    return int(m.group(1)) if m else 0
+
+
+def _max_number(ids: Iterable) -> int:
+    return max((number_of(i) for i in ids), default=0)
+
+
+def _requests_floor() -> int:
+    # the old UserStory13 scheme issued len(requests) + 100
+    rows = storage.requests_view()
+    return max(_max_number(r.get("id") for r in rows), len(rows) + 99)
+
+
+def _users_floor() -> int:
+    doc = storage.doc_view("users") or {}
+    return _max_number(rec.get("id") for bucket in doc.values() if hasattr(bucket, "values")
+                       for rec in bucket.values() if hasattr(rec, "get"))
+
+
+def _categories_floor() -> int:
+    return _max_number(c.get("id") for c in (storage.doc_view("categories") or ()) if hasattr(c, "get"))
+
+
+class IdAllocator:
+    """Named sequences stored in one document; all changes under the storage write lock."""
+
+    def __init__(self, floors: Dict[str, Callable[[], int]]):
+        self.floors = dict(floors)
+
+    def _current(self, data: Dict[str, int], kind: str) -> int:
+        if kind not in data:
+            if kind not in self.floors:
+                raise KeyError(f"Unknown id sequence '{kind}'.")
+            data[kind] = int(self.floors[kind]())
+        return int(data[kind])
+
+    def reserve(self, kind: str, count: int = 1) -> range:
+        """The next `count` numbers of `kind`, as a range; persisted before returning."""
+        if count < 1:
+            return range(0)
+        block = []
+
+        def take(data):
+            start = self._current(data, kind) + 1
+            data[kind] = start + count - 1
+            block.append(range(start, start + count))
+
+        storage.modify_doc(SEQUENCES_DOC, take, {})
+        return block[0]
+
+    def next(self, kind: str) -> int:
+        return self.reserve(kind, 1)[0]
+
+    def peek(self, kind: str) -> int:
+        """The number the next reserve() would start at (nothing is consumed)."""
+        data = dict(storage.doc_view(SEQUENCES_DOC) or {})
+        return self._current(data, kind) + 1
+
+    def observe(self, kind: str, value) -> None:
+        """An id was written explicitly: never issue its number (or a lower one) again."""
+        n = number_of(value)
+        if not n:
+            return
+
+        def bump(data):
+            if self._current(data, kind) >= n:
+                return False
+            data[kind] = n
+
+        storage.modify_doc(SEQUENCES_DOC, bump, {})
+
+
+allocator = IdAllocator({
+    "requests": _requests_floor,
+    "users": _users_floor,
+    "categories": _categories_floor,
+})
+
+
+def next_request_id() -> str:
+    return f"REQ-{allocator.next('requests')}"
+
+
+def next_user_id() -> int:
+    return allocator.next("users")
+
+
+def user_uid(n: int) -> str:
+    return f"U-{n:03d}"
+
+
+def next_category_id() -> str:
+    return f"CAT-{allocator.next('categories'):03d}"
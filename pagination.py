@@ -0,0 +1,153 @@
+# ================================================
+# pagination.py — limit / cursor / sort for the request list endpoints
+#
+# Query parameters (all optional; without them an endpoint answers exactly
+# as before):
+#   limit   page size (1..MAX_LIMIT)
+#   cursor  opaque token from the previous page's "nextCursor"
+#   sort    id | -id | created | -created   ("-" = descending)
+#   count   "1" -> only {"success": true, "count": N}, no rows
+#
+# Paging is keyset based: the cursor holds the (sort value, id) of the last
+# row served (just the id for sort=id) and the next page starts strictly
+# after it, so rows inserted or deleted between calls never shift a page or
+# repeat a row.
+#
+# Endpoints that list every request pass request_repository.ordered instead
+# of the rows: the page is then read from the sorted order indexes kept by
+# field_index.py (a bisect to the cursor and a slice of `limit` ids), so a
+# page costs O(log n + limit) and nothing is sorted per call. Filtered
+# result lists (searches, a PIN's own requests) are sorted as given.
+# ================================================
+
+from __future__ import annotations
+
+import base64
+import json
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from field_index import ORDERS, id_key
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+PAGE_PARAMS = ("limit", "cursor", "sort", "count")
+
+SORTS: Dict[str, Callable[[Mapping], Any]] = ORDERS
+
+
+def wants_page(args: Mapping) -> bool:
+    """True if the caller used any paging parameter."""
+    return any(args.get(p) not in (None, "") for p in PAGE_PARAMS)
+
+
+def _encode(value) -> str:
+    raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode(token: str):
+    pad = "=" * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(token + pad))
+
+
+def _tup(v):
+    # JSON turns tuples into lists; compare as tuples again
+    return tuple(_tup(x) for x in v) if isinstance(v, list) else v
+
+
+def _cursor_value(field: str, last: Tuple) -> Any:
+    """What the cursor stores of the last row's (sort value, id) key."""
+    return last[1] if field == "id" else list(last)
+
+
+def _cursor_key(field: str, value) -> Tuple:
+    """Inverse of _cursor_value(): the (sort value, id) key to start after."""
+    if field == "id":
+        return (_tup(value), _tup(value))
+    sort_key, id_k = value
+    return (_tup(sort_key), _tup(id_k))
+
+
+def paginate(rows, args: Mapping, default_sort: str = "id") -> Tuple[Optional[List[Mapping]], Dict[str, Any]]:
+    """
+    Apply count/sort/cursor/limit from `args` to `rows`: a list of records,
+    or an ordered source (count(sort) and walk(sort, after, desc, limit),
+    e.g. request_repository.ordered) that serves the page from its indexes;
+    its count is then the number of rows the walk goes over.
+
+    Returns (page, meta): page is None in count-only mode; meta carries
+    "count" (rows matching, before paging) and "nextCursor" (None on the last
+    page). Raises ValueError with a user-facing message on bad parameters.
+    """
+    sort = (args.get("sort") or default_sort).strip()
+    desc = sort.startswith("-")
+    field = sort.lstrip("-+")
+    if field not in SORTS:
+        raise ValueError(f"Error: Unknown sort '{sort}' (use one of: {', '.join(sorted(SORTS))}, optionally prefixed with '-').")
+
+    walk = getattr(rows, "walk", None)
+    if walk is None:
+        rows = list(rows)
+    count = rows.count(field) if walk is not None else len(rows)
+    if str(args.get("count") or "").strip().lower() in ("1", "true", "yes"):
+        return None, {"count": count}
+
+    limit_raw = args.get("limit")
+    try:
+        limit = int(limit_raw) if limit_raw not in (None, "") else DEFAULT_LIMIT
+    except (TypeError, ValueError):
+        raise ValueError("Error: limit must be a number.")
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    after = None
+    cursor = args.get("cursor")
+    if cursor:
+        try:
+            c_sort, c_value = _decode(cursor)
+        except Exception:
+            raise ValueError("Error: Invalid cursor.")
+        if c_sort != sort:
+            raise ValueError("Error: Cursor does not match the requested sort.")
+        try:
+            after = _cursor_key(field, c_value)
+        except Exception:
+            raise ValueError("Error: Invalid cursor.")
+
+    key_of = SORTS[field]
+    if walk is not None:
+        # one extra row tells whether another page follows
+        page = walk(field, after, desc, limit + 1)
+        more = len(page) > limit
+        page = page[:limit]
+        last = (key_of(page[-1]), id_key(page[-1].get("id"))) if page else None
+    else:
+        keyed = sorted((((key_of(r), id_key(r.get("id"))), r) for r in rows), key=lambda kr: kr[0])
+        keys = [k for k, _ in keyed]
+        # rows strictly after the cursor in the requested direction
+        if after is None:
+            remaining = keyed[::-1] if desc else keyed
+        else:
+            remaining = keyed[:bisect_left(keys, after)][::-1] if desc else keyed[bisect_right(keys, after):]
+        more = len(remaining) > limit
+        page = [r for _, r in remaining[:limit]]
+        last = remaining[len(page) - 1][0] if page else None
+    next_cursor = _encode([sort, _cursor_value(field, last)]) if more else None
+    return page, {"count": count, "limit": limit, "sort": sort, "nextCursor": next_cursor}
+
+
+def page_payload(rows, args: Mapping, fmt: Callable[[Mapping], Any] = dict,
+                 default_sort: str = "id") -> Tuple[Dict[str, Any], int]:
+    """
+    paginate() shaped as a JSON payload + HTTP status for the list endpoints:
+    {"success", "requests", "count", "limit", "sort", "nextCursor"}, or just
+    {"success", "count"} in count-only mode. Only the served page is passed
+    through `fmt`.
+    """
+    try:
+        page, meta = paginate(rows, args, default_sort=default_sort)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}, 400
+    if page is None:
+        return {"success": True, **meta}, 200
+    return {"success": True, "requests": [fmt(r) for r in page], **meta}, 200
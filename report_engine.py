@@ -0,0 +1,337 @@
+# ================================================
+# report_engine.py — pre-aggregated platform reports
+#
+# Instead of re-reading and re-parsing every request for each report, the
+# engine keeps per-day counters that follow the cached documents:
+#
+#   requests   created day        -> (status bucket, category) -> n
+#              last-activity day  -> (status bucket, category) -> n
+#   users      created day        -> n   (+ running totals by role/status)
+#   categories created / updated day -> n
+#   matches / shortlists   event day ("ts") -> n
+#
+# Request counters are adjusted per mutation (one record's contribution is
+# moved); the small documents are recounted when they change. A report for
+# any date range is then a sum over the days in that range.
+#
+# Served by GET /api/reports (see report_payload()).
+# ================================================
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from calendar import monthrange
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import storage
+from field_index import activity_ts, created_ts
+from request_index import canonical_id
+from search_fields import day_of, status_bucket
+
+BUCKETS = ("Pending", "Assigned", "Completed")
+EVENT_DOCS = ("matches", "shortlists")
+SOURCE_DOCS = (storage.REQUESTS_DOC, "users", "categories") + EVENT_DOCS  # everything a report reads
+
+
+def request_category(rec: Mapping) -> str:
+    return str(rec.get("category") or rec.get("categoryName") or rec.get("categoryId") or "—")
+
+
+def request_days(rec: Mapping) -> Tuple[Optional[str], Optional[str]]:
+    """(created day, last-activity day) of a request, as both apps store them."""
+    return day_of(created_ts(rec)), day_of(activity_ts(rec))
+
+
+class DayCounters:
+    """day -> Counter, with the days kept sorted so ranges are bisected."""
+
+    def __init__(self):
+        self._by_day: Dict[str, Counter] = {}
+        self._days: List[str] = []
+
+    def add(self, day: Optional[str], key, delta: int = 1) -> None:
+        if not day:
+            return
+        c = self._by_day.get(day)
+        if c is None:
+            c = self._by_day[day] = Counter()
+            insort(self._days, day)
+        c[key] += delta
+        if c[key] == 0:
+            del c[key]
+        if not c:
+            del self._by_day[day]
+            self._days.pop(bisect_left(self._days, day))
+
+    def days(self, lo: str, hi: str) -> List[str]:
+        return self._days[bisect_left(self._days, lo):bisect_right(self._days, hi)]
+
+    def total(self, lo: str, hi: str) -> Counter:
+        out = Counter()
+        for d in self.days(lo, hi):
+            out.update(self._by_day[d])
+        return out
+
+    def on(self, day: str) -> Counter:
+        return Counter(self._by_day.get(day, ()))
+
+
+class ReportEngine:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset_requests()
+        self.users_created = DayCounters()
+        self.user_totals: Counter = Counter()   # ("role", r) / ("status", s) / "total"
+        self.categories_created = DayCounters()
+        self.categories_updated = DayCounters()
+        self.categories_total = 0
+        self.events: Dict[str, DayCounters] = {name: DayCounters() for name in EVENT_DOCS}
+        self.event_totals: Counter = Counter()
+
+    def _reset_requests(self) -> None:
+        self.requests_created = DayCounters()
+        self.requests_active = DayCounters()
+        self.request_totals: Counter = Counter()  # (bucket, category) over all requests
+        self._contrib: Dict[str, Tuple[Optional[str], Optional[str], Tuple[str, str]]] = {}
+
+    # ---- requests (incremental) ----
+    def _add_request(self, rec: Mapping) -> None:
+        rid = canonical_id(rec.get("id"))
+        if rid in self._contrib:
+            return  # duplicate id: first record wins, as in the indexes
+        created, active = request_days(rec)
+        key = (status_bucket(rec.get("status")), request_category(rec))
+        self.requests_created.add(created, key)
+        self.requests_active.add(active, key)
+        self.request_totals[key] += 1
+        self._contrib[rid] = (created, active, key)
+
+    def _remove_request(self, rid) -> None:
+        old = self._contrib.pop(canonical_id(rid), None)
+        if old is None:
+            return
+        created, active, key = old
+        self.requests_created.add(created, key, -1)
+        self.requests_active.add(active, key, -1)
+        self.request_totals[key] -= 1
+        if not self.request_totals[key]:
+            del self.request_totals[key]
+
+    def apply_requests(self, rows, change) -> None:
+        """Cache listener for the requests document (RequestIndex protocol)."""
+        with self._lock:
+            if change is None:
+                self._reset_requests()
+                for rec in rows:
+                    self._add_request(rec)
+            elif change[0] == "upsert":
+                self._remove_request(change[1].get("id"))
+                self._add_request(change[1])
+            elif change[0] == "upsert_many":
+                for rec in change[1]:
+                    self._remove_request(rec.get("id"))
+                    self._add_request(rec)
+            elif change[0] == "delete":
+                self._remove_request(change[1])
+
+    # ---- small documents (recounted on change) ----
+    def apply_users(self, doc, change=None) -> None:
+        created, totals = DayCounters(), Counter()
+        for bucket, users in (doc or {}).items():
+            if not isinstance(users, Mapping):
+                continue
+            for uname, rec in users.items():
+                if not rec.get("id"):
+                    continue  # same rule as the /api/users listing
+                role = (rec.get("role") or bucket or "").lower()
+                role = "pin" if role == "user" else role
+                status = "inactive" if (rec.get("status") or "").strip().lower() in ("suspended", "inactive") else "active"
+                totals["total"] += 1
+                totals[("role", role)] += 1
+                totals[("status", status)] += 1
+                created.add(day_of(rec.get("createdAt")), "created")
+        with self._lock:
+            self.users_created, self.user_totals = created, totals
+
+    def apply_categories(self, doc, change=None) -> None:
+        created, updated = DayCounters(), DayCounters()
+        cats = doc if isinstance(doc, (list, tuple)) else []
+        for c in cats:
+            created.add(day_of(c.get("createdAt")), "n")
+            updated.add(day_of(c.get("updatedAt")), "n")
+        with self._lock:
+            self.categories_created, self.categories_updated = created, updated
+            self.categories_total = len(cats)
+
+    def apply_events(self, name: str):
+        """Listener for an event log document (list of {"ts": ...})."""
+        def apply(doc, change=None) -> None:
+            counters = DayCounters()
+            events = [e for e in (doc if isinstance(doc, (list, tuple)) else []) if isinstance(e, Mapping)]
+            for e in events:
+                counters.add(day_of(e.get("ts")), "n")
+            with self._lock:
+                self.events[name] = counters
+                self.event_totals[name] = len(events)
+        return apply
+
+    # ---- queries (inclusive day range [start, end], YYYY-MM-DD) ----
+    def requests_report(self, start: str, end: str) -> Dict[str, Any]:
+        with self._lock:
+            created = self.requests_created.total(start, end)
+            active = self.requests_active.total(start, end)
+            by_status = Counter()
+            by_category: Dict[str, Dict[str, int]] = {}
+            for (bucket, cat), n in active.items():
+                by_status[bucket] += n
+                by_category.setdefault(cat, dict.fromkeys(BUCKETS, 0))[bucket] += n
+            by_day = []
+            for d in sorted(set(self.requests_created.days(start, end)) | set(self.requests_active.days(start, end))):
+                row = {"date": d, "created": sum(self.requests_created.on(d).values())}
+                day_active = self.requests_active.on(d)
+                for b in BUCKETS:
+                    row[b] = sum(n for (bucket, _), n in day_active.items() if bucket == b)
+                by_day.append(row)
+            return {
+                "total": sum(self.request_totals.values()),
+                "created": sum(created.values()),
+                **{b: by_status.get(b, 0) for b in BUCKETS},
+                "byCategory": by_category,
+                "byDay": by_day,
+            }
+
+    def categories_report(self, start: str, end: str) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total": self.categories_total,
+                "created": sum(self.categories_created.total(start, end).values()),
+                "updated": sum(self.categories_updated.total(start, end).values()),
+            }
+
+    def users_report(self, start: str, end: str) -> Dict[str, Any]:
+        with self._lock:
+            totals = self.user_totals
+            return {
+                "total": totals.get("total", 0),
+                "byRole": {k[1]: n for k, n in totals.items() if isinstance(k, tuple) and k[0] == "role"},
+                "active": totals.get(("status", "active"), 0),
+                "suspended": totals.get(("status", "inactive"), 0),
+                "created": sum(self.users_created.total(start, end).values()),
+            }
+
+    def events_report(self, name: str, start: str, end: str) -> Dict[str, int]:
+        with self._lock:
+            return {"total": self.event_totals.get(name, 0),
+                    "inRange": sum(self.events[name].total(start, end).values())}
+
+    def day_rows(self, start: str, end: str):
+        """One flat row per day in [start, end] that has any activity (for exports)."""
+        with self._lock:
+            sources = [self.requests_created, self.requests_active, self.users_created,
+                       self.categories_created, self.categories_updated, *self.events.values()]
+            days = sorted(set().union(*(c.days(start, end) for c in sources)))
+        for d in days:
+            with self._lock:
+                active = self.requests_active.on(d)
+                row = {"date": d, "requestsCreated": sum(self.requests_created.on(d).values())}
+                for b in BUCKETS:
+                    row[b] = sum(n for (bucket, _), n in active.items() if bucket == b)
+                row["usersCreated"] = sum(self.users_created.on(d).values())
+                row["categoriesCreated"] = sum(self.categories_created.on(d).values())
+                row["categoriesUpdated"] = sum(self.categories_updated.on(d).values())
+                for name in EVENT_DOCS:
+                    row[name] = sum(self.events[name].on(d).values())
+            yield row
+
+    def report(self, start: str, end: str) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "range": {"from": start, "to": end},
+                "requests": self.requests_report(start, end),
+                "categories": self.categories_report(start, end),
+                "users": self.users_report(start, end),
+                **{name: self.events_report(name, start, end) for name in EVENT_DOCS},
+            }
+
+
+engine = ReportEngine()
+storage.cache.subscribe(storage.REQUESTS_DOC, engine.apply_requests)
+storage.cache.subscribe("users", engine.apply_users)
+storage.cache.subscribe("categories", engine.apply_categories)
+for _name in EVENT_DOCS:
+    storage.cache.subscribe(_name, engine.apply_events(_name))
+
+
+def refresh() -> None:
+    """Touch each document so external changes reach the counters first."""
+    storage.requests_view()
+    for name in SOURCE_DOCS[1:]:
+        storage.doc_view(name)
+
+
+def today() -> str:
+    """The UTC day default periods resolve against."""
+    return datetime.utcnow().date().isoformat()
+
+
+def period(option: str, day: Optional[str] = None, start: Optional[str] = None,
+           end: Optional[str] = None, month: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Resolve a report period to an inclusive (from, to) day range:
+      daily   -> `day` (default today)
+      weekly  -> start..end if given, else the 7 days ending `day` (default today)
+      monthly -> `month` (YYYY-MM, default this month)
+      custom  -> start..end
+    Raises ValueError with a user-facing message.
+    """
+    option = (option or "daily").strip().lower()
+    today = datetime.utcnow().date()
+    try:
+        ref = date.fromisoformat(day) if day else today
+        if option == "daily":
+            return ref.isoformat(), ref.isoformat()
+        if option == "weekly":
+            if start and end:
+                lo, hi = date.fromisoformat(start), date.fromisoformat(end)
+            else:
+                lo, hi = ref - timedelta(days=6), ref
+            if (hi - lo).days != 6:
+                raise ValueError("Error: A weekly report needs a 7-day range.")
+            return lo.isoformat(), hi.isoformat()
+        if option == "monthly":
+            y, m = (int(x) for x in (month or today.strftime("%Y-%m")).split("-"))
+            return date(y, m, 1).isoformat(), date(y, m, monthrange(y, m)[1]).isoformat()
+        if option == "custom":
+            lo, hi = date.fromisoformat(start or ""), date.fromisoformat(end or "")
+            if hi < lo:
+                raise ValueError("Error: 'end' must not be before 'start'.")
+            return lo.isoformat(), hi.isoformat()
+    except ValueError as e:
+        if str(e).startswith("Error:"):
+            raise
+        raise ValueError("Error: Invalid date in report parameters.")
+    raise ValueError(f"Error: Unknown dateOption '{option}' (daily, weekly, monthly or custom).")
+
+
+def generate(option: str = "daily", **kw) -> Dict[str, Any]:
+    start, end = period(option, **kw)
+    refresh()
+    return {"dateOption": (option or "daily").lower(), **engine.report(start, end)}
+
+
+def report_payload(args: Mapping) -> Tuple[Dict[str, Any], int]:
+    """GET /api/reports?dateOption=daily|weekly|monthly|custom&date=&from=&to=&month="""
+    try:
+        report = generate(
+            args.get("dateOption") or args.get("option") or "daily",
+            day=args.get("date") or None,
+            start=args.get("from") or None,
+            end=args.get("to") or None,
+            month=args.get("month") or None,
+        )
+    except ValueError as e:
+        return {"success": False, "message": str(e)}, 400
+    return {"success": True, "report": report}, 200
@@ -0,0 +1,87 @@
+# ================================================
+# request_index.py — primary-key index for requests
+#
+# Both apps spell the same request id several ways ('REQ-201', '201', 201).
+# canonical_id() folds them into one key, and RequestIndex maps that key to
+# the request record so lookups are a single dict hit instead of a scan that
+# re-normalizes every row. It also keeps the record's position in the cached
+# list, so a write replaces that one slot instead of searching for it.
+#
+# The shared index is kept in sync with the request cache by storage.py:
+# create/update/delete adjust one entry, a full reload rebuilds it.
+# ================================================
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+
+def canonical_id(rid) -> str:
+    """'REQ-201', 'req-201', ' 201 ', 201  ->  'REQ-201'."""
+    s = str(rid).strip() if rid is not None else ""
+    if s.upper().startswith("REQ-"):
+        s = s[4:].strip()
+    return f"REQ-{s}"
+
+
+class RequestIndex:
+    """canonical id -> request record (whatever mapping type the caller stores)."""
+
+    def __init__(self):
+        self._by_id: Dict[str, Mapping[str, Any]] = {}
+        self._pos: Dict[str, int] = {}  # canonical id -> row position
+        self._lock = threading.Lock()
+
+    # ---- maintenance ----
+    def rebuild(self, rows: Iterable[Mapping[str, Any]]) -> None:
+        by_id, pos = {}, {}
+        for i, rec in enumerate(rows):
+            # first record wins, matching the old first-match linear scans
+            key = canonical_id(rec.get("id"))
+            if key not in by_id:
+                by_id[key] = rec
+                pos[key] = i
+        with self._lock:
+            self._by_id, self._pos = by_id, pos
+
+    def upsert(self, rec: Mapping[str, Any]) -> None:
+        with self._lock:
+            self._by_id[canonical_id(rec.get("id"))] = rec
+
+    def upsert_rows(self, rows, recs) -> None:
+        """Records just written into `rows`: new ids were appended at its end, in order."""
+        with self._lock:
+            new = [k for k in dict.fromkeys(canonical_id(r.get("id")) for r in recs) if k not in self._pos]
+            end = len(rows) - len(new)
+            for j, key in enumerate(new):
+                self._pos[key] = end + j
+            for rec in recs:
+                self._by_id[canonical_id(rec.get("id"))] = rec
+
+    def apply(self, rows, change) -> None:
+        """Cache listener: change is None (rebuild), ('upsert', rec), ('upsert_many', recs) or ('delete', id)."""
+        if change is None or change[0] == "delete":
+            # a delete shifts the positions after it
+            self.rebuild(rows)
+        elif change[0] == "upsert":
+            self.upsert_rows(rows, (change[1],))
+        elif change[0] == "upsert_many":
+            self.upsert_rows(rows, change[1])
+
+    # ---- lookups ----
+    def get(self, rid) -> Optional[Mapping[str, Any]]:
+        return self._by_id.get(canonical_id(rid))
+
+    def position(self, rid) -> Optional[int]:
+        """Row position of the record in the cached list, or None."""
+        return self._pos.get(canonical_id(rid))
+
+    def __contains__(self, rid) -> bool:
+        return canonical_id(rid) in self._by_id
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def ids(self):
+        return list(self._by_id)
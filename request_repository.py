@@ -0,0 +1,189 @@
+# ================================================
+# request_repository.py — the one request model both apps read and write
+#
+# Max_app.py (root mount) and app.py (/pin mount) serve the same requests
+# document with two record shapes:
+#     Max_app   id "REQ-201", category, owner, date, created
+#     app.py    id 5, categoryId / categoryName, createdBy, createdAt
+# Both import this module instead of parsing / normalizing rows themselves.
+# Records come from the shared storage cache (parsed once per process); next
+# to each one the repository keeps its precomputed keys:
+#
+#   id        canonical id ('REQ-5' for 5, '5', 'req-5')
+#   status    lowercase, stripped ('pending' when missing)
+#   day       YYYY-MM-DD: the request's date, else the day it was created
+#   created   creation timestamp as stored (createdAt / created / date)
+#   owner     owner, or createdBy for app.py records
+#   category  category name as stored (categoryName / category)
+#   text      lowercase "title (or category) / description / id" for
+#             substring keyword search
+#
+# The keys follow the cache like the other request indexes: a full reload
+# recomputes them, a create / update / delete touches one entry, so a list
+# call never re-normalizes a row.
+#
+# Writes go through the same storage functions for both mounts (one lock,
+# per-record versions, the cache listeners); they are re-exported here so a
+# caller needs nothing but this module for requests.
+# ================================================
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+import storage
+from request_index import canonical_id
+from search_fields import day_of
+
+
+class RequestKeys(NamedTuple):
+    id: str
+    status: str
+    day: str
+    created: str
+    owner: str
+    category: str
+    text: str
+
+
+def compute_keys(rec: Mapping) -> RequestKeys:
+    """Normalize one record of either shape."""
+    rid = canonical_id(rec.get("id"))
+    category = str(rec.get("categoryName") or rec.get("category") or "")
+    created = str(rec.get("createdAt") or rec.get("created") or rec.get("date") or "")
+    return RequestKeys(
+        id=rid,
+        status=str(rec.get("status") or "pending").strip().lower(),
+        day=day_of(rec.get("date")) or day_of(created) or "",
+        created=created,
+        owner=str(rec.get("owner") or rec.get("createdBy") or ""),
+        category=category,
+        text="\n".join((str(rec.get("title") or category), str(rec.get("description") or ""), rid)).lower(),
+    )
+
+
+class RequestRepository:
+    """canonical id -> (snapshot record, its RequestKeys)."""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Mapping, RequestKeys]] = {}
+        self._lock = threading.Lock()
+
+    def apply(self, rows, change) -> None:
+        """Cache listener for the requests document."""
+        with self._lock:
+            if change is None:
+                entries = {}
+                for rec in rows or ():
+                    k = compute_keys(rec)
+                    entries.setdefault(k.id, (rec, k))
+                self._entries = entries
+            elif change[0] == "upsert":
+                self._put(change[1])
+            elif change[0] == "upsert_many":
+                for rec in change[1]:
+                    self._put(rec)
+            elif change[0] == "delete":
+                self._entries.pop(canonical_id(change[1]), None)
+
+    def _put(self, rec: Mapping) -> None:
+        k = compute_keys(rec)
+        self._entries[k.id] = (rec, k)
+
+    def keys(self, rec: Mapping) -> RequestKeys:
+        """Precomputed keys of a snapshot record (computed on the spot for copies)."""
+        entry = self._entries.get(canonical_id(rec.get("id")))
+        if entry is not None and entry[0] is rec:
+            return entry[1]
+        return compute_keys(rec)
+
+    def rows(self) -> Iterator[Tuple[Mapping, RequestKeys]]:
+        """(record, keys) for every request, in document order."""
+        for rec in storage.requests_view():
+            yield rec, self.keys(rec)
+
+
+repository = RequestRepository()
+storage.cache.subscribe(storage.REQUESTS_DOC, repository.apply)
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+def view():
+    """Read-only snapshot of all requests (shared; copy before mutating)."""
+    return storage.requests_view()
+
+
+def load() -> List[Dict[str, Any]]:
+    """Mutable copy of all requests."""
+    return storage.load_requests()
+
+
+def get(rid) -> Optional[Mapping]:
+    """Read-only record for any id spelling ('REQ-7', '7', 7), or None."""
+    return storage.find_request(rid)
+
+
+def copy(rid) -> Optional[Dict[str, Any]]:
+    """Mutable copy of one record, or None."""
+    return storage.get_request(rid)
+
+
+def keys(rec: Mapping) -> RequestKeys:
+    return repository.keys(rec)
+
+
+def category_name(rec: Mapping, cats_index: Optional[Mapping] = None) -> str:
+    """Stored category name, else the name of its categoryId in `cats_index` (id -> category)."""
+    name = keys(rec).category
+    cat_id = rec.get("categoryId")
+    if not name and cats_index and cat_id:
+        name = (cats_index.get(str(cat_id)) or {}).get("name") or ""
+    return name
+
+
+def match(keyword: str = "", category: str = "", status: str = "",
+          cats_index: Optional[Mapping] = None) -> List[Mapping]:
+    """
+    Records whose text contains `keyword`, whose category name is `category`
+    and whose status is `status` (all optional; keyword / status compared
+    lowercase), from the precomputed keys. Records that only carry a
+    categoryId are matched by that category's name in `cats_index`.
+    """
+    keyword = (keyword or "").strip().lower()
+    status = (status or "").strip().lower()
+    return [rec for rec, k in repository.rows()
+            if (not keyword or keyword in k.text)
+            and (not category or (k.category or category_name(rec, cats_index)) == category)
+            and (not status or k.status == status)]
+
+
+class RequestOrder:
+    """Every request in a list order, read from the sorted order indexes (see pagination.py)."""
+
+    def count(self, order: str) -> int:
+        storage.requests_view()
+        return storage.field_indexes.ordered_count(order)
+
+    def walk(self, order: str, after=None, desc: bool = False, limit: Optional[int] = None) -> List[Mapping]:
+        storage.requests_view()
+        ids = storage.field_indexes.ordered(order, after, desc, limit)
+        return [rec for rec in map(storage.request_index.get, ids) if rec is not None]
+
+
+ordered = RequestOrder()
+query = storage.query_requests
+query_ids = storage.query_request_ids
+search = storage.search_requests
+
+# -----------------------------
+# Writes (shared by both mounts)
+# -----------------------------
+insert = storage.insert_request
+update = storage.update_request
+update_many = storage.update_requests
+modify = storage.modify_request
+delete = storage.delete_request
+save_all = storage.save_requests
@@ -1,19 +1,156 @@
+"""
+Combined WSGI entry point: Max_app (CSR / PIN pages and APIs) at the root,
+the admin / platform app mounted under /pin.
+
+Development (single process, reloader + debugger):
+    python run_combined.py
+
+Production (pre-forked workers, both apps preloaded in the master and
+shared with the workers through fork):
+    python run_combined.py --prod [--server gunicorn|waitress]
+                           [--bind 0.0.0.0:5050] [--workers N] [--threads N]
+
+Defaults can also come from the environment: WEB_SERVER, WEB_BIND,
+WEB_WORKERS (default 2 x CPUs + 1), WEB_THREADS (default 4),
+WEB_TIMEOUT (graceful timeout, seconds).
+
+Thread budget: every open dashboard holds a live-changes stream
+(GET /api/events, see change_feed.py), which occupies one thread while it
+is open. Per process at most half of the threads (CHANGE_FEED_MAX_STREAMS
+overrides) are given to streams, for up to CHANGE_FEED_MAX_SECONDS (25)
+each; further dashboards poll every few seconds instead. With the default
+4 threads, 2 serve streams and 2 always remain for ordinary requests. The
+development runner is threaded (one thread per connection).
+
+gunicorn (POSIX) is used when installed, otherwise waitress (one process,
+WEB_THREADS threads). The same app can be served by the gunicorn CLI:
+    gunicorn -w 4 --threads 4 --preload -b 0.0.0.0:5050 run_combined:application
+
+Graceful reload under gunicorn:
+    kill -HUP  <master pid>   # new workers, old ones finish their requests
+    kill -USR2 <master pid>   # re-exec with new code (apps are preloaded),
+    kill -TERM <old master>   # ... then retire the old master
+Storage is safe across workers: writes share an flock and per-request
+versions (see storage.py); per-process state is reset after fork.
+"""
+
+import argparse
+import os
+
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
 from werkzeug.serving import run_simple
 
 # Keep CSR/Max app at ROOT (its /login, /api/..., etc.)
-from Max_app import app as csr_app, ensure_default_csr
+from Max_app import app as csr_app, init_users_file, init_requests_file, _ensure_shortlists_file
 
 # Mount the other app (PIN) under /pin
 from app import app as pin_app
 
+import change_feed
+from shortlist_store import migrate_request_marks
+from view_counter import view_counter
+
 # Combined WSGI app: root -> Max_app, /pin -> other app
 application = DispatcherMiddleware(csr_app, {
     "/pin": pin_app
 })
 
+DEFAULT_BIND = "0.0.0.0:5050"
+
+
+def prepare():
+    """
+    Make sure the data files exist (no default users are created) and fold
+    legacy per-request shortlist marks into shortlists.json (a no-op once
+    done).
+    """
+    init_users_file()
+    init_requests_file()
+    _ensure_shortlists_file()
+    migrate_request_marks()
+
+
+def _split_bind(bind):
+    host, _, port = bind.rpartition(":")
+    return host or "0.0.0.0", int(port)
+
+
+# -----------------------------
+# gunicorn
+# -----------------------------
+def serve_gunicorn(bind, workers, threads, timeout):
+    from gunicorn.app.base import BaseApplication
+
+    class CombinedApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": bind,
+                "workers": workers,
+                "threads": threads,
+                "worker_class": "gthread" if threads > 1 else "sync",
+                "preload_app": True,
+                "graceful_timeout": timeout,
+                # flush batched view counts before a worker goes away
+                "worker_exit": lambda arbiter, worker: view_counter.stop(),
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return application  # already imported: preloaded in the master
+
+    CombinedApplication().run()
+
+
+# -----------------------------
+# waitress (no fork: one process, a thread pool)
+# -----------------------------
+def serve_waitress(bind, threads):
+    from waitress import serve
+
+    host, port = _split_bind(bind)
+    serve(application, host=host, port=port, threads=threads)
+
+
+def _pick_server(requested):
+    if requested:
+        return requested
+    try:
+        import gunicorn  # noqa: F401
+        import fcntl     # noqa: F401  (gunicorn is POSIX only)
+        return "gunicorn"
+    except ImportError:
+        return "waitress"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the combined CSR + admin/platform apps.")
+    parser.add_argument("--prod", action="store_true", help="production server instead of the debug runner")
+    parser.add_argument("--server", choices=("gunicorn", "waitress"), default=os.environ.get("WEB_SERVER") or None)
+    parser.add_argument("--bind", default=os.environ.get("WEB_BIND") or DEFAULT_BIND)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_WORKERS") or (os.cpu_count() or 1) * 2 + 1))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("WEB_THREADS") or 4))
+    parser.add_argument("--timeout", type=int, default=int(os.environ.get("WEB_TIMEOUT") or 30))
+    args = parser.parse_args(argv)
+
+    prepare()
+    if not args.prod:
+        # run on the port your frontend expects
+        host, port = _split_bind(args.bind)
+        run_simple(host, port, application, use_reloader=True, use_debugger=True, threaded=True)
+        return
+
+    if not os.environ.get("CHANGE_FEED_MAX_STREAMS"):
+        # keep half of each process's threads free of held streams
+        change_feed.slots.limit = max(1, args.threads) // 2
+
+    server = _pick_server(args.server)
+    print(f"Serving on {args.bind} with {server}", flush=True)
+    if server == "gunicorn":
+        serve_gunicorn(args.bind, max(1, args.workers), max(1, args.threads), args.timeout)
+    else:
+        serve_waitress(args.bind, max(1, args.threads))
+
+
 if __name__ == "__main__":
-    # make sure the default CSR user exists
-    ensure_default_csr()
-    # run on the port your frontend expects
-    run_simple("0.0.0.0", 5050, application, use_reloader=True, use_debugger=True)
+    main()
@@ -0,0 +1,162 @@
+# ================================================
+# search_fields.py — normalized shadow fields, computed when a record is written
+#
+# The search stories compare lowercase / stripped values. Instead of every
+# query re-normalizing every row, a request or user record carries its
+# normalized values under SHADOW_KEY ("_search"), written with the record:
+#
+#   request  id (without 'REQ-'), title, description, category, location,
+#            status, bucket (Pending | Assigned | Completed), date (as given),
+#            day (YYYY-MM-DD or ""), owner
+#   user     id, uid, name (fullName or username), email, username, role
+#
+# storage.py stamps requests on every write (insert / update / batch /
+# whole-list save) and stamps records that have none when the requests are
+# loaded; app.py / Max_app.py stamp users when the users document is saved.
+# Searches lowercase the query once and compare against these values.
+#
+# request_shadow() / user_shadow() fall back to computing the values for a
+# record that has none (records built outside storage, e.g. in a story's
+# fallback path), so callers never need to check.
+#
+# The shadow fields are internal: public() is the copy of a record (or of a
+# payload holding records) that goes out as JSON, used by the change feed,
+# the memoized enriched rows and the exports. Both apps' jsonify()
+# (http_cache.JSONProvider) use without_shadow() instead, which only copies
+# the dicts that carry the fields, so responses keep their original shape.
+# ================================================
+
+from __future__ import annotations
+
+import re
+from datetime import date
+from typing import Any, Dict, Mapping, Optional
+
+SHADOW_KEY = "_search"
+
+_DAY = re.compile(r"^\s*(\d{4}-\d{2}-\d{2})")
+
+
+def day_of(ts) -> Optional[str]:
+    """'2025-11-10T13:20:00Z' / '2025-11-10' -> '2025-11-10'; None if not a date."""
+    m = _DAY.match(str(ts or ""))
+    if not m:
+        return None
+    try:
+        date.fromisoformat(m.group(1))
+    except ValueError:
+        return None
+    return m.group(1)
+
+
+def status_bucket(raw) -> str:
+    """Pending | Assigned | Completed ('in progress' counts as Assigned)."""
+    s = (raw or "").strip().lower()
+    if s in ("completed", "complete"):
+        return "Completed"
+    if s in ("in progress", "in_progress", "inprogress", "assigned", "in prog"):
+        return "Assigned"
+    return "Pending"
+
+
+def public(obj):
+    """Deep mutable copy of `obj` (like data_cache.thaw) without any SHADOW_KEY entry."""
+    if isinstance(obj, Mapping):
+        return {k: public(v) for k, v in obj.items() if k != SHADOW_KEY}
+    if isinstance(obj, (list, tuple)):
+        return [public(v) for v in obj]
+    return obj
+
+
+def without_shadow(obj):
+    """
+    `obj` with SHADOW_KEY dropped from every plain dict in it. Only those
+    dicts and the containers holding them are copied; a payload without any
+    comes back as is. Read-only views (MappingProxyType) are not entered.
+    """
+    if isinstance(obj, dict):
+        if SHADOW_KEY in obj:
+            return {k: without_shadow(v) for k, v in obj.items() if k != SHADOW_KEY}
+        out = obj
+        for k, v in obj.items():
+            nv = without_shadow(v)
+            if nv is not v:
+                if out is obj:
+                    out = dict(obj)
+                out[k] = nv
+        return out
+    if isinstance(obj, (list, tuple)):
+        out = obj
+        for i, v in enumerate(obj):
+            nv = without_shadow(v)
+            if nv is not v:
+                if out is obj:
+                    out = list(obj)
+                out[i] = nv
+        return out
+    return obj
+
+
+def plain_id(rid) -> str:
+    """'REQ-201' / ' 201 ' / 201 -> '201' (how the search stories compare ids)."""
+    return str(rid if rid is not None else "").strip().replace("REQ-", "")
+
+
+# -----------------------------
+# Requests
+# -----------------------------
+def request_fields(rec: Mapping) -> Dict[str, str]:
+    status = str(rec.get("status") or "")
+    return {
+        "id": plain_id(rec.get("id")),
+        "title": str(rec.get("title") or "").lower(),
+        "description": str(rec.get("description") or "").lower(),
+        "category": str(rec.get("category") or rec.get("categoryName") or "").lower(),
+        "location": str(rec.get("location") or "").lower(),
+        "status": status.strip().lower(),
+        "bucket": status_bucket(status),
+        "date": str(rec.get("date") or "").strip(),
+        "day": day_of(rec.get("date") or rec.get("createdAt") or rec.get("created")) or "",
+        "owner": str(rec.get("owner") or rec.get("createdBy") or "").strip().lower(),
+    }
+
+
+def stamp_request(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """(Re)compute the request's shadow fields in place; returns the record."""
+    rec[SHADOW_KEY] = request_fields(rec)
+    return rec
+
+
+def request_shadow(rec: Mapping) -> Mapping[str, str]:
+    shadow = rec.get(SHADOW_KEY)
+    return shadow if shadow is not None else request_fields(rec)
+
+
+# -----------------------------
+# Users
+# -----------------------------
+def user_fields(rec: Mapping, role: str = "", username: str = "") -> Dict[str, str]:
+    username = str(rec.get("username") or username or "")
+    return {
+        "id": str(rec.get("id") or "").lower(),
+        "uid": str(rec.get("uid") or "").lower(),
+        "name": str(rec.get("fullName") or username).lower(),
+        "email": str(rec.get("email") or "").lower(),
+        "username": username.lower(),
+        "role": str(rec.get("role") or role or "").lower(),
+    }
+
+
+def stamp_users(data) -> None:
+    """Stamp every user of a users document ({role: {username: record}}) in place."""
+    for role, bucket in (data or {}).items():
+        if not isinstance(bucket, dict):
+            continue
+        for uname, rec in bucket.items():
+            if isinstance(rec, dict):
+                rec[SHADOW_KEY] = user_fields(rec, role, uname)
+
+
+def user_shadow(rec: Mapping, role: str = "", username: str = "") -> Mapping[str, str]:
+    shadow = rec.get(SHADOW_KEY)
+    return shadow if shadow is not None else user_fields(rec, role, username)
@@ -0,0 +1,223 @@
+# ================================================
+# shortlist_store.py — per-CSR shortlists with forward / reverse indexes
+#
+# shortlists.json ({csr: [request ids]}) is the only place a shortlist is
+# stored; one save / remove is one locked write of that document. In memory
+# the store keeps, following the cached document:
+#
+#   forward   csr -> request ids (insertion order)     list(csr)      O(k)
+#   reverse   request id -> csrs                       members(rid)   O(k)
+#   counts    request id -> number of csrs             count(rid)     O(1)
+#
+# Writes made here reach the indexes as a small delta ("add" / "remove");
+# a document read from disk (another process wrote) rebuilds them.
+#
+# Requests used to carry a denormalized "shortlisted_by" list; it is no
+# longer written. migrate_request_marks() folds any such legacy marks into
+# shortlists.json and drops them (and the "shortlisted" flag) from the
+# requests in one locked step, so counts survive an upgrade and a later
+# removal is not undone. run_combined.py runs it at startup; by hand:
+#   python shortlist_store.py migrate
+# ================================================
+
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Mapping, Set
+
+import storage
+from data_cache import thaw
+from request_index import canonical_id
+
+SHORTLISTS_DOC = "shortlists"
+
+
+class ShortlistStore:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._forward: Dict[str, Dict[str, None]] = {}  # csr -> ordered set of ids
+        self._reverse: Dict[str, Set[str]] = {}
+        self._counts: Dict[str, int] = {}
+
+    # ---- maintenance ----
+    def _add(self, csr: str, key: str) -> None:
+        ids = self._forward.setdefault(csr, {})
+        if key in ids:
+            return
+        ids[key] = None
+        self._reverse.setdefault(key, set()).add(csr)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _remove(self, csr: str, key: str) -> None:
+        ids = self._forward.get(csr)
+        if ids is None or key not in ids:
+            return
+        del ids[key]
+        if not ids:
+            del self._forward[csr]
+        members = self._reverse[key]
+        members.discard(csr)
+        if members:
+            self._counts[key] -= 1
+        else:
+            del self._reverse[key]
+            del self._counts[key]
+
+    def apply(self, doc, change) -> None:
+        """Cache listener: change None rebuilds, ("add"|"remove", csr, id) is a delta."""
+        with self._lock:
+            if change is None:
+                self._reset()
+                if isinstance(doc, Mapping):
+                    for csr, ids in doc.items():
+                        for rid in ids if isinstance(ids, (list, tuple)) else ():
+                            self._add(csr, canonical_id(rid))
+            elif change[0] == "add":
+                self._add(change[1], change[2])
+            elif change[0] == "remove":
+                self._remove(change[1], change[2])
+
+    # ---- queries (brought up to date with storage first) ----
+    def _fresh(self) -> None:
+        storage.doc_view(SHORTLISTS_DOC)
+
+    def has(self, csr: str, rid) -> bool:
+        self._fresh()
+        return canonical_id(rid) in self._forward.get(csr, ())
+
+    def list(self, csr: str) -> List[str]:
+        self._fresh()
+        with self._lock:
+            return list(self._forward.get(csr, ()))
+
+    def members(self, rid) -> List[str]:
+        self._fresh()
+        with self._lock:
+            return sorted(self._reverse.get(canonical_id(rid), ()))
+
+    def count(self, rid) -> int:
+        self._fresh()
+        return self._counts.get(canonical_id(rid), 0)
+
+    def counts(self) -> Dict[str, int]:
+        self._fresh()
+        with self._lock:
+            return dict(self._counts)
+
+    # ---- mutations: one document write each ----
+    def add(self, csr: str, rid) -> bool:
+        """Shortlist `rid` for `csr`; False if it already was."""
+        key = canonical_id(rid)
+        if self.has(csr, key):
+            return False
+        added = []
+
+        def mutate(doc):
+            ids = doc.setdefault(csr, [])
+            if any(canonical_id(x) == key for x in ids):
+                return False
+            ids.append(key)
+            added.append(key)
+
+        _modify(mutate, ("add", csr, key))
+        return bool(added)
+
+    def remove(self, csr: str, rid) -> bool:
+        """Drop `rid` from `csr`'s shortlist; False if it was not there."""
+        key = canonical_id(rid)
+        if not self.has(csr, key):
+            return False
+        removed = []
+
+        def mutate(doc):
+            ids = doc.get(csr) or []
+            keep = [x for x in ids if canonical_id(x) != key]
+            if len(keep) == len(ids):
+                return False
+            removed.append(key)
+            if keep:
+                doc[csr] = keep
+            else:
+                doc.pop(csr, None)
+
+        _modify(mutate, ("remove", csr, key))
+        return bool(removed)
+
+    def forget(self, rid) -> int:
+        """Remove a (deleted) request from every shortlist; returns how many."""
+        key = canonical_id(rid)
+        dropped = []
+
+        def mutate(doc):
+            for csr in list(doc):
+                ids = doc[csr] if isinstance(doc[csr], list) else []
+                keep = [x for x in ids if canonical_id(x) != key]
+                if len(keep) != len(ids):
+                    dropped.append(csr)
+                    doc[csr] = keep
+            return bool(dropped)
+
+        if self.count(rid):
+            _modify(mutate, None)
+        return len(dropped)
+
+
+def _modify(mutate, change) -> None:
+    """storage.modify_doc() for shortlists.json, which may still hold the old global list."""
+    with storage.write_lock:
+        doc = storage.load_doc(SHORTLISTS_DOC, {})
+        if not isinstance(doc, dict):
+            doc = {}  # the old list had no owner; a per-CSR store starts empty
+        if mutate(doc) is not False:
+            storage.save_doc(SHORTLISTS_DOC, doc, change)
+
+
+store = ShortlistStore()
+storage.cache.subscribe(SHORTLISTS_DOC, store.apply)
+
+
+def migrate_request_marks() -> int:
+    """
+    Fold legacy request.shortlisted_by lists into shortlists.json and drop
+    them (with the "shortlisted" flag) from the requests; returns marks
+    added. Writes nothing once no request carries either field.
+    """
+    with storage.transaction():
+        legacy = [rec for rec in storage.requests_view() if "shortlisted_by" in rec or "shortlisted" in rec]
+        if not legacy:
+            return 0
+        added = []
+
+        def mutate(doc):
+            for rec in legacy:
+                key = canonical_id(rec.get("id"))
+                for csr in rec.get("shortlisted_by") or ():
+                    if not isinstance(csr, str) or not csr:
+                        continue
+                    ids = doc.setdefault(csr, [])
+                    if not any(canonical_id(x) == key for x in ids):
+                        ids.append(key)
+                        added.append(key)
+            return bool(added)
+
+        _modify(mutate, None)
+        recs = []
+        for rec in legacy:
+            rec = thaw(rec)
+            rec.pop("shortlisted_by", None)
+            rec.pop("shortlisted", None)
+            recs.append(rec)
+        storage.update_requests(recs, event="migrate")
+    return len(added)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["migrate"]:
+        print(f"Added {migrate_request_marks()} shortlist entries from request records.")
+    else:
+        sys.exit("usage: python shortlist_store.py migrate")
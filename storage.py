@@ -0,0 +1,970 @@
+# ================================================
+# storage.py — pluggable persistence for the JSON data files
+#
+# Backends
+#   json   : the original whole-file documents (requests.json, users.json, ...)
+#   sqlite : one SQLite database in WAL mode. Requests are stored one row per
+#            request, so a single insert/update/delete touches a single row.
+#   journal: the json backend plus an append-only request journal
+#            (requests_journal.jsonl). A request write is one appended line;
+#            the journal is folded back into requests.json every
+#            STORAGE_JOURNAL_COMPACT entries and on startup.
+#
+# Pick the backend with the STORAGE_BACKEND env var ("json" | "sqlite" | "journal").
+# The SQLite file defaults to app_data.db next to this module (STORAGE_DB).
+#
+# One-shot migration of the existing JSON files into SQLite:
+#   python storage.py migrate [--db PATH] [--force]
+# Fold the request journal into requests.json now:
+#   python storage.py compact
+#
+# Concurrency: every write goes through one lock that is shared by threads
+# (RLock) and processes (flock on .storage.lock, STORAGE_LOCK). Requests
+# carry a "version" number; modify_request() is an optimistic
+# read -> mutate -> compare-and-swap loop, modify_doc() a locked
+# read -> mutate -> write of a whole document.
+#
+# Every request write also (re)computes the record's normalized search
+# fields ("_search", see search_fields.py), so searches never re-normalize.
+# ================================================
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl  # POSIX only; without it the journal relies on the in-process lock
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from data_cache import DataCache, freeze, thaw
+from request_index import RequestIndex, canonical_id
+from search_fields import SHADOW_KEY, stamp_request
+from field_index import SecondaryIndexes
+from text_index import TextIndex
+
+BASE_DIR = Path(__file__).resolve().parent
+
+REQUESTS_DOC = "requests"
+# Document-style files (the whole file is one JSON value)
+DOC_DEFAULTS = {
+    "users": {},
+    "categories": [],
+    "shortlists": {},
+    "matches": [],
+    "sequences": {},  # id_allocator.py counters
+}
+
+
+# ---------- Small helpers ----------
+def _req_key(rid) -> str:
+    """Primary key used for a request row: the id exactly as stored, as text."""
+    return str(rid).strip() if rid is not None else ""
+
+
+def _alt_keys(rid) -> List[str]:
+    """'REQ-12' <-> '12' — the two spellings both apps use for the same request."""
+    key = _req_key(rid)
+    if key.upper().startswith("REQ-"):
+        return [key, key.split("-", 1)[1]]
+    return [key, f"REQ-{key}"]
+
+
+def _dump(obj) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"))
+
+
+# ================================================
+# JSON backend (original behaviour)
+# ================================================
+class JsonStorage:
+    """Whole-file JSON documents, written atomically via temp file + rename."""
+
+    name = "json"
+    row_writes = False
+
+    def __init__(self, base_dir: Path = BASE_DIR):
+        self.base_dir = Path(base_dir)
+        self._lock = threading.RLock()
+
+    def path_for(self, name: str) -> Path:
+        return self.base_dir / f"{name}.json"
+
+    def _read(self, name: str, default):
+        path = self.path_for(name)
+        if not path.exists():
+            self._write(name, default)
+            return default
+        try:
+            raw = path.read_text(encoding="utf-8")
+            return json.loads(raw) if raw.strip() else default
+        except Exception:
+            return default
+
+    def _write(self, name: str, data) -> None:
+        path = self.path_for(name)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        tmp.replace(path)
+
+    def stamp(self, name: str):
+        """(inode, mtime_ns, size) of the file — every rewrite is a rename to a new inode."""
+        try:
+            st = self.path_for(name).stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    # ---- documents ----
+    def load_doc(self, name: str, default=None):
+        if default is None:
+            default = DOC_DEFAULTS.get(name, {})
+        return self._read(name, default)
+
+    def save_doc(self, name: str, data) -> None:
+        with self._lock:
+            self._write(name, data)
+
+    # ---- requests ----
+    def load_requests(self) -> List[Dict[str, Any]]:
+        data = self._read(REQUESTS_DOC, [])
+        return data if isinstance(data, list) else []
+
+    def save_requests(self, requests_data: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._write(REQUESTS_DOC, list(requests_data))
+
+    def get_request(self, rid) -> Optional[Dict[str, Any]]:
+        keys = _alt_keys(rid)
+        return next((r for r in self.load_requests() if _req_key(r.get("id")) in keys), None)
+
+    def insert_request(self, rec: Dict[str, Any], event: str = "create") -> None:
+        with self._lock:
+            reqs = self.load_requests()
+            reqs.append(rec)
+            self._write(REQUESTS_DOC, reqs)
+
+    def update_request(self, rec: Dict[str, Any], event: str = "update") -> None:
+        """Replace the stored request with the same id (appends if missing)."""
+        with self._lock:
+            reqs = self.load_requests()
+            keys = _alt_keys(rec.get("id"))
+            for i, r in enumerate(reqs):
+                if _req_key(r.get("id")) in keys:
+                    reqs[i] = rec
+                    break
+            else:
+                reqs.append(rec)
+            self._write(REQUESTS_DOC, reqs)
+
+    def delete_request(self, rid, event: str = "delete") -> bool:
+        with self._lock:
+            reqs = self.load_requests()
+            keys = _alt_keys(rid)
+            kept = [r for r in reqs if _req_key(r.get("id")) not in keys]
+            if len(kept) == len(reqs):
+                return False
+            self._write(REQUESTS_DOC, kept)
+            return True
+
+
+# ================================================
+# SQLite backend (WAL)
+# ================================================
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    seq  INTEGER PRIMARY KEY AUTOINCREMENT,
+    id   TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SQLiteStorage:
+    """
+    Requests live in a row-per-request table (insertion order kept via `seq`);
+    users/categories/shortlists/matches are stored as whole JSON documents.
+    """
+
+    name = "sqlite"
+    row_writes = True
+
+    def __init__(self, db_path: Path | str | None = None):
+        self.db_path = str(db_path or os.environ.get("STORAGE_DB") or (BASE_DIR / "app_data.db"))
+        self._local = threading.local()
+        # id -> serialized row, so save_requests() only writes rows that changed
+        self._rows: Dict[str, str] = {}
+        self._rows_lock = threading.Lock()
+        self._rows_loaded = False
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def after_fork(self) -> None:
+        """SQLite connections must not cross fork(); the child opens its own."""
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _bump(self, conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO meta(key, value) VALUES(?, '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+            (f"version:{name}",),
+        )
+
+    def stamp(self, name: str):
+        """Per-document write counter, bumped in the same transaction as the write."""
+        return self.get_meta(f"version:{name}")
+
+    # ---- documents ----
+    def load_doc(self, name: str, default=None):
+        if default is None:
+            default = DOC_DEFAULTS.get(name, {})
+        row = self._conn().execute("SELECT data FROM documents WHERE name = ?", (name,)).fetchone()
+        if not row:
+            return default
+        try:
+            return json.loads(row[0])
+        except Exception:
+            return default
+
+    def save_doc(self, name: str, data) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO documents(name, data) VALUES(?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET data = excluded.data",
+                (name, json.dumps(data)),
+            )
+            self._bump(conn, name)
+
+    # ---- requests ----
+    def load_requests(self) -> List[Dict[str, Any]]:
+        rows = self._conn().execute("SELECT id, data FROM requests ORDER BY seq").fetchall()
+        with self._rows_lock:
+            self._rows = {rid: data for rid, data in rows}
+            self._rows_loaded = True
+        return [json.loads(data) for _, data in rows]
+
+    def save_requests(self, requests_data: List[Dict[str, Any]]) -> None:
+        """
+        Legacy whole-list save used by the BCE controllers. Only rows whose
+        content differs from what is stored are written; missing ids are deleted.
+        """
+        if not self._rows_loaded:
+            self.load_requests()
+        incoming = {}
+        for rec in requests_data:
+            incoming[_req_key(rec.get("id"))] = _dump(rec)
+        with self._rows_lock, self._conn() as conn:
+            changed = False
+            for rid in [k for k in self._rows if k not in incoming]:
+                conn.execute("DELETE FROM requests WHERE id = ?", (rid,))
+                self._rows.pop(rid, None)
+                changed = True
+            for rid, data in incoming.items():
+                if self._rows.get(rid) == data:
+                    continue
+                conn.execute(
+                    "INSERT INTO requests(id, data) VALUES(?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                    (rid, data),
+                )
+                self._rows[rid] = data
+                changed = True
+            if changed:
+                self._bump(conn, REQUESTS_DOC)
+
+    def get_request(self, rid) -> Optional[Dict[str, Any]]:
+        conn = self._conn()
+        for key in _alt_keys(rid):
+            row = conn.execute("SELECT data FROM requests WHERE id = ?", (key,)).fetchone()
+            if row:
+                return json.loads(row[0])
+        return None
+
+    def insert_request(self, rec: Dict[str, Any], event: str = "create") -> None:
+        self.update_request(rec)
+
+    def update_request(self, rec: Dict[str, Any], event: str = "update") -> None:
+        """Upsert a single request row."""
+        rid, data = _req_key(rec.get("id")), _dump(rec)
+        with self._rows_lock, self._conn() as conn:
+            conn.execute(
+                "INSERT INTO requests(id, data) VALUES(?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                (rid, data),
+            )
+            self._bump(conn, REQUESTS_DOC)
+            self._rows[rid] = data
+
+    def update_requests(self, recs: List[Dict[str, Any]], event: str = "update") -> None:
+        """Upsert several rows in one transaction."""
+        rows = [(_req_key(r.get("id")), _dump(r)) for r in recs]
+        with self._rows_lock, self._conn() as conn:
+            conn.executemany(
+                "INSERT INTO requests(id, data) VALUES(?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                rows,
+            )
+            self._bump(conn, REQUESTS_DOC)
+            self._rows.update(rows)
+
+    def delete_request(self, rid, event: str = "delete") -> bool:
+        with self._rows_lock, self._conn() as conn:
+            for key in _alt_keys(rid):
+                if conn.execute("DELETE FROM requests WHERE id = ?", (key,)).rowcount:
+                    self._bump(conn, REQUESTS_DOC)
+                    self._rows.pop(key, None)
+                    return True
+        return False
+
+    # ---- meta ----
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO meta(key, value) VALUES(?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+
+# ================================================
+# Journal backend (JSON snapshot + append-only request log)
+# ================================================
+def _replay(rows: List[Dict[str, Any]], entries) -> List[Dict[str, Any]]:
+    """Apply journal entries to a snapshot in order (same semantics as JsonStorage)."""
+    pos: Dict[str, int] = {}
+    for i, r in enumerate(rows):
+        pos.setdefault(_req_key(r.get("id")), i)
+    for e in entries:
+        if e.get("op") == "upsert":
+            rec = e.get("data") or {}
+            i = next((pos[k] for k in _alt_keys(rec.get("id")) if k in pos), None)
+            if i is None:
+                pos[_req_key(rec.get("id"))] = len(rows)
+                rows.append(rec)
+            else:
+                rows[i] = rec
+        elif e.get("op") == "delete":
+            keys = _alt_keys(e.get("id"))
+            rows = [r for r in rows if _req_key(r.get("id")) not in keys]
+            pos = {}
+            for i, r in enumerate(rows):
+                pos.setdefault(_req_key(r.get("id")), i)
+    return rows
+
+
+class JournalStorage(JsonStorage):
+    """
+    requests.json is the last compacted snapshot; requests_journal.jsonl holds
+    every request write since, one JSON object per line:
+
+        {"ts": ..., "event": "assign", "op": "upsert", "id": "REQ-7", "data": {...}}
+        {"ts": ..., "event": "delete", "op": "delete", "id": "REQ-9"}
+
+    Reads replay the journal over the snapshot. Upserts carry the whole record,
+    so replay is idempotent and a crash between writing the snapshot and
+    truncating the journal loses nothing. A torn last line (crash mid-append)
+    is skipped. Documents other than requests behave exactly like JsonStorage.
+    """
+
+    name = "journal"
+    row_writes = True
+
+    def __init__(self, base_dir: Path = BASE_DIR, compact_every: Optional[int] = None):
+        super().__init__(base_dir)
+        self.journal_path = self.base_dir / "requests_journal.jsonl"
+        self.compact_every = int(compact_every or os.environ.get("STORAGE_JOURNAL_COMPACT") or 1000)
+        self.fsync = (os.environ.get("STORAGE_JOURNAL_FSYNC") or "").strip() == "1"
+        self._entries = 0
+        # replay whatever a previous run left behind into the snapshot
+        self.recovered = self.compact()
+
+    # ---- journal file ----
+    def _read_journal(self) -> List[Dict[str, Any]]:
+        try:
+            lines = self.journal_path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # torn write from a crash
+        return entries
+
+    def _locked(self, fh) -> None:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+
+    def _append(self, *entries: Dict[str, Any]) -> None:
+        ts = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        lines = "".join(json.dumps({"ts": ts, **e}, separators=(",", ":")) + "\n" for e in entries)
+        with self._lock:
+            with open(self.journal_path, "a", encoding="utf-8") as fh:
+                self._locked(fh)
+                fh.write(lines)
+                fh.flush()
+                if self.fsync:
+                    os.fsync(fh.fileno())
+            self._entries += len(entries)
+            if self._entries >= self.compact_every:
+                self.compact()
+
+    def compact(self) -> int:
+        """Fold the journal into requests.json and truncate it; returns entries folded."""
+        with self._lock:
+            if not self.journal_path.exists():
+                self._entries = 0
+                return 0
+            with open(self.journal_path, "a+", encoding="utf-8") as fh:
+                self._locked(fh)
+                entries = self._read_journal()
+                if entries:
+                    self._write(REQUESTS_DOC, _replay(super().load_requests(), entries))
+                    fh.truncate(0)
+            self._entries = 0
+            return len(entries)
+
+    def stamp(self, name: str):
+        if name != REQUESTS_DOC:
+            return super().stamp(name)
+        try:
+            st = self.journal_path.stat()
+            journal = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            journal = None
+        return (super().stamp(name), journal)
+
+    # ---- requests ----
+    def load_requests(self) -> List[Dict[str, Any]]:
+        return _replay(super().load_requests(), self._read_journal())
+
+    def save_requests(self, requests_data: List[Dict[str, Any]]) -> None:
+        """Whole-list save: the list becomes the new snapshot, the journal is emptied."""
+        with self._lock:
+            with open(self.journal_path, "a+", encoding="utf-8") as fh:
+                self._locked(fh)
+                self._write(REQUESTS_DOC, list(requests_data))
+                fh.truncate(0)
+            self._entries = 0
+
+    def insert_request(self, rec: Dict[str, Any], event: str = "create") -> None:
+        self.update_request(rec, event=event)
+
+    def update_request(self, rec: Dict[str, Any], event: str = "update") -> None:
+        self._append({"event": event, "op": "upsert", "id": _req_key(rec.get("id")), "data": rec})
+
+    def update_requests(self, recs: List[Dict[str, Any]], event: str = "update") -> None:
+        self._append(*({"event": event, "op": "upsert", "id": _req_key(r.get("id")), "data": r} for r in recs))
+
+    def delete_request(self, rid, event: str = "delete") -> bool:
+        """Recorded unconditionally; deleting a missing id is a no-op on replay."""
+        self._append({"event": event, "op": "delete", "id": _req_key(rid)})
+        return True
+
+
+# ================================================
+# Backend selection
+# ================================================
+BACKENDS = {
+    "json": JsonStorage,
+    "sqlite": SQLiteStorage,
+    "journal": JournalStorage,
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Process-wide backend chosen by STORAGE_BACKEND (default: json)."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                kind = (os.environ.get("STORAGE_BACKEND") or "json").strip().lower()
+                if kind not in BACKENDS:
+                    raise ValueError(f"Unknown STORAGE_BACKEND '{kind}' (expected one of {sorted(BACKENDS)})")
+                _storage = BACKENDS[kind]()
+    return _storage
+
+
+def set_storage(backend) -> None:
+    """Swap the process-wide backend (scripts / tests)."""
+    global _storage
+    with _storage_lock:
+        _storage = backend
+    cache.invalidate()
+
+
+# ================================================
+# Write lock (threads + processes)
+# ================================================
+class StorageLock:
+    """
+    Reentrant exclusive lock: an RLock for threads in this process plus an
+    flock on a lock file for other processes (gunicorn workers, scripts).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+    def __enter__(self):
+        self._rlock.acquire()
+        try:
+            if self._depth == 0 and fcntl is not None:
+                fh = open(self.path, "a+")
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                self._fh = fh
+        except BaseException:
+            self._rlock.release()
+            raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+        self._rlock.release()
+
+    def after_fork(self) -> None:
+        # the child owns no lock, whatever the parent held at fork time
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+
+write_lock = StorageLock(os.environ.get("STORAGE_LOCK") or (BASE_DIR / ".storage.lock"))
+
+
+def _after_fork() -> None:
+    """Reset per-process state in a forked child (gunicorn workers with --preload)."""
+    write_lock.after_fork()
+    backend = _storage
+    if backend is not None and hasattr(backend, "after_fork"):
+        backend.after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+@contextmanager
+def transaction():
+    """
+    Hold the storage write lock. Reads made inside see every committed write
+    (other processes' included) and no other writer can interleave, so a
+    plain load -> modify -> save inside the block is safe.
+    """
+    with write_lock:
+        yield
+
+
+@contextmanager
+def _request_write():
+    # write lock + the requests cache lock, so no reader-triggered reload can
+    # swap the snapshot between reading it and putting its successor
+    with write_lock, cache.lock(REQUESTS_DOC):
+        yield
+
+
+class VersionConflict(Exception):
+    """The record changed since it was read (compare-and-swap failed)."""
+
+
+VERSION_FIELD = "version"
+CAS_RETRIES = int(os.environ.get("STORAGE_CAS_RETRIES") or 8)
+
+
+def record_version(rec) -> int:
+    try:
+        return int((rec or {}).get(VERSION_FIELD) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+# ================================================
+# Cached access (what Max_app.py / app.py call)
+# ================================================
+def _load_request_rows() -> List[Dict[str, Any]]:
+    """Backend rows; records saved before shadow search fields existed get them here."""
+    rows = get_storage().load_requests()
+    for rec in rows:
+        if SHADOW_KEY not in rec:
+            stamp_request(rec)
+    return rows
+
+
+# Every document is parsed once per process and shared; see data_cache.py.
+cache = DataCache(
+    loader=lambda name: _load_request_rows() if name == REQUESTS_DOC
+    else get_storage().load_doc(name),
+    stamp=lambda name: get_storage().stamp(name),
+)
+
+
+def requests_view():
+    """Read-only snapshot of all requests (tuple of read-only mappings)."""
+    return cache.view(REQUESTS_DOC)
+
+
+def load_requests() -> List[Dict[str, Any]]:
+    """Mutable copy of all requests, for load -> modify -> save callers."""
+    return cache.copy(REQUESTS_DOC)
+
+
+def save_requests(requests_data) -> None:
+    """Whole-list save; records whose content changed get their version bumped."""
+    with _request_write():
+        current = {canonical_id(r.get("id")): r for r in requests_view()}
+        for rec in requests_data:
+            stamp_request(rec)
+            old = current.get(canonical_id(rec.get("id")))
+            if old is None:
+                rec.setdefault(VERSION_FIELD, 1)
+            elif freeze(rec) != old:
+                rec[VERSION_FIELD] = record_version(old) + 1
+        get_storage().save_requests(requests_data)
+        cache.put(REQUESTS_DOC, requests_data)
+
+
+# Primary-key index over the cached requests (see request_index.py)
+request_index = RequestIndex()
+cache.subscribe(REQUESTS_DOC, request_index.apply)
+
+
+def find_request(rid):
+    """O(1) read-only lookup by any id spelling ('REQ-7', '7', 7); None if missing."""
+    requests_view()  # picks up external changes before consulting the index
+    return request_index.get(rid)
+
+
+def get_request(rid) -> Optional[Dict[str, Any]]:
+    """Like find_request() but returns a mutable copy."""
+    rec = find_request(rid)
+    return thaw(rec) if rec is not None else None
+
+
+# Inverted keyword index over the cached requests (see text_index.py)
+text_index = TextIndex()
+cache.subscribe(REQUESTS_DOC, text_index.apply)
+
+
+def search_requests(keyword, fields=None, prefix: bool = True) -> List[Dict[str, Any]]:
+    """Requests matching every word of `keyword` (prefix match), best first, as copies."""
+    requests_view()
+    out = []
+    for key in text_index.search(keyword, fields=fields, prefix=prefix):
+        rec = request_index.get(key)
+        if rec is not None:
+            out.append(thaw(rec))
+    return out
+
+
+# status / category / owner / date -> ids (see field_index.py)
+field_indexes = SecondaryIndexes()
+cache.subscribe(REQUESTS_DOC, field_indexes.apply)
+
+
+def query_request_ids(filters=None, keyword=None, keyword_fields=None, exact=()) -> List[str]:
+    """
+    Canonical ids matching the structured `filters` (status, category, owner,
+    date, date_from/date_to, id) and, if given, every word of `keyword`.
+    Keyword queries come back best-first, others in request order.
+    """
+    requests_view()
+    filters = filters or {}
+    if filters.get("id"):
+        key = canonical_id(filters["id"])
+        ids = [key] if key in request_index else []
+    else:
+        ids = field_indexes.query(filters, exact=exact)
+    if keyword:
+        ranked = text_index.search(keyword, fields=keyword_fields)
+        if ids is not None:
+            wanted = set(ids)
+            ranked = [k for k in ranked if k in wanted]
+        return ranked
+    if ids is None:
+        return [canonical_id(r.get("id")) for r in requests_view()]
+    return ids
+
+
+def query_requests(filters=None, keyword=None, keyword_fields=None, exact=()) -> List[Dict[str, Any]]:
+    """query_request_ids() resolved to mutable copies of the records."""
+    out = []
+    for key in query_request_ids(filters, keyword, keyword_fields, exact):
+        rec = request_index.get(key)
+        if rec is not None:
+            out.append(thaw(rec))
+    return out
+
+
+def _slot(old) -> int:
+    """Row position of a cached record, from the primary-key index."""
+    rows = requests_view()
+    i = request_index.position(old.get("id"))
+    if i is None or i >= len(rows) or rows[i] is not old:
+        i = next(n for n, r in enumerate(rows) if r is old)  # index out of step; never expected
+    return i
+
+
+def _commit_rows(slots: Dict[int, Any], write_row, change) -> None:
+    """
+    Persist row changes ({position: frozen row}; position len(rows) appends).
+    Row-level backends write just those rows and the cached list gets the
+    slots replaced in place; whole-file backends get the new list built from
+    the cache (no re-read).
+    """
+    backend = get_storage()
+    if getattr(backend, "row_writes", False):
+        write_row(backend)
+    else:
+        rows = list(requests_view())
+        for i, row in sorted(slots.items()):
+            if i == len(rows):
+                rows.append(row)
+            else:
+                rows[i] = row
+        backend.save_requests(thaw(rows))
+    cache.put_rows(REQUESTS_DOC, slots, change)
+
+
+def insert_request(rec: Dict[str, Any], event: str = "create") -> None:
+    with _request_write():
+        rec.setdefault(VERSION_FIELD, 1)
+        frozen = freeze(stamp_request(rec))
+        _commit_rows({len(requests_view()): frozen}, lambda b: b.insert_request(rec, event=event),
+                     ("upsert", frozen, event))
+
+
+def update_request(rec: Dict[str, Any], event: str = "update", expected_version: Optional[int] = None) -> None:
+    """
+    Write one request back; `event` (update/assign/complete/view...) is journaled.
+    The record's version is bumped. With `expected_version`, the write is a
+    compare-and-swap: VersionConflict if the stored version is different.
+    """
+    with _request_write():
+        old = find_request(rec.get("id"))
+        if expected_version is not None and record_version(old) != expected_version:
+            raise VersionConflict(f"Request {rec.get('id')} is at version {record_version(old)}, expected {expected_version}.")
+        rec[VERSION_FIELD] = record_version(old) + 1
+        frozen = freeze(stamp_request(rec))
+        at = _slot(old) if old is not None else len(requests_view())
+        _commit_rows({at: frozen}, lambda b: b.update_request(rec, event=event), ("upsert", frozen, event))
+
+
+def update_requests(recs: List[Dict[str, Any]], event: str = "update") -> None:
+    """Write several requests back as one batch (one transaction / append / file write)."""
+    if not recs:
+        return
+    with _request_write():
+        end = len(requests_view())
+        at: Dict[str, int] = {}  # canonical id -> row position written in this batch
+        slots: Dict[int, Any] = {}
+        frozen = []
+        for rec in recs:
+            key = canonical_id(rec.get("id"))
+            if key not in at:
+                old = find_request(key)
+                rec[VERSION_FIELD] = record_version(old) + 1
+                if old is not None:
+                    at[key] = _slot(old)
+                else:
+                    at[key], end = end, end + 1
+            else:
+                rec[VERSION_FIELD] = record_version(slots[at[key]]) + 1
+            f = freeze(stamp_request(rec))
+            slots[at[key]] = f
+            frozen.append(f)
+        _commit_rows(slots, lambda b: b.update_requests(recs, event=event), ("upsert_many", frozen, event))
+
+
+def delete_request(rid, event: str = "delete") -> bool:
+    with _request_write():
+        old = find_request(rid)
+        if old is None:
+            return False
+        # positions after the record shift: the one write that copies the list
+        rows = [r for r in requests_view() if r is not old]
+        backend = get_storage()
+        if getattr(backend, "row_writes", False):
+            backend.delete_request(old.get("id"), event=event)
+        else:
+            backend.save_requests(thaw(rows))
+        cache.put(REQUESTS_DOC, rows, ("delete", rid, event))
+        return True
+
+
+def modify_request(rid, mutate: Callable[[Dict[str, Any]], Any], event: str = "update",
+                   retries: int = CAS_RETRIES) -> Optional[Dict[str, Any]]:
+    """
+    Optimistic read -> mutate -> compare-and-swap of one request.
+
+    `mutate(rec)` edits a fresh copy in place; returning False skips the
+    write (e.g. a precondition failed). If another writer changed the record
+    in between, the copy is discarded and mutate runs again on the new
+    version. After `retries` lost races the last attempt runs under the
+    write lock, so a hot record cannot starve a writer. Returns the written
+    (or skipped) copy, None if the id is unknown.
+    """
+    def attempt() -> Optional[Dict[str, Any]]:
+        rec = get_request(rid)
+        if rec is None:
+            return None
+        version = record_version(rec)
+        if mutate(rec) is not False:
+            update_request(rec, event=event, expected_version=version)
+        return rec
+
+    for n in range(retries):
+        try:
+            return attempt()
+        except VersionConflict:
+            time.sleep(random.uniform(0, 0.002 * (n + 1)))  # back off, then re-read
+    with write_lock:
+        return attempt()
+
+
+def data_version(name: str):
+    """
+    Change stamp of a collection (requests or a document), straight from the
+    backend: file identity for JSON, a per-document write counter for SQLite.
+    Moves on every write by any process; nothing is loaded to get it.
+    """
+    return get_storage().stamp(name)
+
+
+def doc_view(name: str):
+    """Read-only snapshot of a document (users, categories, shortlists, matches)."""
+    return cache.view(name)
+
+
+def load_doc(name: str, default=None):
+    """Mutable copy of a document; `default` only applies if it has no content."""
+    data = cache.copy(name)
+    return default if data is None else data
+
+
+def save_doc(name: str, data, change=None) -> None:
+    """`change` is passed to the document's listeners (None = rebuild)."""
+    with write_lock:
+        get_storage().save_doc(name, data)
+        cache.put(name, data, change)
+
+
+def modify_doc(name: str, mutate: Callable[[Any], Any], default=None, change=None):
+    """
+    Locked read -> mutate -> write of a whole document (documents have no
+    per-record versions). `mutate(data)` edits in place; returning False
+    skips the write. Returns the data.
+    """
+    with write_lock:
+        data = load_doc(name, default)
+        if mutate(data) is not False:
+            save_doc(name, data, change)
+        return data
+
+
+# ================================================
+# Migration: JSON files -> SQLite
+# ================================================
+def migrate_json_to_sqlite(db_path=None, base_dir: Path = BASE_DIR, force: bool = False) -> Dict[str, int]:
+    """
+    Copy requests.json, users.json, categories.json, shortlists.json (and
+    matches.json if present) into the SQLite database. Runs once; pass
+    force=True to re-import over an already migrated database.
+    """
+    src = JsonStorage(base_dir)
+    dst = SQLiteStorage(db_path)
+    if dst.get_meta("migrated_at") and not force:
+        raise RuntimeError(f"{dst.db_path} was already migrated at {dst.get_meta('migrated_at')} (use --force).")
+
+    counts = {}
+    reqs = src.load_requests() if src.path_for(REQUESTS_DOC).exists() else []
+    with dst._conn() as conn:
+        conn.execute("DELETE FROM requests")
+        conn.executemany(
+            "INSERT INTO requests(id, data) VALUES(?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+            [(_req_key(r.get("id")), _dump(r)) for r in reqs],
+        )
+        dst._bump(conn, REQUESTS_DOC)
+    counts[REQUESTS_DOC] = len(reqs)
+
+    for name, default in DOC_DEFAULTS.items():
+        if not src.path_for(name).exists():
+            continue
+        data = src.load_doc(name, default)
+        dst.save_doc(name, data)
+        counts[name] = len(data) if hasattr(data, "__len__") else 1
+
+    dst.set_meta("migrated_at", datetime.now(timezone.utc).isoformat(timespec="seconds"))
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Storage backend utilities")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    mig = sub.add_parser("migrate", help="import the JSON data files into SQLite")
+    mig.add_argument("--db", help="SQLite file (default: STORAGE_DB or app_data.db)")
+    mig.add_argument("--force", action="store_true", help="re-import even if already migrated")
+    sub.add_parser("compact", help="fold requests_journal.jsonl into requests.json")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "migrate":
+        try:
+            counts = migrate_json_to_sqlite(args.db, force=args.force)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            return 1
+        for name, n in counts.items():
+            print(f"{name}: {n}")
+        print("Migration complete. Start the apps with STORAGE_BACKEND=sqlite.")
+    elif args.cmd == "compact":
+        # constructing the backend replays and folds a non-empty journal
+        print(f"Compacted {JournalStorage().recovered} journal entries into requests.json.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
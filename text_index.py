@@ -0,0 +1,164 @@
+# ================================================
+# text_index.py — inverted full-text index for request keyword search
+#
+# Every searchable field (title, description, category, location) is
+# tokenized into lowercase words and kept as postings:
+#     field -> token -> {canonical request id: term frequency}
+# plus a sorted vocabulary per field for prefix lookups.
+#
+# A query is split into terms; each term matches its exact token and every
+# token it is a prefix of ("plumb" -> "plumbing"). Terms are ANDed, and hits
+# are ranked by field weight * tf * idf (exact tokens count double). The work
+# done is proportional to the postings touched, not to the number of requests.
+#
+# Like RequestIndex, the shared instance is kept in sync with the request
+# cache by storage.py (one document re-indexed per create/update/delete).
+# ================================================
+
+from __future__ import annotations
+
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+from request_index import canonical_id
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+FIELDS = ("title", "description", "category", "location")
+WEIGHTS = {"title": 3.0, "category": 2.0, "location": 1.5, "description": 1.0}
+
+
+def tokenize(text) -> List[str]:
+    return _TOKEN.findall(str(text or "").lower())
+
+
+class TextIndex:
+    """Postings per field, maintained incrementally."""
+
+    def __init__(self, fields: Sequence[str] = FIELDS):
+        self.fields = tuple(fields)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._post: Dict[str, Dict[str, Dict[str, int]]] = {f: {} for f in self.fields}
+        self._vocab: Dict[str, List[str]] = {f: [] for f in self.fields}
+        self._docs: Dict[str, Dict[str, Counter]] = {}
+        self._seq: Dict[str, int] = {}  # tie-break: original request order
+        self._next = 0
+
+    # ---- maintenance ----
+    def rebuild(self, rows: Iterable[Mapping]) -> None:
+        with self._lock:
+            self._reset()
+            for rec in rows:
+                self._add(rec)
+
+    def upsert(self, rec: Mapping) -> None:
+        with self._lock:
+            self._remove(canonical_id(rec.get("id")))
+            self._add(rec)
+
+    def remove(self, rid) -> None:
+        with self._lock:
+            key = canonical_id(rid)
+            self._remove(key)
+            self._seq.pop(key, None)
+
+    def apply(self, rows, change) -> None:
+        """Cache listener, same protocol as RequestIndex.apply."""
+        if change is None:
+            self.rebuild(rows)
+        elif change[0] == "upsert":
+            self.upsert(change[1])
+        elif change[0] == "upsert_many":
+            for rec in change[1]:
+                self.upsert(rec)
+        elif change[0] == "delete":
+            self.remove(change[1])
+
+    def _add(self, rec: Mapping) -> None:
+        key = canonical_id(rec.get("id"))
+        if key in self._docs:
+            return  # duplicate id: first record wins, as in RequestIndex
+        if key not in self._seq:
+            self._seq[key] = self._next
+            self._next += 1
+        doc = {}
+        for field in self.fields:
+            counts = Counter(tokenize(rec.get(field)))
+            if not counts:
+                continue
+            doc[field] = counts
+            postings, vocab = self._post[field], self._vocab[field]
+            for token, tf in counts.items():
+                bucket = postings.get(token)
+                if bucket is None:
+                    bucket = postings[token] = {}
+                    insort(vocab, token)
+                bucket[key] = tf
+        self._docs[key] = doc
+
+    def _remove(self, key: str) -> None:
+        doc = self._docs.pop(key, None)
+        if not doc:
+            return
+        for field, counts in doc.items():
+            postings, vocab = self._post[field], self._vocab[field]
+            for token in counts:
+                bucket = postings.get(token)
+                if bucket is None:
+                    continue
+                bucket.pop(key, None)
+                if not bucket:
+                    del postings[token]
+                    vocab.pop(bisect_left(vocab, token))
+
+    # ---- queries ----
+    def _expand(self, field: str, term: str, prefix: bool) -> List[str]:
+        if not prefix:
+            return [term] if term in self._post[field] else []
+        vocab = self._vocab[field]
+        out = []
+        i = bisect_left(vocab, term)
+        while i < len(vocab) and vocab[i].startswith(term):
+            out.append(vocab[i])
+            i += 1
+        return out
+
+    def _term_scores(self, term: str, fields: Sequence[str], prefix: bool) -> Dict[str, float]:
+        n = max(len(self._docs), 1)
+        scores: Dict[str, float] = {}
+        for field in fields:
+            weight = WEIGHTS.get(field, 1.0)
+            for token in self._expand(field, term, prefix):
+                bucket = self._post[field][token]
+                idf = math.log(1.0 + n / len(bucket))
+                boost = 2.0 if token == term else 1.0
+                for key, tf in bucket.items():
+                    scores[key] = scores.get(key, 0.0) + weight * tf * idf * boost
+        return scores
+
+    def search(self, query, fields: Optional[Sequence[str]] = None, prefix: bool = True) -> List[str]:
+        """Canonical ids matching every term of `query`, best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        fields = [f for f in (fields or self.fields) if f in self._post]
+        with self._lock:
+            per_term = [self._term_scores(t, fields, prefix) for t in terms]
+            per_term.sort(key=len)
+            total = dict(per_term[0])
+            for scores in per_term[1:]:
+                total = {k: s + scores[k] for k, s in total.items() if k in scores}
+                if not total:
+                    return []
+            seq = self._seq
+            return sorted(total, key=lambda k: (-total[k], seq.get(k, 0)))
+
+    def __len__(self) -> int:
+        return len(self._docs)
@@ -0,0 +1,277 @@
+# ================================================
+# user_directory.py — indexes over the users document for admin lookups
+#
+#   by_id     str(id)  -> (role bucket, username)
+#   by_uid    uid      -> (role bucket, username)
+#   trie      prefix trie of the words of each user's name, email and
+#             username (whole values and their alphanumeric parts, so
+#             "doe" finds john.doe@x.com) -> keys, for type-ahead search;
+#             it also keeps the distinct words, which the admin search
+#             scans for substrings ("son" finds "Jason")
+#   roles     role (admin | csr | pin | platform)   -> keys
+#   statuses  status (active | inactive, UI terms)  -> keys
+#
+# Keys are (role bucket, username) exactly as in users.json, so a key
+# resolves to the record with data[role][username]. Records themselves are
+# not copied: reads go through auth_cache.directory's read-only document.
+#
+# The index follows the cached users document. Writes that touch one user
+# pass change=("upsert", role, username) to storage.save_doc() and only that
+# user is re-indexed (a rename or role move drops the user's old key, found
+# by id); any other write (change=None) rebuilds.
+# ================================================
+
+from __future__ import annotations
+
+import re
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+import auth_cache
+import storage
+from search_fields import user_shadow
+
+USERS_DOC = auth_cache.USERS_DOC
+
+Key = Tuple[str, str]
+
+_WORD = re.compile(r"[a-z0-9]+")
+_KEYS = ""  # trie children are single characters; "" holds a node's keys
+
+
+def role_key(role) -> str:
+    role = str(role or "").strip().lower()
+    return "pin" if role == "user" else role
+
+
+def status_key(status) -> str:
+    """users.json status -> UI status (same rule as app.py's file_status_to_ui)."""
+    return "inactive" if str(status or "").strip().lower() in ("suspended", "inactive") else "active"
+
+
+def words(*values) -> Set[str]:
+    """Each lowercase value plus its alphanumeric parts."""
+    out: Set[str] = set()
+    for v in values:
+        v = str(v or "").strip().lower()
+        if v:
+            out.add(v)
+            out.update(_WORD.findall(v))
+    return out
+
+
+class PrefixTrie:
+    """word -> keys, with lookups by word prefix or substring."""
+
+    def __init__(self):
+        self._root: Dict = {}
+        self._words: Dict[str, Set[Key]] = {}  # distinct words, sharing the trie's key sets
+
+    def add(self, word: str, key: Key) -> None:
+        node = self._root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        keys = node.setdefault(_KEYS, set())
+        keys.add(key)
+        self._words[word] = keys
+
+    def discard(self, word: str, key: Key) -> None:
+        path = [self._root]
+        for ch in word:
+            node = path[-1].get(ch)
+            if node is None:
+                return
+            path.append(node)
+        keys = path[-1].get(_KEYS)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del path[-1][_KEYS]
+            del self._words[word]
+        # prune now-empty nodes back towards the root
+        for i in range(len(word), 0, -1):
+            if path[i]:
+                break
+            del path[i - 1][word[i - 1]]
+
+    def prefix(self, prefix: str, limit: Optional[int] = None) -> Set[Key]:
+        """Keys of every word starting with `prefix` (at most `limit` of them)."""
+        node = self._root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return set()
+        out: Set[Key] = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for ch, child in node.items():
+                if ch == _KEYS:
+                    out |= child
+                    if limit is not None and len(out) >= limit:
+                        return out
+                else:
+                    stack.append(child)
+        return out
+
+    def containing(self, sub: str) -> Set[Key]:
+        """Keys of every word containing `sub`."""
+        out: Set[Key] = set()
+        for word, keys in self._words.items():
+            if sub in word:
+                out |= keys
+        return out
+
+
+class UserIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._by_id: Dict[str, Key] = {}
+        self._by_uid: Dict[str, Key] = {}
+        self._trie = PrefixTrie()
+        self._roles: Dict[str, Set[Key]] = {}
+        self._statuses: Dict[str, Set[Key]] = {}
+        self._entries: Dict[Key, Tuple[str, str, Set[str], str, str]] = {}  # key -> what was indexed
+
+    # ---- maintenance ----
+    def apply(self, view, change) -> None:
+        """Cache listener: ("upsert", role, username) re-indexes one user, else rebuild."""
+        with self._lock:
+            if change is not None and change[0] == "upsert":
+                _, role, uname = change
+                rec = ((view or {}).get(role) or {}).get(uname)
+                if isinstance(rec, Mapping):
+                    old = self._by_id.get(str(rec.get("id") or ""))
+                    if old is not None:
+                        self._remove(old)
+                    self._remove((role, uname))
+                    self._add(role, uname, rec)
+                    return
+            self._reset()
+            for role, bucket in (view or {}).items():
+                if not isinstance(bucket, Mapping):
+                    continue
+                for uname, rec in bucket.items():
+                    if isinstance(rec, Mapping):
+                        self._add(role, uname, rec)
+
+    def _add(self, role: str, uname: str, rec: Mapping) -> None:
+        key = (role, uname)
+        s = user_shadow(rec, role, uname)
+        uid_ = s["uid"]
+        tokens = words(s["name"], s["email"], s["username"])
+        r, st = role_key(s["role"]), status_key(rec.get("status"))
+        if s["id"]:
+            self._by_id[s["id"]] = key
+        if uid_:
+            self._by_uid[uid_] = key
+        for w in tokens:
+            self._trie.add(w, key)
+        self._roles.setdefault(r, set()).add(key)
+        self._statuses.setdefault(st, set()).add(key)
+        self._entries[key] = (s["id"], uid_, tokens, r, st)
+
+    def _remove(self, key: Key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        id_, uid_, tokens, r, st = entry
+        if self._by_id.get(id_) == key:
+            del self._by_id[id_]
+        if self._by_uid.get(uid_) == key:
+            del self._by_uid[uid_]
+        for w in tokens:
+            self._trie.discard(w, key)
+        self._roles.get(r, set()).discard(key)
+        self._statuses.get(st, set()).discard(key)
+
+    # ---- lookups (keys) ----
+    def key_for_id(self, user_id) -> Optional[Key]:
+        auth_cache.directory.users()  # refresh first if another process wrote
+        return self._by_id.get(str(user_id if user_id is not None else "").lower())
+
+    def key_for_uid(self, uid) -> Optional[Key]:
+        auth_cache.directory.users()
+        return self._by_uid.get(str(uid or "").strip().lower())
+
+    def search(self, q: str = "", role: str = "", status: str = "",
+               limit: Optional[int] = None, prefix: bool = False) -> List[Key]:
+        """
+        Keys of users whose name / email / username contains `q` (with
+        prefix=True: has a word starting with `q`, for type-ahead), or whose
+        id / uid / role is `q`; narrowed by `role` / `status`. Ordered by id.
+        """
+        auth_cache.directory.users()
+        q = (q or "").strip().lower()
+        with self._lock:
+            if q:
+                if prefix:
+                    keys = self._trie.prefix(q, limit if not (role or status) else None)
+                else:
+                    keys = self._trie.containing(q)
+                for hit in (self._by_id.get(q), self._by_uid.get(q)):
+                    if hit is not None:
+                        keys.add(hit)
+                keys |= self._roles.get(role_key(q), set())
+            else:
+                keys = set(self._entries)
+            if role:
+                keys &= self._roles.get(role_key(role), set())
+            if status:
+                keys &= self._statuses.get(str(status).strip().lower(), set())
+            ordered = sorted(keys, key=lambda k: self._sort_id(self._entries[k][0]))
+        return ordered[:limit] if limit is not None else ordered
+
+    @staticmethod
+    def _sort_id(id_: str):
+        return (0, int(id_), "") if id_.isdigit() else (1, 0, id_)
+
+    # ---- lookups (records, read-only) ----
+    def resolve(self, keys: Iterable[Key]) -> List[Tuple[str, str, Mapping]]:
+        """(role, username, record) for each key that still exists."""
+        users = auth_cache.directory.users()
+        out = []
+        for role, uname in keys:
+            rec = (users.get(role) or {}).get(uname)
+            if rec is not None:
+                out.append((role, uname, rec))
+        return out
+
+    def get_by_id(self, user_id) -> Optional[Tuple[str, str, Mapping]]:
+        key = self.key_for_id(user_id)
+        found = self.resolve([key]) if key else []
+        return found[0] if found else None
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {"roles": {r: len(k) for r, k in self._roles.items() if k},
+                    "statuses": {s: len(k) for s, k in self._statuses.items() if k}}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+index = UserIndex()
+storage.cache.subscribe(USERS_DOC, index.apply)
+
+
+def find(data, user_id) -> Tuple[Optional[str], Optional[str], Optional[dict]]:
+    """
+    (role, username, record) of `user_id` inside `data`, a mutable copy of
+    the users document: one index lookup, with a scan only if the index
+    disagrees with the copy (a write landed in between).
+    """
+    key = index.key_for_id(user_id)
+    if key is not None:
+        rec = ((data or {}).get(key[0]) or {}).get(key[1])
+        if isinstance(rec, dict) and rec.get("id") == user_id:
+            return key[0], key[1], rec
+    for role, bucket in (data or {}).items():
+        for uname, rec in bucket.items():
+            if isinstance(rec, dict) and rec.get("id") == user_id:
+                return role, uname, rec
+    return None, None, None
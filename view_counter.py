@@ -0,0 +1,174 @@
+# ================================================
+# view_counter.py — batched, coalesced request view counts
+#
+# Views are the hottest write in the app. Instead of persisting every
+# POST /api/requests/<id>/views, increments are accumulated in memory per
+# request and written out together:
+#   * every VIEW_FLUSH_INTERVAL seconds (default 2) by a background thread,
+#   * as soon as VIEW_FLUSH_THRESHOLD increments are pending (default 100),
+#   * at interpreter shutdown (atexit).
+#
+# Readers add pending() to the persisted viewCount, so the numbers they
+# return are exact even before a flush.
+# ================================================
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict
+
+import storage
+from request_index import canonical_id
+
+log = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """canonical request id -> increments not yet written to storage."""
+
+    def __init__(self, interval: float | None = None, threshold: int | None = None):
+        self.interval = float(interval or os.environ.get("VIEW_FLUSH_INTERVAL") or 2)
+        self.threshold = int(threshold or os.environ.get("VIEW_FLUSH_THRESHOLD") or 100)
+        self._pending: Dict[str, int] = {}
+        self._flushing: Dict[str, int] = {}  # taken by a flush, not yet committed
+        self._last_viewed: Dict[str, str] = {}
+        self._total = 0
+        self._adds = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.flushes = 0
+
+    # ---- recording / reading ----
+    def add(self, request_id, by: int = 1) -> int:
+        """Record `by` views; returns the pending count for this request."""
+        key = canonical_id(request_id)
+        with self._lock:
+            n = self._pending.get(key, 0) + by
+            self._pending[key] = n
+            self._last_viewed[key] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            self._total += by
+            self._adds += 1
+            full = self._total >= self.threshold
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+        return n
+
+    def add_many(self, request_ids, by: int = 1) -> None:
+        """Record `by` views for each id, all under one lock acquisition."""
+        keys = [canonical_id(r) for r in request_ids]
+        if not keys:
+            return
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self._lock:
+            for key in keys:
+                self._pending[key] = self._pending.get(key, 0) + by
+                self._last_viewed[key] = now
+            self._total += by * len(keys)
+            self._adds += 1
+            full = self._total >= self.threshold
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def generation(self) -> str:
+        """Changes whenever this process's unwritten views change ('' when none are pending)."""
+        with self._lock:
+            return f"{os.getpid()}:{self._adds}" if self._pending or self._flushing else ""
+
+    def pending(self, request_id) -> int:
+        """Unwritten views of a request, including those a running flush has not committed yet."""
+        key = canonical_id(request_id)
+        return self._pending.get(key, 0) + self._flushing.get(key, 0)
+
+    def total(self, rec) -> int:
+        """Persisted viewCount of a request record plus its pending increments."""
+        if not rec:
+            return 0
+        return int(rec.get("viewCount", 0) or 0) + self.pending(rec.get("id"))
+
+    # ---- flushing ----
+    def flush(self) -> int:
+        """Write all pending increments in one batch; returns requests touched."""
+        with self._flush_lock:
+            with self._lock:
+                # stays visible to pending() until the write has committed
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+                last_viewed, self._last_viewed = self._last_viewed, {}
+                self._total = 0
+            if not pending:
+                return 0
+            recs = []
+            try:
+                # read + write under the storage lock so a concurrent
+                # assign/update (any process) is never overwritten
+                with storage.transaction():
+                    for key, n in pending.items():
+                        rec = storage.get_request(key)
+                        if rec is None:
+                            continue  # deleted while its views were pending
+                        rec["viewCount"] = int(rec.get("viewCount", 0) or 0) + n
+                        rec["lastViewedAt"] = last_viewed.get(key) or rec.get("lastViewedAt")
+                        recs.append(rec)
+                    storage.update_requests(recs, event="view")
+                    with self._lock:
+                        self._flushing = {}
+            except Exception:
+                # put the counts back so the next flush retries them
+                with self._lock:
+                    self._flushing = {}
+                    for key, n in pending.items():
+                        self._pending[key] = self._pending.get(key, 0) + n
+                        self._total += n
+                    for key, ts in last_viewed.items():
+                        self._last_viewed.setdefault(key, ts)
+                raise
+            self.flushes += 1
+            return len(recs)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log.exception("view count flush failed")
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="view-counter-flush", daemon=True)
+                self._thread.start()
+
+    def after_fork(self) -> None:
+        # a forked worker starts empty (the parent flushes its own pending
+        # views) and starts its own flush thread on first use
+        self._pending, self._flushing, self._last_viewed, self._total = {}, {}, {}, 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def stop(self) -> None:
+        """Stop the background thread and write out whatever is pending."""
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=view_counter.after_fork)